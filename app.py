@@ -1,8 +1,9 @@
+import sys
+import time
 import streamlit as st
-from modules.cartera import mostrar_modulo_cartera
-from modules.jubilacion import mostrar_modulo_jubilacion
-from modules.bonos import mostrar_modulo_bonos
-from utils.exportar import generar_pdf_reporte
+
+# Los módulos de cada página (y con ellos pandas, Plotly y reportlab) se importan
+# recién al abrir esa página, para que el arranque y la página de inicio sean rápidos
 
 st.set_page_config(
     page_title="Calculadora Financiera",
@@ -50,6 +51,50 @@ with st.sidebar:
     4. **Exportar**: Descarga reporte
     """)
     
+    st.markdown("---")
+    with st.expander("⚙️ Caché"):
+        # Solo las cachés de los módulos ya cargados: el menú no debe importarlos
+        cache = sys.modules.get('utils.cache')
+        graficos = sys.modules.get('utils.graficos')
+        exportar = sys.modules.get('utils.exportar')
+        
+        if cache is None and graficos is None and exportar is None:
+            st.caption("Las cachés se crean al abrir un módulo")
+        
+        if 'resultados' in st.session_state:
+            uso = st.session_state['resultados'].uso()
+            st.write("**Resultados de esta sesión**")
+            st.write(f"Memoria: {uso['bytes'] / 1024:,.0f} KB de {uso['max_bytes'] / 1024 / 1024:,.0f} MB")
+            if uso['expulsados']:
+                st.write(f"Se recalcularán al usarse: {', '.join(uso['expulsados'])}")
+            
+            stats = sys.modules['utils.almacen'].ALMACEN_SESIONES.estadisticas()
+            st.write("**Resultados de todas las sesiones**")
+            st.write(f"Sesiones: {stats['sesiones']:,} · Recalculados: {stats['recalculos']:,}")
+            st.write(f"Memoria: {stats['bytes'] / 1024 / 1024:,.1f} MB de {stats['max_bytes'] / 1024 / 1024:,.0f} MB")
+        
+        if cache is not None:
+            stats = cache.CACHE_CALCULOS.estadisticas()
+            st.write("**Cálculos**")
+            st.write(f"Aciertos: {stats['aciertos']:,} · Fallos: {stats['fallos']:,}")
+            st.write(f"Tasa de aciertos: {stats['tasa_aciertos'] * 100:.1f}%")
+            st.write(f"Entradas: {stats['entradas']:,} de {stats['max_entradas']:,}")
+        
+        if graficos is not None:
+            stats = graficos.CACHE_IMAGENES.estadisticas()
+            st.write("**Imágenes de gráficos**")
+            st.write(f"Aciertos: {stats['aciertos']:,} · Fallos: {stats['fallos']:,}")
+            st.write(f"Memoria: {stats['bytes'] / 1024 / 1024:,.1f} MB de {stats['max_bytes'] / 1024 / 1024:,.0f} MB")
+        
+        if exportar is not None:
+            stats = exportar.CACHE_REPORTES.estadisticas()
+            st.write("**Reportes PDF**")
+            st.write(f"Aciertos: {stats['aciertos']:,} · Fallos: {stats['fallos']:,}")
+            st.write(f"Memoria: {stats['bytes'] / 1024 / 1024:,.1f} MB de {stats['max_bytes'] / 1024 / 1024:,.0f} MB")
+    
+    # Se completa al final del script, para incluir los tiempos de la página de esta ejecución
+    panel_diagnostico = st.expander("⏱️ Diagnóstico")
+    
     st.markdown("---")
     st.caption("Desarrollado para Finanzas Corporativas")
     st.caption("© 2024 - Todos los derechos reservados")
@@ -135,15 +180,25 @@ if pagina == "🏠 Inicio":
     st.success("💡 ¡Estos resultados son aproximados! Usa los módulos para cálculos exactos.")
 
 elif pagina == "📊 Cartera":
+    from modules.cartera import mostrar_modulo_cartera
     mostrar_modulo_cartera()
 
 elif pagina == "💰 Jubilación":
+    from modules.jubilacion import mostrar_modulo_jubilacion
     mostrar_modulo_jubilacion()
 
 elif pagina == "📈 Bonos":
+    from modules.bonos import mostrar_modulo_bonos
     mostrar_modulo_bonos()
 
 elif pagina == "📄 Exportar":
+    # reportlab y el renderizado de gráficos solo se necesitan en esta página
+    from utils.exportar import PERFILES_EXPORTACION, generar_pdf_reporte
+    from utils.graficos import esperar_imagenes
+    from modules.comun import medir_etapa, resultados_sesion
+    
+    resultados = resultados_sesion()
+    
     st.header("📄 Exportar Reporte")
     st.markdown("---")
     
@@ -178,13 +233,61 @@ elif pagina == "📄 Exportar":
     if tiene_datos:
         st.write(f"**Secciones a incluir:** {', '.join(datos_incluir)}")
         
+        tabla_completa = st.checkbox(
+            "Incluir cronograma completo",
+            value=False,
+            help="Imprime todos los periodos de cartera y bonos en lugar de las primeras y últimas 5 filas"
+        )
+        
+        perfil = st.selectbox(
+            "Calidad de los gráficos",
+            list(PERFILES_EXPORTACION),
+            index=1,
+            format_func=lambda p: {
+                'pantalla': "Pantalla (liviano)",
+                'impresion': "Impresión",
+                'archivo': "Archivo (sin pérdida)"
+            }[p],
+            help="Resolución y compresión de los gráficos dentro del PDF"
+        )
+        
+        graficos_vectoriales = st.checkbox(
+            "Gráficos vectoriales",
+            value=True,
+            help="Dibuja los gráficos de cartera y bonos como vectores: PDF más nítido, liviano y rápido de generar"
+        )
+        
         if st.button("📥 Generar y Descargar PDF", type="primary", use_container_width=True):
+            # Las imágenes de los gráficos se rasterizan ahora, en paralelo, mientras se muestra el avance
+            claves_graficos = ['jubilacion_grafico', 'jubilacion_grafico_comparacion']
+            # Los gráficos vectoriales se dibujan desde los datos y no necesitan imagen
+            if not graficos_vectoriales:
+                claves_graficos += ['cartera_grafico', 'bono_grafico', 'bono_grafico_sensibilidad']
+            pendientes = {clave: resultados[clave] for clave in claves_graficos if clave in resultados}
+            
+            barra = st.progress(0.0, text="Preparando gráficos...")
+            with medir_etapa('exportar/imagenes', graficos=len(pendientes)):
+                imagenes = esperar_imagenes(
+                    pendientes,
+                    al_avanzar=lambda hechas, total: barra.progress(
+                        hechas / total if total else 1.0,
+                        text=f"Preparando gráficos... ({hechas}/{total})"
+                    )
+                )
+            barra.empty()
+            
+            if any(img is None for img in imagenes.values()):
+                st.warning(
+                    "⚠️ No se pudieron generar algunas imágenes de los gráficos. "
+                    "El reporte PDF se generará sin ellas."
+                )
+            
             with st.spinner("Generando reporte..."):
                 datos_cartera = None
                 datos_jubilacion = None
                 datos_bono = None
                 
-                if 'cartera_saldo_final' in st.session_state or 'cartera_grafico' in st.session_state:
+                if 'cartera_saldo_final' in st.session_state:
                     datos_cartera = {
                         'monto_inicial': st.session_state['cartera_params']['monto_inicial'],
                         'aporte_periodico': st.session_state['cartera_params']['aporte_periodico'],
@@ -192,17 +295,17 @@ elif pagina == "📄 Exportar":
                         'anos': st.session_state['cartera_params']['anos'],
                         'saldo_final': st.session_state['cartera_saldo_final']
                     }
-                    if 'cartera_grafico' in st.session_state:
-                        datos_cartera['grafico'] = st.session_state['cartera_grafico']
-                    if 'cartera_df' in st.session_state:
-                        datos_cartera['df_detallado'] = st.session_state['cartera_df']
+                    if imagenes.get('cartera_grafico') is not None:
+                        datos_cartera['grafico'] = imagenes['cartera_grafico']
+                    if 'cartera_df' in resultados:
+                        datos_cartera['df_detallado'] = resultados['cartera_df']
                 
                 if 'jubilacion_data' in st.session_state:
-                    datos_jubilacion = st.session_state['jubilacion_data']
-                    if 'jubilacion_grafico' in st.session_state:
-                        datos_jubilacion['grafico'] = st.session_state['jubilacion_grafico']
-                    if 'jubilacion_grafico_comparacion' in st.session_state:
-                        datos_jubilacion['grafico_comparacion'] = st.session_state['jubilacion_grafico_comparacion']
+                    datos_jubilacion = dict(st.session_state['jubilacion_data'])
+                    if imagenes.get('jubilacion_grafico') is not None:
+                        datos_jubilacion['grafico'] = imagenes['jubilacion_grafico']
+                    if imagenes.get('jubilacion_grafico_comparacion') is not None:
+                        datos_jubilacion['grafico_comparacion'] = imagenes['jubilacion_grafico_comparacion']
                 
                 if 'bono_vp' in st.session_state:
                     datos_bono = {
@@ -211,14 +314,21 @@ elif pagina == "📄 Exportar":
                         'anos': st.session_state['bono_params']['anos'],
                         'vp_total': st.session_state['bono_vp']
                     }
-                    if 'bono_grafico' in st.session_state:
-                        datos_bono['grafico'] = st.session_state['bono_grafico']
-                    if 'bono_df' in st.session_state:
-                        datos_bono['df_flujos'] = st.session_state['bono_df']
-                    if 'bono_grafico_sensibilidad' in st.session_state:
-                        datos_bono['grafico_sensibilidad'] = st.session_state['bono_grafico_sensibilidad']
+                    if imagenes.get('bono_grafico') is not None:
+                        datos_bono['grafico'] = imagenes['bono_grafico']
+                    if 'bono_df' in resultados:
+                        datos_bono['df_flujos'] = resultados['bono_df']
+                    if imagenes.get('bono_grafico_sensibilidad') is not None:
+                        datos_bono['grafico_sensibilidad'] = imagenes['bono_grafico_sensibilidad']
+                    if 'bono_sensibilidad' in resultados:
+                        datos_bono['df_sensibilidad'] = resultados['bono_sensibilidad']
                         
-                pdf_buffer = generar_pdf_reporte(datos_cartera, datos_jubilacion, datos_bono)
+                inicio = time.perf_counter()
+                with medir_etapa('exportar/pdf', perfil=perfil, tabla_completa=tabla_completa):
+                    pdf_buffer = generar_pdf_reporte(datos_cartera, datos_jubilacion, datos_bono,
+                                                     tabla_completa=tabla_completa, perfil=perfil,
+                                                     graficos_vectoriales=graficos_vectoriales)
+                duracion = time.perf_counter() - inicio
                 
                 st.download_button(
                     label="📄 Descargar Reporte PDF",
@@ -229,6 +339,31 @@ elif pagina == "📄 Exportar":
                 )
                 
                 st.success("✅ Reporte generado exitosamente")
+                st.caption(f"📦 {pdf_buffer.getbuffer().nbytes / 1024:,.0f} KB · generado en {duracion:.2f} s")
     else:
         st.error("❌ No hay datos para exportar. Por favor, completa al menos un módulo.")
-        st.info("💡 Ve a los módulos de Cartera, Jubilación o Bonos para generar datos")
\ No newline at end of file
+        st.info("💡 Ve a los módulos de Cartera, Jubilación o Bonos para generar datos")
+
+with panel_diagnostico:
+    # Como las cachés: solo si algún módulo ya cargó utils.diagnostico
+    diagnostico = sys.modules.get('utils.diagnostico')
+    if diagnostico is None:
+        st.caption("Los tiempos por etapa se registran al usar un módulo")
+    else:
+        registros = [("Todas las sesiones", diagnostico.REGISTRO_PROCESO)]
+        if 'diagnostico' in st.session_state:
+            registros.insert(0, ("Esta sesión", st.session_state['diagnostico']))
+        
+        for titulo, registro in registros:
+            resumen = registro.resumen()
+            st.write(f"**{titulo}**")
+            if not resumen:
+                st.caption("Sin mediciones todavía")
+                continue
+            # Tabla en markdown: st.dataframe importaría pandas también en la página de inicio
+            filas = ["| Etapa | n | p50 (ms) | p95 (ms) |", "|---|---:|---:|---:|"]
+            for etapa, estadisticas in resumen.items():
+                filas.append(f"| {etapa} | {estadisticas['n']:,} | {estadisticas['p50'] * 1000:,.1f} "
+                             f"| {estadisticas['p95'] * 1000:,.1f} |")
+            st.markdown("\n".join(filas))
+        st.caption(f"p50/p95 de las últimas {diagnostico.MAX_MUESTRAS} mediciones de cada etapa")
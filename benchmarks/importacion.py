@@ -0,0 +1,111 @@
+"""
+Benchmark del tiempo de importación y del primer render de cada página.
+
+Para cada página, en un intérprete nuevo:
+  - mide con `python -X importtime` lo que cuestan los imports propios de la página
+    (además de streamlit, que se cuenta aparte) y qué paquetes pesan más;
+  - ejecuta app.py con el AppTest de Streamlit, abre la página y mide cuánto tarda
+    su primer render y qué paquetes pesados quedaron cargados.
+
+Uso:
+    python -m benchmarks.importacion [--detalle 5]
+"""
+import argparse
+import json
+import os
+import re
+import subprocess
+import sys
+from collections import defaultdict
+
+RAIZ = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+# Lo que importa app.py al abrir cada página
+PAGINAS = {
+    "🏠 Inicio": [],
+    "📊 Cartera": ['modules.cartera'],
+    "💰 Jubilación": ['modules.jubilacion'],
+    "📈 Bonos": ['modules.bonos'],
+    "📄 Exportar": ['utils.exportar', 'utils.graficos'],
+}
+
+PAQUETES_PESADOS = ('pandas', 'reportlab', 'matplotlib', 'kaleido', 'PIL')
+
+PATRON_IMPORTTIME = re.compile(r"import time:\s+(\d+) \|\s+(\d+) \| (\s*)(\S+)")
+
+SCRIPT_RENDER = """
+import json, sys, time
+from streamlit.testing.v1 import AppTest
+app = AppTest.from_file('app.py', default_timeout=300)
+pagina = sys.argv[1]
+inicio = time.perf_counter()
+app.run()
+if pagina != app.sidebar.radio[0].value:
+    inicio = time.perf_counter()
+    app.sidebar.radio[0].set_value(pagina).run()
+segundos = time.perf_counter() - inicio
+print(json.dumps({'segundos': segundos, 'errores': len(app.exception),
+                  'cargados': [p for p in sys.argv[2:] if p in sys.modules]}))
+"""
+
+def medir_importacion(modulos):
+    """
+    Importa streamlit y los módulos dados con -X importtime en un proceso nuevo.
+
+    Returns:
+        dict: 'streamlit' y 'pagina' (segundos acumulados) y 'por_paquete'
+        (segundos propios de los imports de la página agrupados por paquete raíz)
+    """
+    codigo = "import streamlit\n" + "".join(f"import {modulo}\n" for modulo in modulos)
+    proceso = subprocess.run([sys.executable, '-X', 'importtime', '-c', codigo], cwd=RAIZ,
+                             capture_output=True, text=True, check=True)
+
+    tiempo_streamlit = 0.0
+    tiempo_pagina = 0.0
+    por_paquete = defaultdict(float)
+    despues_de_streamlit = False
+    for linea in proceso.stderr.splitlines():
+        coincidencia = PATRON_IMPORTTIME.match(linea)
+        if coincidencia is None:
+            continue
+        propio, acumulado, sangria, nombre = coincidencia.groups()
+        if not sangria and nombre == 'streamlit':
+            tiempo_streamlit = int(acumulado) / 1e6
+            despues_de_streamlit = True
+            continue
+        if not despues_de_streamlit:
+            continue
+        # importtime lista cada módulo antes que quien lo importó: los de primer nivel acumulan todo
+        if not sangria:
+            tiempo_pagina += int(acumulado) / 1e6
+        por_paquete[nombre.split('.')[0]] += int(propio) / 1e6
+
+    return {'streamlit': tiempo_streamlit, 'pagina': tiempo_pagina, 'por_paquete': dict(por_paquete)}
+
+def medir_primer_render(pagina):
+    """Primer render de la página con AppTest en un proceso nuevo"""
+    proceso = subprocess.run([sys.executable, '-c', SCRIPT_RENDER, pagina, *PAQUETES_PESADOS], cwd=RAIZ,
+                             capture_output=True, text=True, check=True)
+    return json.loads(proceso.stdout.strip().splitlines()[-1])
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument('--detalle', type=int, default=0, help="Paquetes más pesados a listar por página")
+    args = parser.parse_args()
+
+    print(f"{'página':<16}{'streamlit (s)':>14}{'página (s)':>12}{'render (s)':>12}  paquetes pesados")
+    for pagina, modulos in PAGINAS.items():
+        importacion = medir_importacion(modulos)
+        render = medir_primer_render(pagina)
+        cargados = ', '.join(render['cargados']) or '-'
+        error = '  ❌ con errores' if render['errores'] else ''
+        print(f"{pagina:<16}{importacion['streamlit']:>14.2f}{importacion['pagina']:>12.2f}"
+              f"{render['segundos']:>12.2f}  {cargados}{error}")
+
+        if args.detalle:
+            pesados = sorted(importacion['por_paquete'].items(), key=lambda item: item[1], reverse=True)
+            for paquete, segundos in pesados[:args.detalle]:
+                print(f"{'':<18}{paquete:<24}{segundos:>8.3f} s")
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,81 @@
+"""
+Benchmark de memoria del canvas del reporte PDF.
+
+Construye reportes de muchas páginas con el canvas actual y con el esquema anterior
+(una copia de __dict__ por página) y compara el pico de memoria medido con tracemalloc.
+
+Uso:
+    python -m benchmarks.memoria_pdf [--paginas 500]
+"""
+import argparse
+import io
+import time
+import tracemalloc
+from reportlab.lib.pagesizes import letter
+from reportlab.lib.styles import getSampleStyleSheet
+from reportlab.pdfgen import canvas
+from reportlab.platypus import SimpleDocTemplate, Paragraph, PageBreak
+from utils.exportar import PDFConEncabezadoPiePagina
+
+FILAS_POR_PAGINA = 35
+
+class CanvasConCopias(PDFConEncabezadoPiePagina):
+    """Esquema anterior: guarda el estado completo de cada página hasta save()"""
+    
+    def showPage(self):
+        self.pages.append(dict(self.__dict__))
+        self._startPage()
+    
+    def save(self):
+        page_count = len(self.pages)
+        for page_num, page in enumerate(self.pages, start=1):
+            self.__dict__.update(page)
+            self.draw_page_elements(page_num)
+            canvas.Canvas.showPage(self)
+        for page_num in range(1, page_count + 1):
+            self.beginForm(f'numero_pagina_{page_num}')
+            self.draw_page_number(page_num, page_count)
+            self.endForm()
+        canvas.Canvas.save(self)
+
+def _copias_canvas(*args, **kwargs):
+    lienzo = CanvasConCopias(*args, **kwargs)
+    lienzo.pages = []
+    return lienzo
+
+def medir(paginas, canvasmaker):
+    """Construye un reporte de `paginas` páginas; devuelve (pico en bytes, segundos, tamaño del PDF)"""
+    estilo = getSampleStyleSheet()['Normal']
+    elementos = []
+    for pagina in range(paginas):
+        for fila in range(FILAS_POR_PAGINA):
+            elementos.append(Paragraph(f"Periodo {pagina * FILAS_POR_PAGINA + fila + 1}: $ {fila * 1234.5:,.2f}", estilo))
+        elementos.append(PageBreak())
+    
+    buffer = io.BytesIO()
+    doc = SimpleDocTemplate(buffer, pagesize=letter, topMargin=80, bottomMargin=70)
+    
+    # Solo cuenta lo que crece durante la construcción (los elementos ya existen)
+    tracemalloc.start()
+    base, _ = tracemalloc.get_traced_memory()
+    inicio = time.perf_counter()
+    doc.build(elementos, canvasmaker=canvasmaker)
+    segundos = time.perf_counter() - inicio
+    _, pico = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    return pico - base, segundos, buffer.getbuffer().nbytes
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument('--paginas', type=int, default=500)
+    args = parser.parse_args()
+    
+    print(f"{'canvas':<12}{'páginas':>9}{'pico (MB)':>12}{'KB/página':>12}{'segundos':>10}{'PDF (KB)':>10}")
+    for nombre, canvasmaker in (('actual', PDFConEncabezadoPiePagina), ('copias', _copias_canvas)):
+        for paginas in (args.paginas // 10, args.paginas):
+            pico, segundos, tamano = medir(paginas, canvasmaker)
+            print(f"{nombre:<12}{paginas:>9}{pico / 2**20:>12.1f}{pico / 1024 / paginas:>12.1f}"
+                  f"{segundos:>10.2f}{tamano / 1024:>10.0f}")
+
+if __name__ == '__main__':
+    main()
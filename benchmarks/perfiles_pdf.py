@@ -0,0 +1,66 @@
+"""
+Benchmark de los perfiles de exportación del reporte PDF.
+
+Genera el reporte completo (tres módulos y cinco gráficos) con cada perfil y
+muestra el tamaño del archivo y el tiempo de construcción. La última fila dibuja
+los gráficos de cartera y bonos como vectores (perfil impresion para el resto) y
+suma el tiempo de rasterización que se ahorra.
+
+Uso:
+    python -m benchmarks.perfiles_pdf
+"""
+import time
+from utils.calculos import (calcular_crecimiento_cartera, calcular_jubilacion, comparar_edades_retiro,
+                            calcular_valor_bono, calcular_sensibilidad_bono)
+from utils.exportar import PERFILES_EXPORTACION, _construir_pdf_reporte
+from utils.graficos import (rasterizar_grafico, crear_grafico_cartera, crear_grafico_jubilacion,
+                            crear_grafico_comparacion_jubilacion, crear_grafico_flujos_bono,
+                            crear_grafico_sensibilidad_bono)
+
+def datos_ejemplo():
+    """Datos de los tres módulos con los valores por defecto de la aplicación"""
+    df, saldo_final, total_aportes = calcular_crecimiento_cartera(10000, 500, 8, 360, 12)
+    datos_cartera = {'monto_inicial': 10000, 'aporte_periodico': 500, 'tea': 8, 'anos': 30,
+                     'saldo_final': saldo_final, 'df_detallado': df}
+    datos_jubilacion = calcular_jubilacion(saldo_final, total_aportes, 'extranjera', "Pensión Mensual", 20, 5.0)
+    df_flujos, vp_total = calcular_valor_bono(1000, 6, 'Semestral', 10, 8)
+    sensibilidad = calcular_sensibilidad_bono(1000, 6, 'Semestral', 10)
+    datos_bono = {'valor_nominal': 1000, 'tasa_cupon': 6, 'anos': 10, 'vp_total': vp_total,
+                  'df_flujos': df_flujos, 'df_sensibilidad': sensibilidad}
+    
+    graficos = [
+        (datos_cartera, 'grafico', crear_grafico_cartera(df)),
+        (datos_jubilacion, 'grafico', crear_grafico_jubilacion(datos_jubilacion)),
+        (datos_jubilacion, 'grafico_comparacion', crear_grafico_comparacion_jubilacion(
+            comparar_edades_retiro(datos_jubilacion['capital_neto'], 5.0))),
+        (datos_bono, 'grafico', crear_grafico_flujos_bono(df_flujos)),
+        (datos_bono, 'grafico_sensibilidad', crear_grafico_sensibilidad_bono(sensibilidad, 1000)),
+    ]
+    segundos_vectorizables = 0.0
+    for datos, clave, fig in graficos:
+        resultado = rasterizar_grafico(fig)
+        datos[clave] = resultado['imagen']
+        if datos is not datos_jubilacion:
+            segundos_vectorizables += resultado['segundos']
+    return (datos_cartera, datos_jubilacion, datos_bono), segundos_vectorizables
+
+def main():
+    datos, segundos_vectorizables = datos_ejemplo()
+    imagenes = sum(len(d[c]) for d in datos for c in ('grafico', 'grafico_comparacion', 'grafico_sensibilidad')
+                   if d.get(c) is not None)
+    print(f"Gráficos rasterizados: {imagenes / 1024:,.0f} KB en total\n")
+    print(f"Rasterizar los gráficos de cartera y bonos: {segundos_vectorizables:.2f} s\n")
+    print(f"{'perfil':<12}{'dpi':>6}{'formato':>9}{'PDF (KB)':>11}{'segundos':>10}")
+    for perfil, ajustes in PERFILES_EXPORTACION.items():
+        inicio = time.perf_counter()
+        tamano = len(_construir_pdf_reporte(*datos, False, perfil, graficos_vectoriales=False).getvalue())
+        segundos = time.perf_counter() - inicio
+        print(f"{perfil:<12}{ajustes['dpi']:>6}{ajustes['formato']:>9}{tamano / 1024:>11,.0f}{segundos:>10.2f}")
+    
+    inicio = time.perf_counter()
+    tamano = len(_construir_pdf_reporte(*datos, False, 'impresion', graficos_vectoriales=True).getvalue())
+    segundos = time.perf_counter() - inicio
+    print(f"{'vectorial':<12}{'-':>6}{'vector':>9}{tamano / 1024:>11,.0f}{segundos:>10.2f}")
+
+if __name__ == '__main__':
+    main()
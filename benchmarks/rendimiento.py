@@ -0,0 +1,229 @@
+"""
+Suite de benchmarks de los caminos críticos: cálculos, rasterización de gráficos y PDF.
+
+Mide cada caso varias veces (sin las cachés de resultados, para medir el trabajo
+real), escribe los resultados en JSON y los compara con una base guardada: un caso
+cuyo mejor tiempo empeora más que la tolerancia cuenta como regresión. Se compara el
+mínimo y no la mediana porque es el menos afectado por otros procesos de la máquina.
+
+Uso:
+    python -m benchmarks.rendimiento [--salida resultados.json] [--base benchmarks/base_rendimiento.json]
+                                     [--tolerancia 0.5] [--solo cartera,pdf] [--guardar-base]
+
+Con --guardar-base los resultados reemplazan la base (conviene generarla en la máquina
+de referencia). Sale con código 1 si hay regresiones.
+"""
+import argparse
+import json
+import os
+import platform
+import statistics
+import sys
+import time
+from datetime import datetime
+import numpy as np
+from utils.calculos import (calcular_crecimiento_cartera, calcular_pension_mensual, calcular_valor_bono,
+                            calcular_jubilacion, calcular_sensibilidad_bono)
+from utils.exportar import _construir_pdf_reporte
+from utils.graficos import (AJUSTES_EXPORTACION, CACHE_TRAZAS, _rasterizar_con_matplotlib,
+                            crear_grafico_cartera)
+from utils.renderizador import ErrorRenderizador, obtener_renderizador
+
+BASE_POR_DEFECTO = os.path.join(os.path.dirname(os.path.abspath(__file__)), 'base_rendimiento.json')
+
+# Horizontes (periodos) de los cálculos y filas del cronograma de los reportes
+HORIZONTES = (12, 120, 1200, 10000)
+PENSIONES_POR_LOTE = 10000
+FILAS_REPORTE = (120, 1200, 6000)
+
+def medir(funcion, repeticiones=7, minimo=0.05):
+    """
+    Mide una función sin argumentos. Una pasada previa de `minimo` segundos calienta
+    cachés e imports y fija cuántas veces se ejecuta la función en cada repetición.
+
+    Returns:
+        dict: 'mediana' y 'minimo' (segundos por llamada), 'repeticiones' e 'iteraciones'
+    """
+    iteraciones = 0
+    inicio = time.perf_counter()
+    while time.perf_counter() - inicio < minimo:
+        funcion()
+        iteraciones += 1
+
+    tiempos = []
+    for _ in range(repeticiones):
+        inicio = time.perf_counter()
+        for _ in range(iteraciones):
+            funcion()
+        tiempos.append((time.perf_counter() - inicio) / iteraciones)
+    return {
+        'mediana': statistics.median(tiempos),
+        'minimo': min(tiempos),
+        'repeticiones': repeticiones,
+        'iteraciones': iteraciones
+    }
+
+def casos_calculos():
+    """Cálculos de cartera y bono por horizonte, y pensiones en lote (sin caché)"""
+    cartera = calcular_crecimiento_cartera.__wrapped__
+    bono = calcular_valor_bono.__wrapped__
+    pension = calcular_pension_mensual.__wrapped__
+
+    for periodos in HORIZONTES:
+        yield f"cartera/{periodos}", lambda periodos=periodos: cartera(10000, 500, 8, periodos, 12)
+    for periodos in HORIZONTES:
+        # Cupón mensual: el número de flujos es anos * 12
+        anos = max(1, round(periodos / 12))
+        yield f"bono/{anos * 12}", lambda anos=anos: bono(1000, 6, 'Mensual', anos, 8)
+
+    rng = np.random.default_rng(0)
+    parametros = list(zip(rng.uniform(1e4, 2e6, PENSIONES_POR_LOTE).tolist(),
+                          rng.uniform(0, 12, PENSIONES_POR_LOTE).tolist(),
+                          rng.integers(5, 40, PENSIONES_POR_LOTE).tolist()))
+    yield f"pension/{PENSIONES_POR_LOTE}", lambda: [pension(c, t, a) for c, t, a in parametros]
+
+def casos_graficos():
+    """Rasterización de un gráfico de cartera por Kaleido y por matplotlib (sin cachés)"""
+    df, _, _ = calcular_crecimiento_cartera(10000, 500, 8, 360, 12)
+    fig = crear_grafico_cartera(df)
+
+    # El primer render arranca el proceso de Kaleido y confirma que funciona (requiere Chrome)
+    renderizador = obtener_renderizador()
+    try:
+        disponible = renderizador.disponible() and \
+            renderizador.renderizar_lote([fig], AJUSTES_EXPORTACION)[0]['imagen'] is not None
+    except ErrorRenderizador:
+        disponible = False
+    yield "grafico/kaleido", (lambda: renderizador.renderizar_lote([fig], AJUSTES_EXPORTACION)) if disponible else None
+
+    def matplotlib():
+        # Sin la caché de conversiones se mide también la traducción de la figura
+        CACHE_TRAZAS.limpiar()
+        _rasterizar_con_matplotlib(fig)
+    yield "grafico/matplotlib", matplotlib
+
+def casos_pdf():
+    """Reporte con el cronograma completo de distintos tamaños (gráficos vectoriales, sin caché)"""
+    for filas in FILAS_REPORTE:
+        df, saldo_final, total_aportes = calcular_crecimiento_cartera(10000, 500, 8, filas, 12)
+        datos_cartera = {'monto_inicial': 10000, 'aporte_periodico': 500, 'tea': 8, 'anos': filas // 12,
+                         'saldo_final': saldo_final, 'df_detallado': df}
+        datos_jubilacion = calcular_jubilacion(saldo_final, total_aportes, 'extranjera', "Pensión Mensual", 20, 5.0)
+        df_flujos, vp_total = calcular_valor_bono(1000, 6, 'Semestral', 10, 8)
+        datos_bono = {'valor_nominal': 1000, 'tasa_cupon': 6, 'anos': 10, 'vp_total': vp_total,
+                      'df_flujos': df_flujos,
+                      'df_sensibilidad': calcular_sensibilidad_bono(1000, 6, 'Semestral', 10)}
+        yield f"pdf/{filas}", lambda datos=(datos_cartera, datos_jubilacion, datos_bono): _construir_pdf_reporte(
+            *datos, True, 'impresion', True)
+
+# Prefijos de los casos de cada grupo: los grupos no pedidos ni siquiera preparan sus datos
+GRUPOS = {('cartera', 'bono', 'pension'): casos_calculos, ('grafico',): casos_graficos, ('pdf',): casos_pdf}
+
+def ejecutar(solo=None, repeticiones=7, al_medir=None):
+    """
+    Ejecuta los casos cuyo nombre empieza con alguno de los prefijos de `solo` (todos si es None).
+
+    Returns:
+        dict: nombre -> resultado de medir (None si el caso no está disponible en esta máquina)
+    """
+    resultados = {}
+    for prefijos_grupo, generador in GRUPOS.items():
+        if solo and not any(p.startswith(g) or g.startswith(p) for p in solo for g in prefijos_grupo):
+            continue
+        for nombre, funcion in generador():
+            if solo and not any(nombre.startswith(prefijo) for prefijo in solo):
+                continue
+            resultados[nombre] = medir(funcion, repeticiones) if funcion is not None else None
+            if al_medir is not None:
+                al_medir(nombre, resultados[nombre])
+    return resultados
+
+def comparar(resultados, base, tolerancia):
+    """
+    Compara los mejores tiempos con los de la base.
+
+    Returns:
+        dict: nombre -> {'relacion': actual / base, 'estado': 'regresion', 'mejora', 'igual' o 'nuevo'}
+    """
+    comparacion = {}
+    for nombre, resultado in resultados.items():
+        anterior = base.get(nombre)
+        if resultado is None:
+            continue
+        if anterior is None:
+            comparacion[nombre] = {'relacion': None, 'estado': 'nuevo'}
+            continue
+        relacion = resultado['minimo'] / anterior['minimo']
+        if relacion > 1 + tolerancia:
+            estado = 'regresion'
+        elif relacion < 1 - tolerancia:
+            estado = 'mejora'
+        else:
+            estado = 'igual'
+        comparacion[nombre] = {'relacion': relacion, 'estado': estado}
+    return comparacion
+
+def _formato_tiempo(segundos):
+    if segundos >= 1:
+        return f"{segundos:.2f} s"
+    if segundos >= 1e-3:
+        return f"{segundos * 1e3:.2f} ms"
+    return f"{segundos * 1e6:.1f} µs"
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument('--salida', default='resultados_rendimiento.json', help="Archivo JSON de resultados")
+    parser.add_argument('--base', default=BASE_POR_DEFECTO, help="Archivo JSON de la base a comparar")
+    parser.add_argument('--tolerancia', type=float, default=0.5,
+                        help="Empeoramiento relativo del mejor tiempo que cuenta como regresión (0.5 = 50%%)")
+    parser.add_argument('--solo', help="Prefijos de casos separados por coma (cartera, bono, pension, grafico, pdf)")
+    parser.add_argument('--repeticiones', type=int, default=7)
+    parser.add_argument('--guardar-base', action='store_true', help="Guardar los resultados como nueva base")
+    args = parser.parse_args()
+
+    base = {}
+    if os.path.exists(args.base):
+        with open(args.base, encoding='utf-8') as archivo:
+            base = json.load(archivo)['resultados']
+
+    def al_medir(nombre, resultado):
+        if resultado is None:
+            print(f"{nombre:<22}{'no disponible':>14}", flush=True)
+            return
+        anterior = base.get(nombre)
+        relacion = f"{resultado['minimo'] / anterior['minimo']:>9.2f}x" if anterior else f"{'-':>10}"
+        print(f"{nombre:<22}{_formato_tiempo(resultado['mediana']):>14}{_formato_tiempo(resultado['minimo']):>14}"
+              f"{relacion}", flush=True)
+
+    print(f"{'caso':<22}{'mediana':>14}{'mínimo':>14}{'vs base':>10}")
+    solo = [prefijo.strip() for prefijo in args.solo.split(',')] if args.solo else None
+    resultados = ejecutar(solo, args.repeticiones, al_medir)
+    comparacion = comparar(resultados, base, args.tolerancia)
+
+    informe = {
+        'fecha': datetime.now().isoformat(timespec='seconds'),
+        'python': platform.python_version(),
+        'plataforma': platform.platform(),
+        'cpus': os.cpu_count(),
+        'tolerancia': args.tolerancia,
+        'resultados': resultados,
+        'comparacion': comparacion
+    }
+    with open(args.salida, 'w', encoding='utf-8') as archivo:
+        json.dump(informe, archivo, indent=2, ensure_ascii=False)
+    if args.guardar_base:
+        informe_base = {clave: valor for clave, valor in informe.items() if clave != 'comparacion'}
+        with open(args.base, 'w', encoding='utf-8') as archivo:
+            json.dump(informe_base, archivo, indent=2, ensure_ascii=False)
+
+    regresiones = [nombre for nombre, c in comparacion.items() if c['estado'] == 'regresion']
+    print(f"\nResultados en {args.salida}" + (f" (base actualizada: {args.base})" if args.guardar_base else ""))
+    if regresiones:
+        print(f"❌ {len(regresiones)} regresiones: {', '.join(regresiones)}")
+        return 1
+    if base:
+        print("✅ Sin regresiones respecto de la base")
+    return 0
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -1,12 +1,14 @@
 import streamlit as st
 import plotly.graph_objects as go
-from utils.calculos import calcular_valor_bono
-from utils.validaciones import validar_monto, validar_tea, validar_anos
-from utils.graficos import exportar_grafico_a_imagen
-import io
-import base64
+import pandas as pd
+import time
+from utils.calculos import calcular_valor_bono, calcular_sensibilidad_bono, calcular_ytm_bono, valorar_cartera_bonos
+from modules.comun import mostrar_errores, pedir_calculo, resultados_sesion, medir_etapa, seccion_medida
+from utils.validaciones import validar_monto, validar_tea, validar_anos, validar_cartera_bonos
+from utils.graficos import ImagenPendiente, crear_grafico_flujos_bono, crear_grafico_sensibilidad_bono
 
 
+@seccion_medida('pagina/bonos')
 def mostrar_modulo_bonos():
     st.header("📈 Módulo C: Proyeccion de Bonos")
     st.markdown("---")
@@ -20,8 +22,21 @@ def mostrar_modulo_bonos():
         - **TEA mercado**: Tasa de retorno que exiges.
         
         El valor presente te dice cuánto deberías pagar hoy por ese bono.
+        
+        En el modo **Cartera de bonos (CSV)** puedes subir un archivo con muchos bonos
+        y valorarlos todos a la vez.
         """)
     
+    modo = st.radio(
+        "Modo de valoración",
+        ["Bono individual", "Cartera de bonos (CSV)"],
+        horizontal=True
+    )
+    
+    if modo == "Cartera de bonos (CSV)":
+        mostrar_cartera_bonos()
+        return
+    
     col1, col2 = st.columns(2)
     
     with col1:
@@ -80,145 +95,271 @@ def mostrar_modulo_bonos():
     
     st.markdown("---")
     
-    if st.button("🔍 Calcular Valor del Bono", type="primary", use_container_width=True):
-        if not all([validar_monto(valor_nominal, "Valor nominal"),
-                   validar_tea(tasa_cupon),
-                   validar_tea(tea_mercado),
-                   validar_anos(anos, "Plazo")]):
+    parametros = {
+        'valor_nominal': valor_nominal,
+        'tasa_cupon': tasa_cupon,
+        'frecuencia_pago': frecuencia_pago,
+        'anos': anos,
+        'tea_mercado': tea_mercado
+    }
+    motivo = pedir_calculo('bono', parametros, "🔍 Calcular Valor del Bono")
+    
+    if motivo:
+        if not mostrar_errores(validar_monto(valor_nominal, "Valor nominal"),
+                               validar_tea(tasa_cupon),
+                               validar_tea(tea_mercado),
+                               validar_anos(anos, "Plazo")):
             return
         
-        df_flujos, vp_total = calcular_valor_bono(
-            valor_nominal, tasa_cupon, frecuencia_pago, anos, tea_mercado
-        )
+        with medir_etapa('calculo/bono', anos=anos, frecuencia=frecuencia_pago):
+            df_flujos, vp_total = calcular_valor_bono(
+                valor_nominal, tasa_cupon, frecuencia_pago, anos, tea_mercado
+            )
         
-        st.session_state['bono_df'] = df_flujos
+        resultados_sesion().guardar(
+            'bono_df', df_flujos,
+            recalcular=lambda: calcular_valor_bono(
+                valor_nominal, tasa_cupon, frecuencia_pago, anos, tea_mercado
+            )[0]
+        )
         st.session_state['bono_vp'] = vp_total
-        st.session_state['bono_params'] = {
-            'valor_nominal': valor_nominal,
-            'tasa_cupon': tasa_cupon,
-            'frecuencia_pago': frecuencia_pago,
-            'anos': anos,
-            'tea_mercado': tea_mercado
-        }
+        st.session_state['bono_params'] = parametros
         
-        st.success("✅ Valoración completada exitosamente")
+        if motivo == 'boton':
+            st.success("✅ Valoración completada exitosamente")
     
     if 'bono_vp' in st.session_state:
-        st.markdown("---")
-        st.subheader("📊 Resultados de Valoración")
+        # Cada sección es un fragmento: sus widgets solo vuelven a ejecutar esa sección
+        mostrar_resultados_bono()
+        mostrar_ytm_bono()
+        mostrar_sensibilidad_bono()
+
+
+@st.fragment
+@seccion_medida('seccion/bono_resultados')
+def mostrar_resultados_bono():
+    st.markdown("---")
+    st.subheader("📊 Resultados de Valoración")
+    
+    params = st.session_state['bono_params']
+    vp = st.session_state['bono_vp']
+    
+    diferencia = vp - params['valor_nominal']
+    porcentaje = (diferencia / params['valor_nominal']) * 100
+    
+    col1, col2, col3 = st.columns(3)
+    col1.metric("Valor Nominal", f"${params['valor_nominal']:,.2f}")
+    col2.metric("Valor Presente", f"${vp:,.2f}", delta=f"{porcentaje:+.2f}%")
+    col3.metric("Diferencia", f"${diferencia:,.2f}")
+    
+    if vp > params['valor_nominal']:
+        st.success("✅ El bono está **sobrevaluado** (vale más que su valor nominal)")
+        st.write("💡 La tasa cupón es mayor que la tasa de mercado")
+    elif vp < params['valor_nominal']:
+        st.warning("⚠️ El bono está **subvaluado** (vale menos que su valor nominal)")
+        st.write("💡 La tasa cupón es menor que la tasa de mercado")
+    else:
+        st.info("📌 El bono está **a la par** (vale igual que su valor nominal)")
+    
+    st.markdown("---")
+    st.subheader("📊 Flujos de Caja del Bono")
+    
+    resultados = resultados_sesion()
+    df = resultados['bono_df']
+    
+    fig = crear_grafico_flujos_bono(df)
+    
+    # Con una clave fija el navegador actualiza el gráfico existente en lugar de volver a montarlo
+    with medir_etapa('envio/flujos_bono'):
+        st.plotly_chart(fig, use_container_width=True, key='grafico_flujos_bono')
+    
+    # La imagen para el PDF se rasteriza en segundo plano solo al exportar. La receta
+    # captura solo los parámetros: si capturara la vista, la sesión nunca se liberaría
+    resultados.guardar(
+        'bono_grafico', ImagenPendiente(fig),
+        recalcular=lambda: ImagenPendiente(crear_grafico_flujos_bono(calcular_valor_bono(
+            params['valor_nominal'], params['tasa_cupon'], params['frecuencia_pago'], params['anos'],
+            params['tea_mercado']
+        )[0]))
+    )
+    
+    with st.expander("📋 Ver Tabla Detallada de Flujos"):
+        st.dataframe(df.round(2), use_container_width=True, hide_index=True)
+        st.write(f"**Valor Presente Total: ${vp:,.2f}**")
+
+
+@st.fragment
+@seccion_medida('seccion/bono_ytm')
+def mostrar_ytm_bono():
+    params = st.session_state['bono_params']
+    vp = st.session_state['bono_vp']
+    
+    with st.expander("🎯 Rendimiento al Vencimiento (YTM)"):
+        st.write("Ingresa el precio observado del bono para obtener la TEA implícita.")
         
-        params = st.session_state['bono_params']
-        vp = st.session_state['bono_vp']
+        precio_observado = st.number_input(
+            "Precio Observado (USD)",
+            min_value=0.01,
+            value=max(round(float(vp), 2), 0.01),
+            step=10.0,
+            help="Precio al que se negocia el bono en el mercado"
+        )
         
-        diferencia = vp - params['valor_nominal']
-        porcentaje = (diferencia / params['valor_nominal']) * 100
+        with medir_etapa('calculo/ytm'):
+            ytm = calcular_ytm_bono(
+                precio_observado,
+                params['valor_nominal'],
+                params['tasa_cupon'],
+                params['frecuencia_pago'],
+                params['anos']
+            )
         
-        col1, col2, col3 = st.columns(3)
-        col1.metric("Valor Nominal", f"${params['valor_nominal']:,.2f}")
-        col2.metric("Valor Presente", f"${vp:,.2f}", delta=f"{porcentaje:+.2f}%")
-        col3.metric("Diferencia", f"${diferencia:,.2f}")
-        
-        if vp > params['valor_nominal']:
-            st.success("✅ El bono está **sobrevaluado** (vale más que su valor nominal)")
-            st.write("💡 La tasa cupón es mayor que la tasa de mercado")
-        elif vp < params['valor_nominal']:
-            st.warning("⚠️ El bono está **subvaluado** (vale menos que su valor nominal)")
-            st.write("💡 La tasa cupón es menor que la tasa de mercado")
+        if ytm['convergio'][0]:
+            col1, col2 = st.columns(2)
+            col1.metric("YTM (TEA implícita)", f"{ytm['tea'][0]:.4f}%")
+            col2.metric("Iteraciones", f"{ytm['iteraciones'][0]}")
         else:
-            st.info("📌 El bono está **a la par** (vale igual que su valor nominal)")
-        
-        st.markdown("---")
-        st.subheader("📊 Flujos de Caja del Bono")
-        
-        df = st.session_state['bono_df']
-        
-        fig = go.Figure()
-        
-        fig.add_trace(go.Bar(
-            x=df['Periodo'],
-            y=df['Flujo'],
-            name='Flujo de Caja',
-            marker_color='lightblue',
-            text=df['Flujo'].apply(lambda x: f"${x:,.0f}"),
-            textposition='outside'
-        ))
-        
-        fig.add_trace(go.Scatter(
-            x=df['Periodo'],
-            y=df['VP Flujo'],
-            name='VP de Flujo',
-            mode='lines+markers',
-            line=dict(color='red', width=2),
-            marker=dict(size=8)
-        ))
-        
-        fig.update_layout(
-            title='Flujos de Caja y Valor Presente',
-            xaxis_title='Periodo',
-            yaxis_title='Monto (USD)',
-            template='plotly_white',
-            hovermode='x unified'
-        )
+            st.warning("⚠️ No existe una TEA que iguale los flujos del bono a ese precio")
 
+
+@st.fragment
+@seccion_medida('seccion/bono_sensibilidad')
+def mostrar_sensibilidad_bono():
+    params = st.session_state['bono_params']
+    resultados = resultados_sesion()
+    
+    with st.expander("📈 Análisis de Sensibilidad"):
+        st.subheader("Valor del Bono según TEA de Mercado")
         
+        with medir_etapa('calculo/sensibilidad'):
+            sensibilidad = calcular_sensibilidad_bono(
+                params['valor_nominal'],
+                params['tasa_cupon'],
+                params['frecuencia_pago'],
+                params['anos']
+            )
+            
+            actual = calcular_sensibilidad_bono(
+                params['valor_nominal'],
+                params['tasa_cupon'],
+                params['frecuencia_pago'],
+                params['anos'],
+                [params['tea_mercado']]
+            ).iloc[0]
         
-        st.plotly_chart(fig, use_container_width=True)
+        col1, col2, col3 = st.columns(3)
+        col1.metric("Duración Macaulay", f"{actual['Duración Macaulay']:.2f} años")
+        col2.metric("Duración Modificada", f"{actual['Duración Modificada']:.2f}")
+        col3.metric("Convexidad", f"{actual['Convexidad']:.2f}")
         
-        # Exportar gráfico para PDF
-        img_data = exportar_grafico_a_imagen(fig)
-        if img_data:
-            st.session_state['bono_grafico'] = img_data
+        fig_sens = crear_grafico_sensibilidad_bono(sensibilidad, params['valor_nominal'])
         
-        with st.expander("📋 Ver Tabla Detallada de Flujos"):
-            st.dataframe(df, use_container_width=True, hide_index=True)
-            st.write(f"**Valor Presente Total: ${vp:,.2f}**")
+        with medir_etapa('envio/sensibilidad_bono'):
+            st.plotly_chart(fig_sens, use_container_width=True, key='grafico_sensibilidad_bono')
         
-        with st.expander("📈 Análisis de Sensibilidad"):
-            st.subheader("Valor del Bono según TEA de Mercado")
-            
-            tasas = [i for i in range(0, 21)]
-            valores = []
-            
-            for tasa in tasas:
-                _, vp_temp = calcular_valor_bono(
-                    params['valor_nominal'],
-                    params['tasa_cupon'],
-                    params['frecuencia_pago'],
-                    params['anos'],
-                    tasa
-                )
-                valores.append(vp_temp)
-            
-            fig_sens = go.Figure()
-            
-            fig_sens.add_trace(go.Scatter(
-                x=tasas,
-                y=valores,
-                mode='lines+markers',
-                line=dict(color='green', width=3),
-                marker=dict(size=8)
+        # La imagen para el PDF se rasteriza en segundo plano solo al exportar
+        resultados.guardar(
+            'bono_grafico_sensibilidad', ImagenPendiente(fig_sens),
+            recalcular=lambda: ImagenPendiente(crear_grafico_sensibilidad_bono(
+                calcular_sensibilidad_bono(
+                    params['valor_nominal'], params['tasa_cupon'], params['frecuencia_pago'], params['anos']
+                ),
+                params['valor_nominal']
             ))
-            
-            fig_sens.add_hline(
-                y=params['valor_nominal'],
-                line_dash="dash",
-                line_color="red",
-                annotation_text=f"Valor Nominal: ${params['valor_nominal']:,.0f}"
+        )
+        resultados.guardar(
+            'bono_sensibilidad', sensibilidad,
+            recalcular=lambda: calcular_sensibilidad_bono(
+                params['valor_nominal'], params['tasa_cupon'], params['frecuencia_pago'], params['anos']
             )
-            
-            fig_sens.update_layout(
-                title='Valor del Bono vs TEA de Mercado',
-                xaxis_title='TEA de Mercado (%)',
-                yaxis_title='Valor Presente (USD)',
-                template='plotly_white'
+        )
+        
+        st.info("💡 A mayor tasa de mercado, menor es el valor presente del bono. "
+                "La duración modificada aproxima el % de cambio del precio ante un cambio de 1 punto en la TEA.")
+
+
+def mostrar_cartera_bonos():
+    st.subheader("📂 Valoración de Cartera de Bonos")
+    
+    st.write("""
+    Sube un archivo CSV con una fila por bono y las columnas:
+    `valor_nominal`, `tasa_cupon`, `frecuencia_pago`, `anos`, `tea_mercado`.
+    La frecuencia puede ser el nombre (Anual, Semestral, ...) o los pagos por año (1, 2, ...).
+    Si incluyes una columna opcional `precio`, también se calcula el YTM de cada bono.
+    """)
+    
+    archivo = st.file_uploader("Archivo de bonos (CSV)", type=["csv"])
+    
+    if archivo is None:
+        return
+    
+    try:
+        bonos = pd.read_csv(archivo)
+    except Exception as e:
+        st.error(f"❌ No se pudo leer el archivo: {str(e)}")
+        return
+    
+    bonos.columns = [str(columna).strip().lower() for columna in bonos.columns]
+    
+    if not mostrar_errores(validar_cartera_bonos(bonos)):
+        return
+    
+    inicio = time.perf_counter()
+    with medir_etapa('calculo/cartera_bonos', bonos=len(bonos)):
+        resultados, escalera = valorar_cartera_bonos(bonos)
+        if 'precio' in bonos.columns:
+            ytm = calcular_ytm_bono(
+                pd.to_numeric(bonos['precio'], errors='coerce').to_numpy(),
+                resultados['valor_nominal'].to_numpy(),
+                resultados['tasa_cupon'].to_numpy(),
+                resultados['frecuencia_pago'].to_numpy(),
+                resultados['anos'].to_numpy()
             )
-            
-            st.plotly_chart(fig_sens, use_container_width=True)
-            
-            # Exportar gráfico de sensibilidad para PDF
-            img_data_sens = exportar_grafico_a_imagen(fig_sens)
-            if img_data_sens:
-                st.session_state['bono_grafico_sensibilidad'] = img_data_sens
-            
-            st.info("💡 A mayor tasa de mercado, menor es el valor presente del bono")
-    
\ No newline at end of file
+            resultados['YTM'] = ytm['tea']
+    duracion = time.perf_counter() - inicio
+    
+    st.markdown("---")
+    st.subheader("📊 Resultados de la Cartera")
+    
+    col1, col2, col3 = st.columns(3)
+    col1.metric("Bonos Valorados", f"{len(resultados):,}")
+    col2.metric("Valor Nominal Total", f"${resultados['valor_nominal'].sum():,.2f}")
+    col3.metric("Valor Presente Total", f"${resultados['VP'].sum():,.2f}")
+    st.caption(f"⏱️ Valoración completada en {duracion * 1000:,.1f} ms")
+    
+    fig = go.Figure()
+    fig.add_trace(go.Bar(
+        x=escalera['Mes'],
+        y=escalera['Flujo'],
+        name='Flujo de Caja',
+        marker_color='lightblue'
+    ))
+    fig.add_trace(go.Scatter(
+        x=escalera['Mes'],
+        y=escalera['VP Flujo'],
+        name='VP de Flujo',
+        mode='lines',
+        line=dict(color='red', width=2)
+    ))
+    fig.update_layout(
+        title='Escalera de Flujos de la Cartera',
+        xaxis_title='Mes',
+        yaxis_title='Monto (USD)',
+        template='plotly_white',
+        hovermode='x unified'
+    )
+    st.plotly_chart(fig, use_container_width=True)
+    
+    with st.expander("📋 Ver Valoración por Bono"):
+        st.dataframe(resultados.round(2), use_container_width=True, hide_index=True)
+    
+    with st.expander("📋 Ver Escalera de Flujos"):
+        st.dataframe(escalera.round(2), use_container_width=True, hide_index=True)
+    
+    st.download_button(
+        label="📥 Descargar Valoración (CSV)",
+        data=resultados.to_csv(index=False).encode('utf-8'),
+        file_name="valoracion_bonos.csv",
+        mime="text/csv",
+        use_container_width=True
+    )
@@ -1,10 +1,23 @@
 import streamlit as st
 import plotly.graph_objects as go
-from utils.calculos import calcular_crecimiento_cartera
+from utils.calculos import (calcular_crecimiento_cartera, calcular_aporte_requerido,
+                            calcular_plazo_requerido, calcular_tea_requerida)
+import numpy as np
+import pandas as pd
+from modules.comun import mostrar_errores, pedir_calculo, resultados_sesion, medir_etapa, seccion_medida
 from utils.validaciones import validar_monto, validar_tea, validar_anos
-from utils.graficos import exportar_grafico_a_imagen
-import io
+from utils.graficos import ImagenPendiente, crear_grafico_cartera
+from utils.montecarlo import simular_cartera_montecarlo
 
+def tabla_cartera(parametros):
+    """Cronograma de la cartera a partir de st.session_state['cartera_params'] (recetas del almacén)"""
+    periodos_anuales = {"Mensual": 12, "Trimestral": 4, "Semestral": 2, "Anual": 1}[parametros['frecuencia']]
+    return calcular_crecimiento_cartera(
+        parametros['monto_inicial'], parametros['aporte_periodico'], parametros['tea'],
+        parametros['anos'] * periodos_anuales, periodos_anuales
+    )[0]
+
+@seccion_medida('pagina/cartera')
 def mostrar_modulo_cartera():
     st.header("📊 Módulo A: Crecimiento de Cartera")
     st.markdown("---")
@@ -16,6 +29,12 @@ def mostrar_modulo_cartera():
         - **Aportes periódicos**: Dinero que agregarás regularmente
         - **TEA**: Tasa de interés anual esperada
         - **Plazo**: Años que mantendrás la inversión
+        
+        En el modo **Monte Carlo** la TEA se toma como rendimiento esperado y se simulan
+        muchas trayectorias con rendimientos aleatorios según la volatilidad indicada.
+        
+        En el modo **Meta** indicas el saldo que quieres alcanzar y la calculadora obtiene
+        el aporte, la TEA o el plazo necesarios.
         """)
     
     col1, col2 = st.columns(2)
@@ -81,80 +100,311 @@ def mostrar_modulo_cartera():
     
     st.markdown("---")
     
-    if st.button("🚀 Calcular Proyección", type="primary", use_container_width=True):
-        if not all([validar_monto(monto_inicial, "Monto inicial"),
-                   validar_monto(aporte_periodico, "Aporte periódico"),
-                   validar_tea(tea),
-                   validar_anos(anos)]):
+    modo = st.radio(
+        "Tipo de proyección",
+        ["Tasa constante", "Monte Carlo", "Meta"],
+        horizontal=True,
+        help="Monte Carlo simula rendimientos aleatorios; Meta calcula lo necesario para llegar a un saldo"
+    )
+    
+    if modo == "Monte Carlo":
+        mostrar_montecarlo(monto_inicial, aporte_periodico, frecuencia, tea, anos)
+        return
+    
+    if modo == "Meta":
+        mostrar_meta(monto_inicial, aporte_periodico, frecuencia, tea, anos)
+        return
+    
+    parametros = {
+        'monto_inicial': monto_inicial,
+        'aporte_periodico': aporte_periodico,
+        'tea': tea,
+        'anos': anos,
+        'frecuencia': frecuencia
+    }
+    motivo = pedir_calculo('cartera', parametros, "🚀 Calcular Proyección")
+    
+    if motivo:
+        if not mostrar_errores(validar_monto(monto_inicial, "Monto inicial"),
+                               validar_monto(aporte_periodico, "Aporte periódico"),
+                               validar_tea(tea),
+                               validar_anos(anos)):
             return
         
         frecuencias = {"Mensual": 12, "Trimestral": 4, "Semestral": 2, "Anual": 1}
         periodos_anuales = frecuencias[frecuencia]
         periodos_totales = anos * periodos_anuales
         
-        df, saldo_final, total_aportes = calcular_crecimiento_cartera(
-            monto_inicial, aporte_periodico, tea, periodos_totales, periodos_anuales
-        )
+        with medir_etapa('calculo/cartera', periodos=periodos_totales):
+            df, saldo_final, total_aportes = calcular_crecimiento_cartera(
+                monto_inicial, aporte_periodico, tea, periodos_totales, periodos_anuales
+            )
         
-        st.session_state['cartera_df'] = df
+        resultados_sesion().guardar('cartera_df', df, recalcular=lambda: tabla_cartera(parametros))
         st.session_state['cartera_saldo_final'] = saldo_final
         st.session_state['cartera_total_aportes'] = total_aportes
-        st.session_state['cartera_params'] = {
-            'monto_inicial': monto_inicial,
-            'aporte_periodico': aporte_periodico,
-            'tea': tea,
-            'anos': anos,
-            'frecuencia': frecuencia
-        }
+        st.session_state['cartera_params'] = parametros
         
-        st.success("✅ Cálculo completado exitosamente")
+        if motivo == 'boton':
+            st.success("✅ Cálculo completado exitosamente")
     
     if 'cartera_saldo_final' in st.session_state:
-        st.markdown("---")
-        st.subheader("📈 Resultados")
-        
-        ganancia = st.session_state['cartera_saldo_final'] - st.session_state['cartera_total_aportes']
-        
-        col1, col2, col3 = st.columns(3)
-        col1.metric("Total Aportado", f"${st.session_state['cartera_total_aportes']:,.2f}")
-        col2.metric("Ganancia", f"${ganancia:,.2f}")
-        col3.metric("Saldo Final", f"${st.session_state['cartera_saldo_final']:,.2f}")
-        
-        st.subheader("📊 Gráfica de Crecimiento")
-        
-        df = st.session_state['cartera_df']
-        
-        fig = go.Figure()
-        fig.add_trace(go.Scatter(
-            x=df['Periodo'],
-            y=df['Total Aportes'],
-            mode='lines',
-            name='Aportes Acumulados',
-            line=dict(color='#636EFA', width=2)
-        ))
-        fig.add_trace(go.Scatter(
-            x=df['Periodo'],
-            y=df['Saldo'],
-            mode='lines',
-            name='Saldo Total',
-            line=dict(color='#00CC96', width=3),
-            fill='tonexty'
-        ))
-        
-        fig.update_layout(
-            title='Evolución de la Inversión',
-            xaxis_title='Periodo',
-            yaxis_title='Monto (USD)',
-            hovermode='x unified',
-            template='plotly_white'
+        # Los resultados son un fragmento: se vuelven a ejecutar aparte del formulario
+        mostrar_resultados_cartera()
+
+
+@st.fragment
+@seccion_medida('seccion/cartera_resultados')
+def mostrar_resultados_cartera():
+    st.markdown("---")
+    st.subheader("📈 Resultados")
+    
+    ganancia = st.session_state['cartera_saldo_final'] - st.session_state['cartera_total_aportes']
+    
+    col1, col2, col3 = st.columns(3)
+    col1.metric("Total Aportado", f"${st.session_state['cartera_total_aportes']:,.2f}")
+    col2.metric("Ganancia", f"${ganancia:,.2f}")
+    col3.metric("Saldo Final", f"${st.session_state['cartera_saldo_final']:,.2f}")
+    
+    st.subheader("📊 Gráfica de Crecimiento")
+    
+    resultados = resultados_sesion()
+    df = resultados['cartera_df']
+    
+    fig = crear_grafico_cartera(df)
+    
+    # Con una clave fija el navegador actualiza el gráfico existente en lugar de volver a montarlo
+    with medir_etapa('envio/cartera'):
+        st.plotly_chart(fig, use_container_width=True, key='grafico_cartera')
+    
+    # La imagen para el PDF se rasteriza en segundo plano solo al exportar. La receta
+    # captura solo los parámetros: si capturara la vista, la sesión nunca se liberaría
+    params = st.session_state['cartera_params']
+    resultados.guardar(
+        'cartera_grafico', ImagenPendiente(fig),
+        recalcular=lambda: ImagenPendiente(crear_grafico_cartera(tabla_cartera(params)))
+    )
+    
+    with st.expander("📋 Ver Tabla Detallada"):
+        st.dataframe(df.round(2), use_container_width=True, hide_index=True)
+
+
+@st.fragment
+@seccion_medida('seccion/cartera_montecarlo')
+def mostrar_montecarlo(monto_inicial, aporte_periodico, frecuencia, tea, anos):
+    col1, col2 = st.columns(2)
+    
+    with col1:
+        volatilidad = st.number_input(
+            "Volatilidad Anual (%)",
+            min_value=0.0,
+            max_value=100.0,
+            value=15.0,
+            step=1.0,
+            help="Desviación estándar anual de los rendimientos"
+        )
+        
+        distribucion = st.selectbox(
+            "Distribución de Rendimientos",
+            ["lognormal", "normal"],
+            format_func=lambda x: "Lognormal" if x == "lognormal" else "Normal",
+            help="Lognormal evita pérdidas mayores al 100% en un periodo"
+        )
+        
+        meta = st.number_input(
+            "Meta de Saldo (USD)",
+            min_value=0.0,
+            value=150000.0,
+            step=1000.0,
+            help="Saldo que quieres alcanzar al final del plazo"
+        )
+    
+    with col2:
+        n_trayectorias = st.select_slider(
+            "Número de Trayectorias",
+            options=[1_000, 10_000, 100_000, 1_000_000],
+            value=10_000,
+            format_func=lambda x: f"{x:,}"
+        )
+        
+        semilla = st.number_input(
+            "Semilla",
+            min_value=0,
+            value=42,
+            step=1,
+            help="Con la misma semilla se obtienen los mismos resultados"
+        )
+        
+        n_procesos = st.number_input(
+            "Procesos en Paralelo",
+            min_value=1,
+            max_value=16,
+            value=1,
+            help="Reparte la simulación entre varios procesos"
         )
+    
+    if st.button("🎲 Simular Escenarios", type="primary", use_container_width=True):
+        if not mostrar_errores(validar_monto(monto_inicial, "Monto inicial"),
+                               validar_monto(aporte_periodico, "Aporte periódico"),
+                               validar_tea(tea),
+                               validar_anos(anos)):
+            return
+        
+        frecuencias = {"Mensual": 12, "Trimestral": 4, "Semestral": 2, "Anual": 1}
+        periodos_anuales = frecuencias[frecuencia]
+        
+        def simular():
+            resultado = simular_cartera_montecarlo(
+                monto_inicial, aporte_periodico, tea, volatilidad,
+                anos * periodos_anuales, periodos_anuales,
+                n_trayectorias=n_trayectorias,
+                distribucion=distribucion,
+                meta=meta,
+                semilla=int(semilla),
+                n_procesos=int(n_procesos)
+            )
+            # Los saldos finales de todas las trayectorias no se guardan en la sesión
+            resultado.pop('saldos_finales')
+            resultado['meta'] = meta
+            return resultado
         
-        st.plotly_chart(fig, use_container_width=True)
+        with st.spinner("Simulando trayectorias..."), medir_etapa('calculo/montecarlo', trayectorias=n_trayectorias):
+            resultado = simular()
         
-        # Exportar gráfico para PDF
-        img_data = exportar_grafico_a_imagen(fig)
-        if img_data:
-            st.session_state['cartera_grafico'] = img_data
+        # Con la misma semilla, la simulación se repite idéntica si el almacén la expulsa
+        resultados_sesion().guardar('cartera_montecarlo', resultado, recalcular=simular)
         
-        with st.expander("📋 Ver Tabla Detallada"):
-            st.dataframe(df, use_container_width=True, hide_index=True)
\ No newline at end of file
+        st.success("✅ Simulación completada exitosamente")
+    
+    if 'cartera_montecarlo' in resultados_sesion():
+        mostrar_resultados_montecarlo()
+
+
+def mostrar_resultados_montecarlo():
+    resultado = resultados_sesion()['cartera_montecarlo']
+    finales = resultado['percentiles_finales']
+    
+    st.markdown("---")
+    st.subheader("📈 Resultados de la Simulación")
+    
+    col1, col2, col3, col4 = st.columns(4)
+    col1.metric("Escenario Pesimista (P5)", f"${finales['P5']:,.2f}")
+    col2.metric("Escenario Mediano (P50)", f"${finales['P50']:,.2f}")
+    col3.metric("Escenario Optimista (P95)", f"${finales['P95']:,.2f}")
+    col4.metric("Probabilidad de Meta", f"{resultado['prob_meta'] * 100:.1f}%")
+    
+    st.caption(
+        f"{resultado['n_trayectorias']:,} trayectorias simuladas · "
+        f"Total aportado: ${resultado['total_aportes']:,.2f}"
+    )
+    
+    bandas = resultado['bandas']
+    
+    fig = go.Figure()
+    fig.add_trace(go.Scatter(
+        x=bandas['Periodo'],
+        y=bandas['P5'],
+        mode='lines',
+        name='P5',
+        line=dict(color='#EF553B', width=1)
+    ))
+    fig.add_trace(go.Scatter(
+        x=bandas['Periodo'],
+        y=bandas['P95'],
+        mode='lines',
+        name='P95',
+        line=dict(color='#00CC96', width=1),
+        fill='tonexty',
+        fillcolor='rgba(99, 110, 250, 0.15)'
+    ))
+    fig.add_trace(go.Scatter(
+        x=bandas['Periodo'],
+        y=bandas['P50'],
+        mode='lines',
+        name='P50 (Mediana)',
+        line=dict(color='#636EFA', width=3)
+    ))
+    fig.add_hline(
+        y=resultado['meta'],
+        line_dash="dash",
+        line_color="red",
+        annotation_text=f"Meta: ${resultado['meta']:,.0f}"
+    )
+    fig.update_layout(
+        title='Bandas de Percentiles del Saldo',
+        xaxis_title='Periodo',
+        yaxis_title='Monto (USD)',
+        hovermode='x unified',
+        template='plotly_white'
+    )
+    
+    st.plotly_chart(fig, use_container_width=True)
+    
+    with st.expander("📋 Ver Tabla de Percentiles"):
+        st.dataframe(bandas.round(2), use_container_width=True, hide_index=True)
+
+
+@st.fragment
+@seccion_medida('seccion/cartera_meta')
+def mostrar_meta(monto_inicial, aporte_periodico, frecuencia, tea, anos):
+    col1, col2 = st.columns(2)
+    
+    with col1:
+        meta = st.number_input(
+            "Meta de Saldo (USD)",
+            min_value=0.0,
+            value=150000.0,
+            step=1000.0,
+            help="Saldo que quieres alcanzar"
+        )
+    
+    with col2:
+        incognita = st.selectbox(
+            "¿Qué quieres calcular?",
+            ["Aporte periódico", "TEA", "Plazo"],
+            help="Se usan los demás datos ingresados arriba"
+        )
+    
+    if not mostrar_errores(validar_monto(monto_inicial, "Monto inicial"),
+                           validar_monto(aporte_periodico, "Aporte periódico"),
+                           validar_monto(meta, "Meta"),
+                           validar_tea(tea),
+                           validar_anos(anos)):
+        return
+    
+    frecuencias = {"Mensual": 12, "Trimestral": 4, "Semestral": 2, "Anual": 1}
+    periodos_anuales = frecuencias[frecuencia]
+    periodos_totales = anos * periodos_anuales
+    
+    # Se resuelve la meta pedida y varias metas cercanas en una sola llamada vectorizada
+    multiplos = np.array([0.5, 0.75, 1.0, 1.25, 1.5, 2.0])
+    metas = meta * multiplos
+    
+    st.markdown("---")
+    st.subheader("🎯 Resultado")
+    
+    if incognita == "Aporte periódico":
+        valores = calcular_aporte_requerido(metas, monto_inicial, tea, periodos_totales, periodos_anuales)
+        textos = [f"${v:,.2f}" for v in valores]
+        st.metric(f"Aporte {frecuencia.lower()} requerido", textos[2])
+        st.info(f"Con ${monto_inicial:,.2f} iniciales y una TEA de {tea:.2f}% durante {anos} años")
+    elif incognita == "TEA":
+        valores = calcular_tea_requerida(metas, monto_inicial, aporte_periodico, periodos_totales, periodos_anuales)
+        textos = [f"{v:.2f}%" if np.isfinite(v) else "No alcanzable" for v in valores]
+        st.metric("TEA requerida", textos[2])
+        st.info(f"Con ${monto_inicial:,.2f} iniciales y aportes de ${aporte_periodico:,.2f} durante {anos} años")
+    else:
+        periodos = calcular_plazo_requerido(metas, monto_inicial, aporte_periodico, tea, periodos_anuales)
+        textos = [
+            f"{np.ceil(p) / periodos_anuales:,.2f} años ({int(np.ceil(p))} periodos)" if np.isfinite(p) else "No alcanzable"
+            for p in periodos
+        ]
+        st.metric("Plazo requerido", textos[2])
+        st.info(f"Con ${monto_inicial:,.2f} iniciales, aportes de ${aporte_periodico:,.2f} y una TEA de {tea:.2f}%")
+    
+    with st.expander("📋 Comparar Metas"):
+        st.dataframe(
+            pd.DataFrame({'Meta (USD)': [f"${m:,.2f}" for m in metas], incognita: textos}),
+            use_container_width=True,
+            hide_index=True
+        )
@@ -0,0 +1,92 @@
+"""
+Adaptadores entre el núcleo (utils, sin Streamlit) y la interfaz.
+"""
+import functools
+import os
+import time
+import uuid
+import streamlit as st
+from utils.almacen import ALMACEN_SESIONES
+from utils.diagnostico import RegistroTiempos, medir
+
+ICONOS = {'error': "❌", 'advertencia': "⚠️"}
+
+# Segundos sin cambios que espera el modo en vivo antes de recalcular (CALCULADORA_ESPERA_EN_VIVO)
+ESPERA_EN_VIVO = float(os.environ.get('CALCULADORA_ESPERA_EN_VIVO', 0.3))
+
+def mostrar_errores(*errores):
+    """
+    Muestra en la página los errores de validación recibidos.
+
+    Args:
+        *errores: Resultados de las funciones de utils.validaciones (None si el valor es válido)
+
+    Returns:
+        bool: True si no hubo errores
+    """
+    errores = [error for error in errores if error is not None]
+    for error in errores:
+        mostrar = st.warning if error.nivel == 'advertencia' else st.error
+        mostrar(f"{ICONOS.get(error.nivel, ICONOS['error'])} {error.mensaje}")
+    return not errores
+
+def resultados_sesion():
+    """
+    Resultados grandes de la sesión actual (tablas, simulaciones, gráficos para el PDF).
+    Se guardan en ALMACEN_SESIONES, acotado en bytes, en lugar de en st.session_state;
+    cuando la sesión termina y se descarta su estado, sus resultados se liberan.
+    """
+    if 'resultados' not in st.session_state:
+        st.session_state['resultados'] = ALMACEN_SESIONES.sesion(uuid.uuid4().hex)
+    return st.session_state['resultados']
+
+def registro_diagnostico():
+    """Tiempos por etapa de la sesión actual (panel de diagnóstico de la barra lateral)"""
+    if 'diagnostico' not in st.session_state:
+        st.session_state['diagnostico'] = RegistroTiempos(resultados_sesion().id)
+    return st.session_state['diagnostico']
+
+def medir_etapa(etapa, **datos):
+    """
+    Mide un bloque de la página con utils.diagnostico.medir, en el registro de la sesión.
+    Las etapas de utils que se ejecutan dentro del bloque también quedan en la sesión.
+    """
+    return medir(etapa, registro_diagnostico(), **datos)
+
+def seccion_medida(etapa):
+    """
+    Decorador para las páginas y los fragmentos: mide cada ejecución completa. Va debajo
+    de @st.fragment para medir también las ejecuciones parciales del fragmento.
+    """
+    def decorador(funcion):
+        @functools.wraps(funcion)
+        def envoltura(*args, **kwargs):
+            with medir_etapa(etapa):
+                return funcion(*args, **kwargs)
+        return envoltura
+    return decorador
+
+def pedir_calculo(modulo, parametros, etiqueta_boton):
+    """
+    Muestra el interruptor del modo en vivo y, si está apagado, el botón de cálculo.
+    En vivo se recalcula cuando los parámetros difieren de los del último cálculo
+    (st.session_state[f'{modulo}_params']), después de ESPERA_EN_VIVO sin cambios.
+
+    Returns:
+        str: 'boton' o 'en_vivo' si hay que calcular, None si no
+    """
+    en_vivo = st.toggle(
+        "⚡ Cálculo en vivo",
+        key=f"en_vivo_{modulo}",
+        help="Actualiza los resultados al cambiar los datos, sin presionar el botón"
+    )
+    if not en_vivo:
+        return 'boton' if st.button(etiqueta_boton, type="primary", use_container_width=True) else None
+    if parametros == st.session_state.get(f'{modulo}_params'):
+        return None
+    
+    # Debounce: si el usuario cambia otro dato durante la espera, Streamlit interrumpe esta
+    # ejecución en el siguiente comando y vuelve a empezar con los valores nuevos
+    time.sleep(ESPERA_EN_VIVO)
+    st.empty()
+    return 'en_vivo'
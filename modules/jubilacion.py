@@ -1,10 +1,9 @@
 import streamlit as st
-import plotly.graph_objects as go
-from utils.calculos import calcular_pension_mensual, calcular_impuesto
-from utils.graficos import exportar_grafico_a_imagen
-import plotly.io as pio
-import io
+from utils.calculos import calcular_jubilacion, comparar_edades_retiro
+from modules.comun import pedir_calculo, resultados_sesion, medir_etapa, seccion_medida
+from utils.graficos import ImagenPendiente, crear_grafico_jubilacion, crear_grafico_comparacion_jubilacion
 
+@seccion_medida('pagina/jubilacion')
 def mostrar_modulo_jubilacion():
     st.header("💰 Módulo B: Proyección de Jubilación")
     st.markdown("---")
@@ -93,129 +92,91 @@ def mostrar_modulo_jubilacion():
     
     st.markdown("---")
     
-    if st.button("💵 Calcular Jubilación", type="primary", use_container_width=True):
-        ganancia = capital_acumulado - total_aportes
-        
-        if ganancia < 0:
-            st.error("❌ El capital acumulado no puede ser menor que el total aportado")
+    parametros = {
+        'capital_acumulado': capital_acumulado,
+        'total_aportes': total_aportes,
+        'tipo_impuesto': tipo_impuesto,
+        'opcion_retiro': opcion_retiro,
+        'anos_retiro': anos_retiro,
+        'tea_retiro': tea_retiro
+    }
+    motivo = pedir_calculo('jubilacion', parametros, "💵 Calcular Jubilación")
+    
+    if motivo:
+        try:
+            with medir_etapa('calculo/jubilacion'):
+                st.session_state['jubilacion_data'] = calcular_jubilacion(
+                    capital_acumulado, total_aportes, tipo_impuesto, opcion_retiro, anos_retiro, tea_retiro
+                )
+        except ValueError as e:
+            st.error(f"❌ {e}")
             return
+        st.session_state['jubilacion_params'] = parametros
         
-        impuesto = calcular_impuesto(ganancia, tipo_impuesto)
-        capital_neto = capital_acumulado - impuesto
-        
-        if opcion_retiro == "Pensión Mensual":
-            pension_mensual = calcular_pension_mensual(capital_neto, tea_retiro, anos_retiro)
-        else:
-            pension_mensual = 0
-        
-        st.session_state['jubilacion_data'] = {
-            'capital_bruto': capital_acumulado,
-            'total_aportes': total_aportes,
-            'ganancia': ganancia,
-            'impuesto': impuesto,
-            'capital_neto': capital_neto,
-            'pension_mensual': pension_mensual,
-            'tipo_impuesto': tipo_impuesto,
-            'opcion_retiro': opcion_retiro,
-            'anos_retiro': anos_retiro,
-            'tea_retiro': tea_retiro
-        }
-        
-        st.success("✅ Cálculo de jubilación completado")
+        if motivo == 'boton':
+            st.success("✅ Cálculo de jubilación completado")
     
     if 'jubilacion_data' in st.session_state:
+        # Cada sección es un fragmento: sus widgets solo vuelven a ejecutar esa sección
+        mostrar_resultados_jubilacion()
+        mostrar_comparacion_jubilacion()
+
+
+@st.fragment
+@seccion_medida('seccion/jubilacion_resultados')
+def mostrar_resultados_jubilacion():
+    st.markdown("---")
+    st.subheader("📊 Resultados de Jubilación")
+    
+    data = st.session_state['jubilacion_data']
+    
+    col1, col2, col3 = st.columns(3)
+    col1.metric("Capital Bruto", f"${data['capital_bruto']:,.2f}")
+    col2.metric("Impuesto", f"${data['impuesto']:,.2f}", delta=f"-{(data['impuesto']/data['capital_bruto']*100):.1f}%")
+    col3.metric("Capital Neto", f"${data['capital_neto']:,.2f}")
+    
+    if data['opcion_retiro'] == "Pensión Mensual":
         st.markdown("---")
-        st.subheader("📊 Resultados de Jubilación")
+        st.success(f"### 💵 Pensión Mensual: ${data['pension_mensual']:,.2f}")
+        st.info(f"Recibirás esta pensión durante {data['anos_retiro']} años ({data['anos_retiro'] * 12} meses)")
         
-        data = st.session_state['jubilacion_data']
+        fig = crear_grafico_jubilacion(data)
         
-        col1, col2, col3 = st.columns(3)
-        col1.metric("Capital Bruto", f"${data['capital_bruto']:,.2f}")
-        col2.metric("Impuesto", f"${data['impuesto']:,.2f}", delta=f"-{(data['impuesto']/data['capital_bruto']*100):.1f}%")
-        col3.metric("Capital Neto", f"${data['capital_neto']:,.2f}")
+        # Con una clave fija el navegador actualiza el gráfico existente en lugar de volver a montarlo
+        with medir_etapa('envio/jubilacion'):
+            st.plotly_chart(fig, use_container_width=True, key='grafico_jubilacion')
         
-        if data['opcion_retiro'] == "Pensión Mensual":
-            st.markdown("---")
-            st.success(f"### 💵 Pensión Mensual: ${data['pension_mensual']:,.2f}")
-            st.info(f"Recibirás esta pensión durante {data['anos_retiro']} años ({data['anos_retiro'] * 12} meses)")
-            
-            fig = go.Figure()
-            
-            meses = list(range(1, data['anos_retiro'] * 12 + 1))
-            pension_acumulada = [data['pension_mensual'] * i for i in meses]
-            
-            fig.add_trace(go.Scatter(
-                x=meses,
-                y=pension_acumulada,
-                mode='lines',
-                name='Pensión Acumulada',
-                line=dict(color='#00CC96', width=3),
-                fill='tozeroy'
-            ))
-            
-            fig.add_hline(
-                y=data['capital_neto'],
-                line_dash="dash",
-                line_color="red",
-                annotation_text=f"Capital Inicial: ${data['capital_neto']:,.0f}"
-            )
-            
-            fig.update_layout(
-                title='Proyección de Retiro Mensual',
-                xaxis_title='Mes',
-                yaxis_title='Monto Acumulado (USD)',
-                template='plotly_white'
-            )
-            
-            st.plotly_chart(fig, use_container_width=True)
-            
-            # Exportar gráfico para PDF
-            img_data = exportar_grafico_a_imagen(fig)
-            if img_data:
-                st.session_state['jubilacion_grafico'] = img_data
-                st.write("Debug:", len(st.session_state['jubilacion_grafico']))
+        # La imagen para el PDF se rasteriza en segundo plano solo al exportar
+        resultados_sesion().guardar(
+            'jubilacion_grafico', ImagenPendiente(fig),
+            recalcular=lambda: ImagenPendiente(crear_grafico_jubilacion(data))
+        )
 
 
-        else:
-            st.success(f"### 💰 Cobro Total: ${data['capital_neto']:,.2f}")
-            st.info("Recibirás todo el dinero en un solo pago")
-        
-        with st.expander("📋 Comparar Escenarios"):
-            st.subheader("Comparación de Edades de Retiro")
-            
-            edades = [60, 62, 65, 68, 70]
-            pensiones = []
-            
-            for edad in edades:
-                anos = edad - 30
-                # Obtener TEA de retiro; si es None (por ejemplo en 'Cobro Total'), usar 5% por defecto
-                tea = data.get('tea_retiro')
-                if tea is None:
-                    tea = 5.0
+    else:
+        st.success(f"### 💰 Cobro Total: ${data['capital_neto']:,.2f}")
+        st.info("Recibirás todo el dinero en un solo pago")
 
-                # Calcular capital futuro usando la tasa de retiro
-                capital_futuro = data['capital_neto'] * (1 + tea/100) ** (edad - 65)
-                pension = calcular_pension_mensual(capital_futuro, tea, 20)
-                pensiones.append(pension)
-            
-            fig_comp = go.Figure()
-            fig_comp.add_trace(go.Bar(
-                x=[f"{e} años" for e in edades],
-                y=pensiones,
-                marker_color='lightblue'
+
+@st.fragment
+@seccion_medida('seccion/jubilacion_comparacion')
+def mostrar_comparacion_jubilacion():
+    data = st.session_state['jubilacion_data']
+    
+    with st.expander("📋 Comparar Escenarios"):
+        st.subheader("Comparación de Edades de Retiro")
+        
+        with medir_etapa('calculo/comparacion_jubilacion'):
+            comparacion = comparar_edades_retiro(data['capital_neto'], data.get('tea_retiro'))
+        fig_comp = crear_grafico_comparacion_jubilacion(comparacion)
+        
+        with medir_etapa('envio/comparacion_jubilacion'):
+            st.plotly_chart(fig_comp, use_container_width=True, key='grafico_comparacion_jubilacion')
+        
+        # La imagen para el PDF se rasteriza en segundo plano solo al exportar
+        resultados_sesion().guardar(
+            'jubilacion_grafico_comparacion', ImagenPendiente(fig_comp),
+            recalcular=lambda: ImagenPendiente(crear_grafico_comparacion_jubilacion(
+                comparar_edades_retiro(data['capital_neto'], data.get('tea_retiro'))
             ))
-            
-            fig_comp.update_layout(
-                title='Pensión Mensual según Edad de Retiro',
-                xaxis_title='Edad de Jubilación',
-                yaxis_title='Pensión Mensual (USD)',
-                template='plotly_white'
-            )
-            
-            st.plotly_chart(fig_comp, use_container_width=True)
-            
-            # Exportar gráfico de comparación para PDF
-            img_data_comp = exportar_grafico_a_imagen(fig_comp)
-            if img_data_comp:
-                st.session_state['jubilacion_grafico_comparacion'] = img_data_comp
-            
\ No newline at end of file
+        )
@@ -0,0 +1,107 @@
+"""
+Almacén de resultados por sesión: topes de bytes, expulsión LRU, recetas y liberación.
+
+Uso:
+    python -m pytest tests
+"""
+import gc
+import numpy as np
+import pandas as pd
+from utils.almacen import AlmacenSesiones, TablaCompacta
+
+# Cada arreglo de prueba ocupa 8000 bytes
+N = 1000
+
+def arreglo(valor):
+    return np.full(N, float(valor))
+
+def test_tope_por_sesion_expulsa_la_menos_usada():
+    almacen = AlmacenSesiones(max_bytes_sesion=20_000, max_bytes_total=100_000)
+    almacen.guardar('s1', 'a', arreglo(1))
+    almacen.guardar('s1', 'b', arreglo(2))
+    almacen.obtener('s1', 'a')
+    almacen.guardar('s1', 'c', arreglo(3))
+    
+    uso = almacen.uso_sesion('s1')
+    assert sorted(uso['por_clave']) == ['a', 'c']
+    assert uso['bytes'] == 16_000
+    assert almacen.obtener('s1', 'b') is None
+    assert almacen.estadisticas()['expulsiones'] == 1
+
+def test_una_sesion_no_expulsa_a_otra_por_su_tope():
+    almacen = AlmacenSesiones(max_bytes_sesion=10_000, max_bytes_total=100_000)
+    almacen.guardar('s1', 'a', arreglo(1))
+    almacen.guardar('s2', 'a', arreglo(2))
+    almacen.guardar('s2', 'b', arreglo(3))
+    
+    assert almacen.contiene('s1', 'a')
+    assert list(almacen.uso_sesion('s2')['por_clave']) == ['b']
+
+def test_tope_global_expulsa_entre_sesiones():
+    almacen = AlmacenSesiones(max_bytes_sesion=20_000, max_bytes_total=20_000)
+    almacen.guardar('s1', 'a', arreglo(1))
+    almacen.guardar('s2', 'a', arreglo(2))
+    almacen.guardar('s3', 'a', arreglo(3))
+    
+    estadisticas = almacen.estadisticas()
+    assert estadisticas['bytes'] == 16_000
+    assert estadisticas['entradas'] == 2
+    assert almacen.obtener('s1', 'a') is None
+    np.testing.assert_array_equal(almacen.obtener('s3', 'a'), arreglo(3))
+
+def test_valor_mayor_al_tope_no_se_guarda():
+    almacen = AlmacenSesiones(max_bytes_sesion=4_000, max_bytes_total=100_000)
+    almacen.guardar('s1', 'a', arreglo(1))
+    assert not almacen.contiene('s1', 'a')
+    assert almacen.estadisticas()['bytes'] == 0
+
+def test_resultado_expulsado_se_recalcula_con_su_receta():
+    almacen = AlmacenSesiones(max_bytes_sesion=10_000, max_bytes_total=100_000)
+    llamadas = []
+    
+    def receta():
+        llamadas.append(1)
+        return pd.DataFrame({'x': arreglo(1)})
+    
+    almacen.guardar('s1', 'tabla', receta(), recalcular=receta)
+    almacen.guardar('s1', 'otro', arreglo(2))
+    assert almacen.uso_sesion('s1')['expulsados'] == ['tabla']
+    assert almacen.contiene('s1', 'tabla')
+    
+    tabla = almacen.obtener('s1', 'tabla')
+    pd.testing.assert_frame_equal(tabla, pd.DataFrame({'x': arreglo(1)}))
+    assert len(llamadas) == 2
+    assert almacen.estadisticas()['recalculos'] == 1
+    # Recalculado vuelve a quedar guardado (y expulsa al otro resultado)
+    assert list(almacen.uso_sesion('s1')['por_clave']) == ['tabla']
+
+def test_la_sesion_se_libera_al_descartar_la_vista():
+    almacen = AlmacenSesiones(max_bytes_sesion=100_000, max_bytes_total=100_000)
+    vista = almacen.sesion('s1')
+    parametros = {'n': N}
+    vista.guardar('a', arreglo(1), recalcular=lambda: arreglo(parametros['n']))
+    assert 'a' in vista
+    assert vista['a'].shape == (N,)
+    
+    del vista
+    gc.collect()
+    
+    assert not almacen.contiene('s1', 'a')
+    assert almacen.estadisticas()['sesiones'] == 0
+    assert almacen.uso_sesion('s1')['bytes'] == 0
+
+def test_tablas_devueltas_son_copias():
+    almacen = AlmacenSesiones(max_bytes_sesion=100_000, max_bytes_total=100_000)
+    original = pd.DataFrame({'x': [1.0, 2.0], 'y': [3, 4]})
+    almacen.guardar('s1', 'tabla', {'df': original})
+    
+    # Ni el DataFrame de origen ni el devuelto comparten memoria con lo guardado
+    original.loc[0, 'x'] = -1
+    devuelto = almacen.obtener('s1', 'tabla')['df']
+    devuelto.loc[1, 'y'] = -1
+    
+    pd.testing.assert_frame_equal(almacen.obtener('s1', 'tabla')['df'], pd.DataFrame({'x': [1.0, 2.0], 'y': [3, 4]}))
+
+def test_tabla_compacta_conserva_indice_no_por_defecto():
+    df = pd.DataFrame({'x': [1.0, 2.0]}, index=['a', 'b'])
+    pd.testing.assert_frame_equal(TablaCompacta(df).a_dataframe(), df)
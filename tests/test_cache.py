@@ -0,0 +1,106 @@
+"""
+Comportamiento de la caché de resultados: aciertos, expulsión LRU, TTL y copias.
+
+Uso:
+    python -m pytest tests
+"""
+import numpy as np
+import pandas as pd
+import pytest
+from utils import cache as modulo_cache
+from utils.cache import CacheResultados, cachear
+
+@pytest.fixture
+def reloj(monkeypatch):
+    """Reloj monotónico controlado por la prueba"""
+    ahora = [1000.0]
+    monkeypatch.setattr(modulo_cache.time, 'monotonic', lambda: ahora[0])
+    return ahora
+
+def test_aciertos_y_fallos():
+    cache = CacheResultados(max_entradas=4)
+    assert cache.obtener('a') == (False, None)
+    cache.guardar('a', 1)
+    assert cache.obtener('a') == (True, 1)
+    
+    estadisticas = cache.estadisticas()
+    assert (estadisticas['aciertos'], estadisticas['fallos']) == (1, 1)
+    assert estadisticas['tasa_aciertos'] == 0.5
+    assert estadisticas['entradas'] == 1
+
+def test_expulsa_la_entrada_menos_usada():
+    cache = CacheResultados(max_entradas=2)
+    cache.guardar('a', 1)
+    cache.guardar('b', 2)
+    cache.obtener('a')
+    cache.guardar('c', 3)
+    
+    assert cache.obtener('b') == (False, None)
+    assert cache.obtener('a') == (True, 1)
+    assert cache.obtener('c') == (True, 3)
+    assert cache.estadisticas()['expulsiones'] == 1
+
+def test_expulsa_por_bytes():
+    cache = CacheResultados(max_entradas=10, max_bytes=100, medir=len)
+    cache.guardar('a', 'x' * 60)
+    cache.guardar('b', 'x' * 60)
+    assert cache.obtener('a') == (False, None)
+    assert cache.estadisticas()['bytes'] == 60
+    
+    # Un valor que por sí solo supera el tope no se guarda
+    cache.guardar('c', 'x' * 150)
+    assert cache.obtener('c') == (False, None)
+    assert cache.obtener('b')[0]
+
+def test_entradas_caducan_con_el_ttl(reloj):
+    cache = CacheResultados(ttl=10)
+    cache.guardar('a', 1)
+    reloj[0] += 9.9
+    assert cache.obtener('a') == (True, 1)
+    reloj[0] += 0.2
+    assert cache.obtener('a') == (False, None)
+    assert cache.estadisticas()['entradas'] == 0
+
+def test_decorador_reutiliza_el_resultado():
+    llamadas = []
+    
+    @cachear(CacheResultados())
+    def sumar(a, b, c=0):
+        llamadas.append((a, b, c))
+        return a + b + c
+    
+    assert sumar(1, 2) == 3
+    assert sumar(1, 2) == 3
+    assert sumar(1, 3) == 4
+    assert len(llamadas) == 2
+    assert sumar.cache.estadisticas()['aciertos'] == 1
+
+@pytest.mark.parametrize("args, kwargs", [((1, 2), {}), ((1,), {'b': 2}), ((), {'b': 2, 'a': 1}),
+                                          ((1, 2, 0), {}), ((1.0, 2), {'c': 0.0})])
+def test_llamadas_equivalentes_comparten_la_clave(args, kwargs):
+    llamadas = []
+    
+    @cachear(CacheResultados())
+    def sumar(a, b, c=0):
+        llamadas.append((a, b, c))
+        return a + b + c
+    
+    sumar(1, 2)
+    assert sumar(*args, **kwargs) == 3
+    assert len(llamadas) == 1
+
+def test_resultados_devueltos_son_copias():
+    @cachear(CacheResultados())
+    def tabla(n):
+        return pd.DataFrame({'x': np.arange(n, dtype=np.float64)}), np.zeros(n), [1, 2]
+    
+    df, arreglo, lista = tabla(3)
+    df.loc[0, 'x'] = -1
+    arreglo[:] = 7
+    lista.append(3)
+    
+    df_nuevo, arreglo_nuevo, lista_nueva = tabla(3)
+    pd.testing.assert_frame_equal(df_nuevo, pd.DataFrame({'x': [0.0, 1.0, 2.0]}))
+    np.testing.assert_array_equal(arreglo_nuevo, [0, 0, 0])
+    assert lista_nueva == [1, 2]
+    assert tabla.cache.estadisticas()['aciertos'] == 1
@@ -0,0 +1,213 @@
+"""
+Paridad entre los cálculos vectorizados y sus implementaciones de referencia (bucles),
+y comportamiento de los cálculos inversos (rendimientos y metas).
+
+Uso:
+    python -m pytest tests
+"""
+import numpy as np
+import pandas as pd
+import pytest
+from utils.calculos import (PERIODOS_ANUALES, calcular_crecimiento_cartera,
+                            calcular_crecimiento_cartera_referencia, calcular_crecimiento_cartera_vectorizado,
+                            calcular_escenarios_cartera,
+                            calcular_aporte_requerido, calcular_plazo_requerido, calcular_tea_requerida,
+                            calcular_tir_cartera, calcular_valor_bono, calcular_valor_bono_referencia,
+                            calcular_ytm_bono, resolver_tasa_interna)
+
+# La referencia redondea las columnas a centavos; el motor vectorizado no redondea
+CENTAVO = 0.005 + 1e-9
+
+# (periodos por año, años): incluye años fraccionarios que dan un número entero de periodos
+CASOS_CARTERA = [(12, 30), (4, 10), (2, 5), (1, 40), (12, 2.5), (4, 7.25), (2, 0.5)]
+
+@pytest.mark.parametrize("tea", [0, 0.5, 8, 25])
+@pytest.mark.parametrize("periodos_anuales, anos", CASOS_CARTERA)
+def test_cartera_igual_a_referencia(periodos_anuales, anos, tea):
+    periodos_totales = int(round(anos * periodos_anuales))
+    df, saldo_final, total_aportes = calcular_crecimiento_cartera.__wrapped__(
+        10000, 500, tea, periodos_totales, periodos_anuales)
+    df_ref, saldo_ref, total_ref = calcular_crecimiento_cartera_referencia(
+        10000, 500, tea, periodos_totales, periodos_anuales)
+    
+    assert list(df.columns) == list(df_ref.columns)
+    assert len(df) == len(df_ref) == periodos_totales
+    np.testing.assert_array_equal(df['Periodo'], df_ref['Periodo'])
+    for columna in ['Aporte', 'Interés', 'Saldo', 'Total Aportes']:
+        np.testing.assert_allclose(df[columna], df_ref[columna], rtol=0, atol=CENTAVO, err_msg=columna)
+    assert saldo_final == pytest.approx(saldo_ref, rel=1e-10)
+    assert total_aportes == pytest.approx(total_ref, rel=1e-12)
+
+def test_cartera_sin_periodos():
+    df, saldo_final, total_aportes = calcular_crecimiento_cartera.__wrapped__(10000, 500, 8, 0, 12)
+    df_ref, saldo_ref, total_ref = calcular_crecimiento_cartera_referencia(10000, 500, 8, 0, 12)
+    assert df.empty and df_ref.empty
+    assert saldo_final == saldo_ref == 10000
+    assert total_aportes == total_ref == 10000
+
+@pytest.mark.parametrize("tea_mercado", [0, 3, 6, 12])
+@pytest.mark.parametrize("frecuencia, anos", [('Mensual', 10), ('Bimestral', 3), ('Trimestral', 5),
+                                              ('Cuatrimestral', 2), ('Semestral', 30), ('Anual', 7),
+                                              ('Semestral', 2.5), ('Trimestral', 1.75)])
+def test_bono_igual_a_referencia(frecuencia, anos, tea_mercado):
+    df, vp_total = calcular_valor_bono.__wrapped__(1000, 6, frecuencia, anos, tea_mercado)
+    df_ref, vp_ref = calcular_valor_bono_referencia(1000, 6, frecuencia, anos, tea_mercado)
+    
+    assert list(df.columns) == list(df_ref.columns)
+    assert len(df) == len(df_ref)
+    np.testing.assert_array_equal(df['Periodo'], df_ref['Periodo'])
+    for columna in ['Flujo', 'VP Flujo']:
+        np.testing.assert_allclose(df[columna], df_ref[columna], rtol=0, atol=CENTAVO, err_msg=columna)
+    assert vp_total == pytest.approx(vp_ref, rel=1e-10)
+
+def test_resultado_cacheado_igual_al_directo():
+    directo = calcular_crecimiento_cartera.__wrapped__(5000, 250, 7, 120, 12)
+    cacheado = calcular_crecimiento_cartera(5000, 250, 7, 120, 12)
+    pd.testing.assert_frame_equal(cacheado[0], directo[0])
+    assert cacheado[1:] == directo[1:]
+
+def test_tasa_interna_sin_raiz_por_underflow():
+    # Sin salidas el valor presente solo se anula por underflow con tasas enormes
+    flujos = np.zeros((1, 360))
+    flujos[0, -1] = 1000
+    tasas, iteraciones, convergio = resolver_tasa_interna(flujos, 0.0)
+    assert np.isnan(tasas[0])
+    assert not convergio[0]
+    assert iteraciones[0] == 0
+
+@pytest.mark.parametrize("flujos, valor_presente", [
+    ([[100, 100, 100]], -50.0),
+    ([[100, 100, 100]], 0.0),
+    ([[-100, -100, -100]], 50.0),
+    ([[-100, -100, -100]], 0.0)
+])
+def test_tasa_interna_flujos_de_un_solo_signo(flujos, valor_presente):
+    tasas, _, convergio = resolver_tasa_interna(flujos, valor_presente)
+    assert np.isnan(tasas[0])
+    assert not convergio[0]
+
+def test_ytm_recupera_la_tea_del_precio():
+    rng = np.random.default_rng(7)
+    n_bonos = 200
+    frecuencias = rng.choice(list(PERIODOS_ANUALES), n_bonos)
+    anos = rng.integers(1, 31, n_bonos)
+    tasas_cupon = rng.uniform(0, 12, n_bonos)
+    teas = rng.uniform(0.5, 20, n_bonos)
+    precios = [calcular_valor_bono.__wrapped__(1000, c, f, a, t)[1]
+               for c, f, a, t in zip(tasas_cupon, frecuencias, anos, teas)]
+    
+    resultado = calcular_ytm_bono(precios, 1000, tasas_cupon, list(frecuencias), anos)
+    
+    assert resultado['convergio'].all()
+    np.testing.assert_allclose(resultado['tea'], teas, rtol=0, atol=1e-8)
+    precios_recalculados = [calcular_valor_bono.__wrapped__(1000, c, f, a, t)[1]
+                            for c, f, a, t in zip(tasas_cupon, frecuencias, anos, resultado['tea'])]
+    np.testing.assert_allclose(precios_recalculados, precios, rtol=1e-10)
+
+def test_tasa_interna_de_un_flujo_conocido():
+    # Se entregan 100 y se reciben 110 al periodo siguiente: 10 % periódico
+    tasas, iteraciones, convergio = resolver_tasa_interna([[110.0]], 100.0)
+    assert tasas[0] == pytest.approx(0.10, abs=1e-12)
+    assert convergio[0]
+    assert 0 < iteraciones[0] <= 200
+
+@pytest.mark.parametrize("tea", [0, 3, 8, 25])
+def test_tir_cartera_igual_a_la_tea_de_crecimiento(tea):
+    _, saldo_final, _ = calcular_crecimiento_cartera_vectorizado(10000, 500, tea, 240, 12)
+    resultado = calcular_tir_cartera(10000, 500, saldo_final, 240, 12)
+    
+    assert resultado['tea'].shape == (1,)
+    assert resultado['convergio'][0]
+    assert resultado['tea'][0] == pytest.approx(tea, abs=1e-8)
+
+def test_tasa_interna_informa_iteraciones_y_convergencia():
+    flujos = [[110.0, 0.0], [60.0, 60.0], [100.0, 100.0]]
+    tasas, iteraciones, convergio = resolver_tasa_interna(flujos, [100.0, 100.0, -50.0])
+    
+    assert iteraciones.dtype == np.int64
+    assert convergio.dtype == bool
+    np.testing.assert_array_equal(convergio, [True, True, False])
+    assert (iteraciones[:2] > 0).all()
+    assert iteraciones[2] == 0
+    assert np.isnan(tasas[2])
+    
+    # Con una sola iteración permitida no alcanza la tolerancia
+    _, iteraciones, convergio = resolver_tasa_interna([[60.0, 60.0]], 100.0, max_iteraciones=1)
+    assert iteraciones[0] == 1
+    assert not convergio[0]
+
+def test_ytm_sin_raiz():
+    # Un precio negativo no se alcanza con flujos positivos a ninguna tasa
+    resultado = calcular_ytm_bono([-10.0, 950.0], 1000, 6, 'Semestral', 5)
+    assert np.isnan(resultado['tea'][0])
+    assert not resultado['convergio'][0]
+    assert resultado['convergio'][1]
+
+def saldo_final(monto_inicial, aporte_periodico, tea, periodos_totales, periodos_anuales):
+    return calcular_crecimiento_cartera_vectorizado(
+        monto_inicial, aporte_periodico, tea, periodos_totales, periodos_anuales)[1]
+
+@pytest.mark.parametrize("tea", [0, 4, 12])
+@pytest.mark.parametrize("meta, monto_inicial", [(150000, 10000), (1e6, 0), (200000, 15000)])
+def test_aporte_requerido_alcanza_la_meta(meta, monto_inicial, tea):
+    aporte = calcular_aporte_requerido(meta, monto_inicial, tea, 240, 12)
+    assert aporte > 0
+    assert saldo_final(monto_inicial, float(aporte), tea, 240, 12) == pytest.approx(meta, rel=1e-10)
+
+@pytest.mark.parametrize("tea", [0, 4, 12])
+@pytest.mark.parametrize("meta, monto_inicial, aporte", [(150000, 10000, 500), (1e6, 0, 1000), (20000, 15000, 0)])
+def test_plazo_requerido_alcanza_la_meta(meta, monto_inicial, aporte, tea):
+    periodos = calcular_plazo_requerido(meta, monto_inicial, aporte, tea, 12)
+    if aporte == 0 and tea == 0:
+        assert np.isinf(periodos)
+        return
+    
+    # El plazo fraccionario cae entre el último periodo sin la meta y el primero con ella
+    completos = int(np.ceil(periodos))
+    assert saldo_final(monto_inicial, aporte, tea, completos, 12) >= meta * (1 - 1e-12)
+    assert saldo_final(monto_inicial, aporte, tea, completos - 1, 12) < meta
+
+@pytest.mark.parametrize("meta, monto_inicial, aporte", [(150000, 10000, 500), (1e6, 0, 1000), (20000, 15000, 0)])
+def test_tea_requerida_alcanza_la_meta(meta, monto_inicial, aporte):
+    tea = calcular_tea_requerida(meta, monto_inicial, aporte, 240, 12)
+    assert np.isfinite(tea)
+    assert saldo_final(monto_inicial, aporte, float(tea), 240, 12) == pytest.approx(meta, rel=1e-9)
+
+def test_metas_ya_cubiertas_por_el_monto_inicial():
+    metas = np.array([5000.0, 10000.0])
+    np.testing.assert_array_equal(calcular_aporte_requerido(metas, 10000, 8, 120, 12), [0, 0])
+    np.testing.assert_array_equal(calcular_plazo_requerido(metas, 10000, 500, 8, 12), [0, 0])
+    # Llegar a la meta exacta sin aportes no requiere rendimiento
+    assert calcular_tea_requerida(10000, 10000, 0, 120, 12) == pytest.approx(0, abs=1e-10)
+
+def test_metas_no_alcanzables():
+    assert np.isinf(calcular_plazo_requerido(50000, 10000, 0, 0, 12))
+    assert np.isnan(calcular_tea_requerida(50000, 0, 0, 360, 12))
+    
+    metas = calcular_tea_requerida(np.array([1000.0, 50000.0]), 0, 0, 12, 12)
+    assert metas.shape == (2,)
+    assert np.isnan(metas).all()
+
+@pytest.mark.parametrize("tamano_bloque", [1, 7, 64, 10_000_000])
+@pytest.mark.parametrize("monto_inicial, aporte, tea, anos", [
+    (np.linspace(0, 1e5, 30)[None, :], 500, 8, 30),
+    (np.linspace(0, 1e5, 5)[:, None, None], np.linspace(0, 1e3, 4)[None, :, None], [0, 4, 8], 20),
+    (10000, np.linspace(0, 1e3, 13), 6, np.arange(1, 14)),
+    (np.zeros((2, 1, 3)), 100, np.linspace(0, 10, 5)[:, None], 10)
+])
+def test_escenarios_por_bloques_igual_a_sin_bloques(monto_inicial, aporte, tea, anos, tamano_bloque):
+    por_bloques = calcular_escenarios_cartera(monto_inicial, aporte, tea, anos, tamano_bloque=tamano_bloque)
+    
+    forma = np.broadcast_shapes(*(np.shape(valor) for valor in (monto_inicial, aporte, tea, anos)))
+    assert por_bloques['saldo_final'].shape == forma
+    for indice in np.ndindex(*forma):
+        m, a, t, n = (np.broadcast_to(valor, forma)[indice] for valor in (monto_inicial, aporte, tea, anos))
+        saldo, total = calcular_crecimiento_cartera_vectorizado(float(m), float(a), float(t), int(n) * 12, 12)[1:]
+        assert por_bloques['saldo_final'][indice] == pytest.approx(saldo, rel=1e-12)
+        assert por_bloques['total_aportes'][indice] == pytest.approx(total, rel=1e-12)
+
+def test_escenarios_en_grilla():
+    resultado = calcular_escenarios_cartera([0, 1000], [100, 200, 300], [0, 5], [10], grilla=True, tamano_bloque=5)
+    assert resultado['saldo_final'].shape == (2, 3, 2, 1)
+    saldo = calcular_crecimiento_cartera_vectorizado(1000, 300, 5, 120, 12)[1]
+    assert resultado['saldo_final'][1, 2, 1, 0] == pytest.approx(saldo, rel=1e-12)
@@ -0,0 +1,30 @@
+"""
+Validación de los escenarios del generador de reportes por lotes.
+
+Uso:
+    python -m pytest tests
+"""
+import pytest
+from utils.lote import construir_datos_reporte
+
+CARTERA = {'cliente': 'A', 'monto_inicial': 10000, 'aporte_periodico': 500, 'tea': 8, 'anos': 30}
+BONO = {'cliente': 'B', 'valor_nominal': 1000, 'tasa_cupon': 6, 'frecuencia_pago': 'Semestral',
+        'anos_bono': 5, 'tea_mercado': 5}
+
+def test_acepta_anos_enteros_leidos_como_float():
+    # pandas lee las columnas numéricas del CSV como float cuando hay celdas vacías
+    datos_cartera, _, datos_bono = construir_datos_reporte({**CARTERA, **BONO, 'anos': 30.0, 'anos_bono': 5.0})
+    assert datos_cartera['anos'] == 30
+    assert datos_bono['anos'] == 5
+
+@pytest.mark.parametrize("escenario, mensaje", [
+    ({**CARTERA, 'anos': 12.5}, "Plazo debe ser un número entero"),
+    ({**CARTERA, 'frecuencia': 'Quincenal'}, "Frecuencia no reconocida"),
+    ({**CARTERA, 'tipo_impuesto': 'Sin impuesto', 'opcion_retiro': 'Pensión Mensual', 'anos_retiro': 20.5},
+     "Plazo de retiro debe ser un número entero"),
+    ({**BONO, 'anos_bono': 5.5}, "Plazo del bono debe ser un número entero"),
+    ({**BONO, 'frecuencia_pago': 'Diaria'}, "Frecuencia de pago no reconocida")
+])
+def test_rechaza_escenarios_invalidos(escenario, mensaje):
+    with pytest.raises(ValueError, match=mensaje):
+        construir_datos_reporte(escenario)
@@ -0,0 +1,60 @@
+"""
+Simulación Monte Carlo: caso determinista, reproducibilidad con semilla y bandas.
+
+Uso:
+    python -m pytest tests
+"""
+import numpy as np
+import pandas as pd
+import pytest
+from utils.calculos import calcular_crecimiento_cartera_vectorizado
+from utils.montecarlo import simular_cartera_montecarlo
+
+@pytest.mark.parametrize("distribucion", ['lognormal', 'normal'])
+@pytest.mark.parametrize("rendimiento", [0, 7])
+def test_sin_volatilidad_igual_al_calculo_determinista(distribucion, rendimiento):
+    columnas, saldo_final, total_aportes = calcular_crecimiento_cartera_vectorizado(10000, 500, rendimiento, 120, 12)
+    resultado = simular_cartera_montecarlo(10000, 500, rendimiento, 0, 120, 12, n_trayectorias=50,
+                                           distribucion=distribucion, semilla=1)
+    
+    np.testing.assert_allclose(resultado['saldos_finales'], saldo_final, rtol=1e-10)
+    for etiqueta, valor in resultado['percentiles_finales'].items():
+        assert valor == pytest.approx(saldo_final, rel=1e-10), etiqueta
+    np.testing.assert_allclose(resultado['bandas']['P50'], columnas['Saldo'], rtol=1e-10)
+    assert resultado['total_aportes'] == total_aportes
+
+def test_misma_semilla_mismo_resultado_en_un_proceso():
+    parametros = dict(n_trayectorias=2_000, semilla=42, tamano_bloque=300, meta=150000)
+    primero = simular_cartera_montecarlo(10000, 500, 7, 15, 240, 12, **parametros)
+    segundo = simular_cartera_montecarlo(10000, 500, 7, 15, 240, 12, **parametros)
+    
+    np.testing.assert_array_equal(primero['saldos_finales'], segundo['saldos_finales'])
+    pd.testing.assert_frame_equal(primero['bandas'], segundo['bandas'])
+    assert primero['prob_meta'] == segundo['prob_meta']
+    
+    otra_semilla = simular_cartera_montecarlo(10000, 500, 7, 15, 240, 12, **{**parametros, 'semilla': 43})
+    assert not np.array_equal(primero['saldos_finales'], otra_semilla['saldos_finales'])
+
+def test_resultado_no_depende_del_numero_de_procesos():
+    # Con varios bloques y n_procesos > 1 los bloques corren en procesos iniciados con spawn
+    parametros = dict(n_trayectorias=1_000, semilla=7, tamano_bloque=250)
+    un_proceso = simular_cartera_montecarlo(10000, 500, 7, 15, 120, 12, n_procesos=1, **parametros)
+    varios = simular_cartera_montecarlo(10000, 500, 7, 15, 120, 12, n_procesos=2, **parametros)
+    
+    np.testing.assert_array_equal(un_proceso['saldos_finales'], varios['saldos_finales'])
+    pd.testing.assert_frame_equal(un_proceso['bandas'], varios['bandas'])
+    assert un_proceso['percentiles_finales'] == varios['percentiles_finales']
+
+@pytest.mark.parametrize("distribucion", ['lognormal', 'normal'])
+def test_bandas_ordenadas(distribucion):
+    resultado = simular_cartera_montecarlo(10000, 500, 7, 20, 120, 12, n_trayectorias=3_000,
+                                           distribucion=distribucion, semilla=3,
+                                           percentiles=(5, 25, 50, 75, 95))
+    bandas = resultado['bandas']
+    
+    assert list(bandas.columns) == ['Periodo', 'P5', 'P25', 'P50', 'P75', 'P95']
+    assert len(bandas) == 120
+    valores = bandas[['P5', 'P25', 'P50', 'P75', 'P95']].to_numpy()
+    assert (np.diff(valores, axis=1) >= 0).all()
+    finales = list(resultado['percentiles_finales'].values())
+    assert finales == sorted(finales)
@@ -0,0 +1,247 @@
+"""
+Almacén de los resultados grandes de cada sesión (tablas, resultados de simulación,
+gráficos pendientes de exportar), en lugar de guardarlos sueltos en la sesión.
+Las tablas se guardan columna por columna como arreglos, el uso de memoria se mide
+por sesión y en total, y al superar un tope se expulsan los resultados usados hace
+más tiempo (LRU). Un resultado expulsado que tiene receta se recalcula al pedirlo.
+
+Configuración por variables de entorno:
+    CALCULADORA_ALMACEN_SESION_MB: Tope por sesión (por defecto 8)
+    CALCULADORA_ALMACEN_TOTAL_MB: Tope entre todas las sesiones (por defecto 256)
+"""
+import os
+import threading
+import weakref
+from collections import OrderedDict, defaultdict
+import numpy as np
+import pandas as pd
+from utils.diagnostico import medir
+
+# Tamaño estimado de un valor sin arreglos (números, textos cortos, parámetros)
+BYTES_ESCALAR = 64
+
+class TablaCompacta:
+    """DataFrame guardado como un arreglo por columna, sin índice ni bloques de pandas"""
+
+    def __init__(self, df):
+        self.columnas = list(df.columns)
+        # Copias: .array es una vista de los bloques del DataFrame de origen, que quien lo
+        # guardó puede seguir modificando
+        self.arreglos = [df[columna].array.copy() for columna in self.columnas]
+        # Solo se guarda el índice si no es el 0..n-1 por defecto
+        indice_por_defecto = isinstance(df.index, pd.RangeIndex) and df.index.start == 0 and df.index.step == 1
+        self.indice = None if indice_por_defecto else df.index
+        self.nbytes = sum(arreglo.nbytes for arreglo in self.arreglos) + (
+            self.indice.nbytes if self.indice is not None else 0)
+
+    def a_dataframe(self):
+        # Se copian los arreglos: sin copy-on-write (desactivado por defecto en pandas 2.x), una
+        # modificación en el DataFrame devuelto alteraría el resultado guardado
+        return pd.DataFrame(dict(zip(self.columnas, self.arreglos)), index=self.indice, copy=True)
+
+def compactar(valor):
+    """Convierte los DataFrames (también dentro de dicts) a TablaCompacta"""
+    if isinstance(valor, pd.DataFrame):
+        return TablaCompacta(valor)
+    if isinstance(valor, dict):
+        return {clave: compactar(v) for clave, v in valor.items()}
+    return valor
+
+def expandir(valor):
+    """Inverso de compactar"""
+    if isinstance(valor, TablaCompacta):
+        return valor.a_dataframe()
+    if isinstance(valor, dict):
+        return {clave: expandir(v) for clave, v in valor.items()}
+    return valor
+
+def medir_bytes(valor):
+    """Bytes aproximados de un valor guardado (usa .nbytes cuando el objeto lo tiene)"""
+    if isinstance(valor, (bytes, bytearray)):
+        return len(valor)
+    if isinstance(valor, dict):
+        return sum(medir_bytes(v) for v in valor.values()) + BYTES_ESCALAR
+    if isinstance(valor, (list, tuple)):
+        return sum(medir_bytes(v) for v in valor) + BYTES_ESCALAR
+    nbytes = getattr(valor, 'nbytes', None)
+    if isinstance(nbytes, (int, np.integer)):
+        return int(nbytes)
+    return BYTES_ESCALAR
+
+class AlmacenSesiones:
+    """
+    Resultados por sesión con tope de bytes por sesión y global y expulsión LRU.
+
+    Args:
+        max_bytes_sesion: Tope de bytes de cada sesión
+        max_bytes_total: Tope de bytes sumando todas las sesiones
+    """
+
+    def __init__(self, max_bytes_sesion, max_bytes_total):
+        self.max_bytes_sesion = max_bytes_sesion
+        self.max_bytes_total = max_bytes_total
+        # (sesion, clave) -> (valor compacto, bytes), del menos al más usado recientemente
+        self._entradas = OrderedDict()
+        # Las recetas sobreviven a la expulsión para poder recalcular
+        self._recetas = {}
+        self._bytes_sesion = defaultdict(int)
+        self._bytes = 0
+        self._lock = threading.Lock()
+        self.aciertos = 0
+        self.recalculos = 0
+        self.expulsiones = 0
+
+    def guardar(self, sesion, clave, valor, recalcular=None):
+        """
+        Guarda un resultado de la sesión.
+
+        Args:
+            recalcular: Función sin argumentos que vuelve a producir el valor si se expulsa.
+                Las recetas no cuentan en los topes: deben capturar solo los datos de entrada,
+                nunca la vista de la sesión (impediría liberarla) ni tablas grandes
+        """
+        compacto = compactar(valor)
+        tamano = medir_bytes(compacto)
+        with self._lock:
+            self._eliminar((sesion, clave))
+            if recalcular is not None:
+                self._recetas[(sesion, clave)] = recalcular
+            else:
+                self._recetas.pop((sesion, clave), None)
+            if tamano > self.max_bytes_sesion:
+                # No entra ni solo: queda únicamente la receta (si la hay)
+                self.expulsiones += 1
+                return
+            self._entradas[(sesion, clave)] = (compacto, tamano)
+            self._bytes_sesion[sesion] += tamano
+            self._bytes += tamano
+            self._expulsar(sesion)
+
+    def obtener(self, sesion, clave, defecto=None):
+        """Devuelve el resultado, recalculándolo si fue expulsado; defecto si no hay forma de obtenerlo"""
+        with self._lock:
+            entrada = self._entradas.get((sesion, clave))
+            if entrada is not None:
+                self._entradas.move_to_end((sesion, clave))
+                self.aciertos += 1
+                return expandir(entrada[0])
+            recalcular = self._recetas.get((sesion, clave))
+        if recalcular is None:
+            return defecto
+
+        # Se recalcula fuera del lock para no frenar a las demás sesiones
+        with medir('almacen/recalcular', clave=clave):
+            valor = recalcular()
+        with self._lock:
+            self.recalculos += 1
+        self.guardar(sesion, clave, valor, recalcular)
+        return valor
+
+    def contiene(self, sesion, clave):
+        """True si el resultado está guardado o puede recalcularse"""
+        with self._lock:
+            return (sesion, clave) in self._entradas or (sesion, clave) in self._recetas
+
+    def quitar(self, sesion, clave):
+        """Elimina un resultado y su receta"""
+        with self._lock:
+            self._eliminar((sesion, clave))
+            self._recetas.pop((sesion, clave), None)
+
+    def eliminar_sesion(self, sesion):
+        """Libera todos los resultados de una sesión que terminó"""
+        with self._lock:
+            for llave in [llave for llave in self._entradas if llave[0] == sesion]:
+                self._eliminar(llave)
+            for llave in [llave for llave in self._recetas if llave[0] == sesion]:
+                del self._recetas[llave]
+            self._bytes_sesion.pop(sesion, None)
+
+    def uso_sesion(self, sesion):
+        """
+        Memoria usada por una sesión.
+
+        Returns:
+            dict: 'bytes', 'max_bytes', 'por_clave' (clave -> bytes) y 'expulsados'
+            (claves que se recalcularán al pedirlas)
+        """
+        with self._lock:
+            por_clave = {clave: tamano for (s, clave), (_, tamano) in self._entradas.items() if s == sesion}
+            expulsados = [clave for (s, clave) in self._recetas if s == sesion and clave not in por_clave]
+            return {
+                'bytes': self._bytes_sesion.get(sesion, 0),
+                'max_bytes': self.max_bytes_sesion,
+                'por_clave': por_clave,
+                'expulsados': expulsados
+            }
+
+    def estadisticas(self):
+        """Devuelve los contadores y el uso total del almacén"""
+        with self._lock:
+            return {
+                'sesiones': len({s for s, _ in self._entradas} | {s for s, _ in self._recetas}),
+                'entradas': len(self._entradas),
+                'bytes': self._bytes,
+                'max_bytes': self.max_bytes_total,
+                'max_bytes_sesion': self.max_bytes_sesion,
+                'aciertos': self.aciertos,
+                'recalculos': self.recalculos,
+                'expulsiones': self.expulsiones
+            }
+
+    def sesion(self, sesion):
+        """Vista del almacén para una sesión; al descartarla se liberan sus resultados"""
+        vista = ResultadosSesion(self, sesion)
+        weakref.finalize(vista, self.eliminar_sesion, sesion)
+        return vista
+
+    def _eliminar(self, llave):
+        """Quita una entrada guardada y descuenta su tamaño (se llama con el lock tomado)"""
+        entrada = self._entradas.pop(llave, None)
+        if entrada is not None:
+            self._bytes_sesion[llave[0]] -= entrada[1]
+            self._bytes -= entrada[1]
+
+    def _expulsar(self, sesion):
+        """Expulsa por LRU hasta cumplir el tope de la sesión y el global (con el lock tomado)"""
+        while self._bytes_sesion[sesion] > self.max_bytes_sesion:
+            self._eliminar(next(llave for llave in self._entradas if llave[0] == sesion))
+            self.expulsiones += 1
+        while self._bytes > self.max_bytes_total:
+            self._eliminar(next(iter(self._entradas)))
+            self.expulsiones += 1
+
+class ResultadosSesion:
+    """Acceso a los resultados de una sesión, con la misma interfaz que un dict"""
+
+    def __init__(self, almacen, sesion):
+        self._almacen = almacen
+        self.id = sesion
+
+    def guardar(self, clave, valor, recalcular=None):
+        self._almacen.guardar(self.id, clave, valor, recalcular)
+
+    def obtener(self, clave, defecto=None):
+        return self._almacen.obtener(self.id, clave, defecto)
+
+    def quitar(self, clave):
+        self._almacen.quitar(self.id, clave)
+
+    def uso(self):
+        return self._almacen.uso_sesion(self.id)
+
+    def __contains__(self, clave):
+        return self._almacen.contiene(self.id, clave)
+
+    def __getitem__(self, clave):
+        valor = self.obtener(clave, _FALTANTE)
+        if valor is _FALTANTE:
+            raise KeyError(clave)
+        return valor
+
+_FALTANTE = object()
+
+ALMACEN_SESIONES = AlmacenSesiones(
+    max_bytes_sesion=int(float(os.environ.get('CALCULADORA_ALMACEN_SESION_MB', 8)) * 1024 * 1024),
+    max_bytes_total=int(float(os.environ.get('CALCULADORA_ALMACEN_TOTAL_MB', 256)) * 1024 * 1024)
+)
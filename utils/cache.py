@@ -0,0 +1,149 @@
+"""
+Caché compartida entre sesiones para los resultados de los cálculos.
+Las entradas se identifican por los parámetros normalizados de la llamada, se
+expulsan por antigüedad de uso (LRU) y caducan después de un TTL.
+
+Configuración por variables de entorno:
+    CALCULADORA_CACHE_MAX_ENTRADAS: Máximo de resultados guardados (por defecto 512)
+    CALCULADORA_CACHE_TTL: Segundos de vigencia de cada resultado (por defecto 3600)
+"""
+import copy
+import functools
+import inspect
+import os
+import threading
+import time
+from collections import OrderedDict
+import numpy as np
+import pandas as pd
+
+class CacheResultados:
+    """
+    Caché LRU acotada por número de entradas (y opcionalmente por bytes), con TTL
+    y contadores de aciertos/fallos.
+
+    Args:
+        max_entradas: Máximo de entradas guardadas
+        ttl: Segundos de vigencia de cada entrada (None para no caducar)
+        max_bytes: Tope de bytes sumando el tamaño de las entradas (None para no acotar)
+        medir: Función que devuelve el tamaño en bytes de un valor (requerida con max_bytes)
+    """
+
+    def __init__(self, max_entradas=512, ttl=3600, max_bytes=None, medir=None):
+        self.max_entradas = max_entradas
+        self.ttl = ttl
+        self.max_bytes = max_bytes
+        self._medir = medir
+        self._entradas = OrderedDict()
+        self._bytes = 0
+        self._lock = threading.Lock()
+        self.aciertos = 0
+        self.fallos = 0
+        self.expulsiones = 0
+
+    def obtener(self, clave):
+        """Devuelve (True, valor) si la clave está vigente, o (False, None) si no"""
+        with self._lock:
+            entrada = self._entradas.get(clave)
+            if entrada is not None:
+                valor, vence, _ = entrada
+                if vence is None or vence > time.monotonic():
+                    self._entradas.move_to_end(clave)
+                    self.aciertos += 1
+                    return True, valor
+                self._eliminar(clave)
+            self.fallos += 1
+            return False, None
+
+    def guardar(self, clave, valor):
+        """Guarda un valor y expulsa las entradas menos usadas si se supera el límite"""
+        vence = time.monotonic() + self.ttl if self.ttl is not None else None
+        tamano = self._medir(valor) if self._medir is not None else 0
+        if self.max_bytes is not None and tamano > self.max_bytes:
+            return
+        with self._lock:
+            if clave in self._entradas:
+                self._eliminar(clave)
+            self._entradas[clave] = (valor, vence, tamano)
+            self._bytes += tamano
+            while len(self._entradas) > self.max_entradas or (
+                    self.max_bytes is not None and self._bytes > self.max_bytes):
+                self._eliminar(next(iter(self._entradas)))
+                self.expulsiones += 1
+
+    def _eliminar(self, clave):
+        """Quita una entrada y descuenta su tamaño (se llama con el lock tomado)"""
+        _, _, tamano = self._entradas.pop(clave)
+        self._bytes -= tamano
+
+    def limpiar(self):
+        """Elimina todas las entradas y reinicia los contadores"""
+        with self._lock:
+            self._entradas.clear()
+            self._bytes = 0
+            self.aciertos = self.fallos = self.expulsiones = 0
+
+    def estadisticas(self):
+        """Devuelve los contadores de uso de la caché"""
+        with self._lock:
+            consultas = self.aciertos + self.fallos
+            return {
+                'aciertos': self.aciertos,
+                'fallos': self.fallos,
+                'tasa_aciertos': self.aciertos / consultas if consultas else 0.0,
+                'entradas': len(self._entradas),
+                'bytes': self._bytes,
+                'expulsiones': self.expulsiones,
+                'max_entradas': self.max_entradas,
+                'max_bytes': self.max_bytes,
+                'ttl': self.ttl
+            }
+
+def normalizar_valor(valor):
+    """Normaliza un parámetro para que entradas equivalentes generen la misma clave"""
+    if isinstance(valor, (bool, np.bool_)):
+        return bool(valor)
+    if isinstance(valor, (int, float, np.integer, np.floating)):
+        # 30 y 30.0 son el mismo parámetro; 12 cifras significativas absorben ruido de punto flotante
+        return float(f"{float(valor):.12g}")
+    if isinstance(valor, str):
+        return valor.strip()
+    if isinstance(valor, (list, tuple)):
+        return tuple(normalizar_valor(v) for v in valor)
+    if isinstance(valor, dict):
+        return tuple(sorted((k, normalizar_valor(v)) for k, v in valor.items()))
+    return valor
+
+def _copiar(valor):
+    """Copia los resultados mutables para que una sesión no altere lo que ve otra"""
+    if isinstance(valor, tuple):
+        return tuple(_copiar(v) for v in valor)
+    if isinstance(valor, (pd.DataFrame, np.ndarray, list, dict)):
+        return copy.deepcopy(valor) if isinstance(valor, (list, dict)) else valor.copy()
+    return valor
+
+def cachear(cache):
+    """Decorador que guarda en la caché los resultados de la función según sus parámetros"""
+    def decorador(funcion):
+        firma = inspect.signature(funcion)
+        
+        @functools.wraps(funcion)
+        def envoltura(*args, **kwargs):
+            # Se enlazan los argumentos a sus parámetros para que f(1, 2), f(1, b=2) y la
+            # llamada que omite un valor por defecto compartan la misma clave
+            argumentos = firma.bind(*args, **kwargs)
+            argumentos.apply_defaults()
+            clave = (funcion.__qualname__, normalizar_valor(argumentos.arguments))
+            encontrado, valor = cache.obtener(clave)
+            if not encontrado:
+                valor = funcion(*args, **kwargs)
+                cache.guardar(clave, valor)
+            return _copiar(valor)
+        envoltura.cache = cache
+        return envoltura
+    return decorador
+
+CACHE_CALCULOS = CacheResultados(
+    max_entradas=int(os.environ.get('CALCULADORA_CACHE_MAX_ENTRADAS', 512)),
+    ttl=float(os.environ.get('CALCULADORA_CACHE_TTL', 3600))
+)
@@ -1,12 +1,178 @@
 import numpy as np
 import pandas as pd
+from utils.cache import CACHE_CALCULOS, cachear
+
+PERIODOS_ANUALES = {'Mensual': 12, 'Bimestral': 6, 'Trimestral': 4,
+                    'Cuatrimestral': 3, 'Semestral': 2, 'Anual': 1}
 
 def tasa_equivalente(tea, periodos_anuales):
     """Convierte TEA a tasa periódica equivalente"""
     return (1 + tea/100) ** (1/periodos_anuales) - 1
 
+def calcular_crecimiento_cartera_vectorizado(monto_inicial, aporte_periodico, tea, periodos_totales, periodos_anuales):
+    """
+    Calcula el crecimiento de la cartera en forma cerrada con NumPy.
+    
+    Devuelve un diccionario de columnas (Periodo, Aporte, Interés, Saldo, Total Aportes)
+    como arreglos float64 sin redondear, más el saldo final y el total aportado.
+    El redondeo queda para el momento de mostrar los datos.
+    """
+    tasa_periodica = tasa_equivalente(tea, periodos_anuales)
+    periodos = np.arange(1, periodos_totales + 1)
+    periodos_f = periodos.astype(np.float64)
+    
+    if tasa_periodica == 0:
+        saldo = monto_inicial + aporte_periodico * periodos_f
+    else:
+        # (1 + r)^k - 1 calculado con expm1/log1p para no perder precisión con tasas pequeñas
+        crecimiento = np.expm1(periodos_f * np.log1p(tasa_periodica))
+        saldo = monto_inicial * (1 + crecimiento) + aporte_periodico * crecimiento / tasa_periodica
+    
+    saldo_anterior = np.concatenate(([float(monto_inicial)], saldo[:-1]))[:periodos_totales]
+    interes = saldo_anterior * tasa_periodica
+    total_aportes = monto_inicial + aporte_periodico * periodos_f
+    
+    columnas = {
+        'Periodo': periodos,
+        'Aporte': np.full(periodos_totales, aporte_periodico, dtype=np.float64),
+        'Interés': interes,
+        'Saldo': saldo,
+        'Total Aportes': total_aportes
+    }
+    
+    saldo_final = float(saldo[-1]) if periodos_totales > 0 else float(monto_inicial)
+    total_final = float(total_aportes[-1]) if periodos_totales > 0 else float(monto_inicial)
+    
+    return columnas, saldo_final, total_final
+
+@cachear(CACHE_CALCULOS)
 def calcular_crecimiento_cartera(monto_inicial, aporte_periodico, tea, periodos_totales, periodos_anuales):
     """Calcula el crecimiento de la cartera periodo por periodo"""
+    columnas, saldo_final, total_aportes = calcular_crecimiento_cartera_vectorizado(
+        monto_inicial, aporte_periodico, tea, periodos_totales, periodos_anuales
+    )
+    return pd.DataFrame(columnas), saldo_final, total_aportes
+
+def calcular_escenarios_cartera(monto_inicial, aporte_periodico, tea, anos, periodos_anuales=12,
+                               grilla=False, tamano_bloque=1_000_000):
+    """
+    Calcula saldo final y total aportado para muchas combinaciones de parámetros a la vez.
+    
+    Args:
+        monto_inicial, aporte_periodico, tea, anos: Escalares o arreglos. Con grilla=False
+            se combinan por broadcasting de NumPy; con grilla=True se evalúa el producto
+            cartesiano de los cuatro ejes (en ese orden).
+        periodos_anuales: Número de aportes por año (común a todos los escenarios)
+        grilla: Si es True, construye la grilla completa de combinaciones
+        tamano_bloque: Máximo de escenarios procesados por bloque, para acotar la memoria
+    
+    Returns:
+        dict: {'saldo_final': ndarray, 'total_aportes': ndarray} con la forma del broadcasting
+    """
+    ejes = [np.asarray(valor, dtype=np.float64) for valor in (monto_inicial, aporte_periodico, tea, anos)]
+    
+    if grilla:
+        ejes = [eje.ravel() for eje in ejes]
+        forma = tuple(eje.size for eje in ejes)
+        ejes = [eje.reshape([-1 if i == j else 1 for j in range(4)]) for i, eje in enumerate(ejes)]
+    else:
+        forma = np.broadcast_shapes(*(eje.shape for eje in ejes))
+    
+    # Los factores de capitalización solo dependen de (tea, años): se calculan una vez
+    # sobre su propio broadcasting, que suele ser mucho menor que la grilla completa
+    m, a, t, n_anos = ejes
+    tasa = (1 + t / 100) ** (1 / periodos_anuales) - 1
+    periodos = np.round(n_anos * periodos_anuales)
+    crecimiento = np.expm1(periodos * np.log1p(tasa))
+    with np.errstate(divide='ignore', invalid='ignore'):
+        factor_aportes = np.where(tasa == 0, periodos, crecimiento / tasa)
+    factor_capital = 1 + crecimiento
+    
+    ejes_bloque = [eje.reshape((1,) * (len(forma) - eje.ndim) + eje.shape)
+                   for eje in (m, a, factor_capital, factor_aportes, periodos)]
+    
+    saldo_final = np.empty(forma, dtype=np.float64)
+    total_aportes = np.empty(forma, dtype=np.float64)
+    
+    if saldo_final.ndim == 0:
+        m, a, fc, fa, n = ejes_bloque
+        saldo_final[...] = m * fc + a * fa
+        total_aportes[...] = m + a * n
+    else:
+        # Se corta por el primer eje cuyos ejes siguientes entran en un bloque y se recorren
+        # los índices anteriores a él: así los temporales quedan acotados con cualquier
+        # forma, incluso (1, N), sin perder el broadcasting dentro de cada bloque
+        eje_corte = next(d for d in range(len(forma)) if int(np.prod(forma[d + 1:])) <= tamano_bloque)
+        filas_bloque = max(1, tamano_bloque // max(1, int(np.prod(forma[eje_corte + 1:]))))
+        for prefijo in np.ndindex(*forma[:eje_corte]):
+            for inicio in range(0, forma[eje_corte], filas_bloque):
+                filas = slice(inicio, inicio + filas_bloque)
+                m, a, fc, fa, n = (
+                    eje[tuple(i if eje.shape[d] > 1 else 0 for d, i in enumerate(prefijo))
+                        + (filas if eje.shape[eje_corte] > 1 else slice(None),)]
+                    for eje in ejes_bloque
+                )
+                saldo_final[prefijo + (filas,)] = m * fc + a * fa
+                total_aportes[prefijo + (filas,)] = m + a * n
+    
+    return {
+        'saldo_final': saldo_final,
+        'total_aportes': total_aportes
+    }
+
+def calcular_aporte_requerido(meta, monto_inicial, tea, periodos_totales, periodos_anuales):
+    """
+    Calcula el aporte periódico necesario para alcanzar la meta de saldo (forma cerrada).
+    
+    Acepta escalares o arreglos combinados por broadcasting. Si el monto inicial ya
+    alcanza la meta por sí solo, el aporte requerido es 0.
+    """
+    meta, monto_inicial, tea, periodos = (
+        np.asarray(valor, dtype=np.float64) for valor in (meta, monto_inicial, tea, periodos_totales)
+    )
+    tasa = (1 + tea/100) ** (1/periodos_anuales) - 1
+    crecimiento = np.expm1(periodos * np.log1p(tasa))
+    with np.errstate(divide='ignore', invalid='ignore'):
+        factor_aportes = np.where(tasa == 0, periodos, crecimiento / tasa)
+        aporte = (meta - monto_inicial * (1 + crecimiento)) / factor_aportes
+    return np.maximum(aporte, 0)
+
+def calcular_plazo_requerido(meta, monto_inicial, aporte_periodico, tea, periodos_anuales):
+    """
+    Calcula el número de periodos (fraccionario) necesario para alcanzar la meta (forma cerrada).
+    
+    Acepta escalares o arreglos combinados por broadcasting. Devuelve inf cuando la
+    meta no se alcanza nunca (sin aportes ni rendimiento suficiente).
+    """
+    meta, monto_inicial, aporte_periodico, tea = (
+        np.asarray(valor, dtype=np.float64) for valor in (meta, monto_inicial, aporte_periodico, tea)
+    )
+    tasa = (1 + tea/100) ** (1/periodos_anuales) - 1
+    with np.errstate(divide='ignore', invalid='ignore'):
+        # Con tasa r: meta = (M + A/r)(1 + r)^n - A/r  =>  n = ln((meta·r + A) / (M·r + A)) / ln(1 + r)
+        con_tasa = np.log((meta * tasa + aporte_periodico) / (monto_inicial * tasa + aporte_periodico)) / np.log1p(tasa)
+        sin_tasa = (meta - monto_inicial) / aporte_periodico
+        periodos = np.where(tasa == 0, sin_tasa, con_tasa)
+    periodos = np.where(np.isnan(periodos) | (periodos < 0), np.inf, periodos)
+    return np.where(meta <= monto_inicial, 0.0, periodos)
+
+def calcular_tea_requerida(meta, monto_inicial, aporte_periodico, periodos_totales, periodos_anuales):
+    """
+    Calcula la TEA (%) necesaria para alcanzar la meta de saldo.
+    
+    No tiene forma cerrada: equivale a la TIR del flujo de aportes cuando se recibe la
+    meta al final, y se resuelve con el mismo método acotado de calcular_tir_cartera.
+    Acepta escalares o arreglos combinados por broadcasting. Devuelve NaN cuando la
+    meta no se alcanza con ninguna tasa (por ejemplo, sin monto inicial ni aportes).
+    """
+    forma = np.broadcast(meta, monto_inicial, aporte_periodico, periodos_totales).shape
+    resultado = calcular_tir_cartera(monto_inicial, aporte_periodico, meta, periodos_totales, periodos_anuales)
+    sin_salidas = (np.asarray(monto_inicial) == 0) & (np.asarray(aporte_periodico) == 0)
+    tea = np.where(resultado['convergio'] & ~sin_salidas, resultado['tea'], np.nan)
+    return tea.reshape(forma)
+
+def calcular_crecimiento_cartera_referencia(monto_inicial, aporte_periodico, tea, periodos_totales, periodos_anuales):
+    """Implementación de referencia (bucle periodo por periodo) del crecimiento de la cartera"""
     tasa_periodica = tasa_equivalente(tea, periodos_anuales)
     
     datos = []
@@ -28,6 +194,7 @@ def calcular_crecimiento_cartera(monto_inicial, aporte_periodico, tea, periodos_
     
     return pd.DataFrame(datos), saldo, total_aportes
 
+@cachear(CACHE_CALCULOS)
 def calcular_pension_mensual(capital, tea, anos_retiro):
     """Calcula la pensión mensual que se puede retirar"""
     tasa_mensual = tasa_equivalente(tea, 12)
@@ -45,13 +212,365 @@ def calcular_impuesto(ganancia, tipo_impuesto):
     tasas = {'local': 0.05, 'extranjera': 0.295}
     return ganancia * tasas.get(tipo_impuesto, 0)
 
+def calcular_jubilacion(capital_bruto, total_aportes, tipo_impuesto, opcion_retiro, anos_retiro=None, tea_retiro=None):
+    """Calcula impuesto, capital neto y pensión; devuelve el dict que usa el reporte"""
+    ganancia = capital_bruto - total_aportes
+    if ganancia < 0:
+        raise ValueError("El capital acumulado no puede ser menor que el total aportado")
+
+    impuesto = calcular_impuesto(ganancia, tipo_impuesto)
+    capital_neto = capital_bruto - impuesto
+
+    if opcion_retiro == "Pensión Mensual":
+        pension_mensual = calcular_pension_mensual(capital_neto, tea_retiro, anos_retiro)
+    else:
+        pension_mensual = 0
+
+    return {
+        'capital_bruto': capital_bruto,
+        'total_aportes': total_aportes,
+        'ganancia': ganancia,
+        'impuesto': impuesto,
+        'capital_neto': capital_neto,
+        'pension_mensual': pension_mensual,
+        'tipo_impuesto': tipo_impuesto,
+        'opcion_retiro': opcion_retiro,
+        'anos_retiro': anos_retiro,
+        'tea_retiro': tea_retiro
+    }
+
+def comparar_edades_retiro(capital_neto, tea_retiro=None, edades=(60, 62, 65, 68, 70)):
+    """Pensión mensual (20 años de retiro) según la edad de jubilación, tomando 65 como referencia"""
+    # Sin TEA de retiro (por ejemplo en 'Cobro Total') se usa 5% por defecto
+    tea = 5.0 if tea_retiro is None else tea_retiro
+
+    pensiones = []
+    for edad in edades:
+        # Capital futuro usando la tasa de retiro
+        capital_futuro = capital_neto * (1 + tea/100) ** (edad - 65)
+        pensiones.append(calcular_pension_mensual(capital_futuro, tea, 20))
+
+    return pd.DataFrame({'Edad': list(edades), 'Pensión Mensual': pensiones})
+
+@cachear(CACHE_CALCULOS)
 def calcular_valor_bono(valor_nominal, tasa_cupon, frecuencia_pago, anos, tea_mercado):
     """Calcula el valor presente de un bono"""
-    periodos_anuales = {'Mensual': 12, 'Bimestral': 6, 'Trimestral': 4, 
-                        'Cuatrimestral': 3, 'Semestral': 2, 'Anual': 1}
+    n_periodos = PERIODOS_ANUALES[frecuencia_pago]
+    periodos_totales = int(round(anos * n_periodos))
+    periodos = np.arange(1, periodos_totales + 1)
+    
+    cupon = valor_nominal * tasa_equivalente(tasa_cupon, n_periodos)
+    
+    # Vector de factores de descuento (1 + i)^-k construido una sola vez
+    descuento = (1 + tea_mercado/100) ** (-periodos / n_periodos)
+    
+    flujos = np.full(periodos_totales, cupon, dtype=np.float64)
+    if periodos_totales > 0:
+        flujos[-1] += valor_nominal
+    vp_flujos = flujos * descuento
+    
+    df = pd.DataFrame({
+        'Periodo': periodos,
+        'Flujo': flujos,
+        'VP Flujo': vp_flujos
+    })
+    
+    return df, float(vp_flujos.sum())
+
+def calcular_sensibilidad_bono(valor_nominal, tasa_cupon, frecuencia_pago, anos, tasas=None):
+    """
+    Evalúa precio, duración y convexidad de un bono sobre una grilla de TEA de mercado.
+    
+    Todo se obtiene de una sola matriz tasa × periodo de factores de descuento, sin
+    revalorizar el bono tasa por tasa. Los tiempos se miden en años, así que la
+    duración modificada y la convexidad son respecto a la TEA.
+    
+    Args:
+        tasas: TEA de mercado (%) a evaluar. Por defecto 0% a 50% en pasos de 1 pb.
+    
+    Returns:
+        DataFrame con TEA, VP, Duración Macaulay, Duración Modificada y Convexidad
+    """
+    if tasas is None:
+        tasas = np.round(np.arange(0, 5001) * 0.01, 2)
+    tasas = np.atleast_1d(np.asarray(tasas, dtype=np.float64))
+    
+    n_periodos = PERIODOS_ANUALES[frecuencia_pago]
+    periodos_totales = int(round(anos * n_periodos))
+    tiempos = np.arange(1, periodos_totales + 1) / n_periodos
     
-    n_periodos = periodos_anuales[frecuencia_pago]
-    periodos_totales = anos * n_periodos
+    flujos = np.full(periodos_totales, valor_nominal * tasa_equivalente(tasa_cupon, n_periodos))
+    if periodos_totales > 0:
+        flujos[-1] += valor_nominal
+    
+    log_descuento = np.log1p(tasas / 100)[:, None]
+    vp_flujos = flujos * np.exp(-tiempos * log_descuento)
+    
+    vp = vp_flujos.sum(axis=1)
+    with np.errstate(divide='ignore', invalid='ignore'):
+        macaulay = (vp_flujos @ tiempos) / vp
+        convexidad = (vp_flujos @ (tiempos * (tiempos + 1))) / (vp * (1 + tasas / 100) ** 2)
+    modificada = macaulay / (1 + tasas / 100)
+    
+    return pd.DataFrame({
+        'TEA': tasas,
+        'VP': vp,
+        'Duración Macaulay': macaulay,
+        'Duración Modificada': modificada,
+        'Convexidad': convexidad
+    })
+
+def resolver_tasa_interna(flujos, valor_presente, tasa_inicial=0.05, tolerancia=1e-12,
+                          max_iteraciones=200, limite_inferior=-0.9):
+    """
+    Resuelve la tasa periódica que iguala el valor presente de cada fila de flujos al objetivo.
+    
+    Usa Newton-Raphson protegido por bisección (cada paso de Newton que sale del
+    intervalo o no reduce el paso lo suficiente se reemplaza por bisección), de modo
+    que la convergencia está garantizada cuando hay cambio de signo en el intervalo.
+    Todas las filas se resuelven a la vez.
+    
+    Args:
+        flujos: Matriz (instrumentos × periodos) con los flujos de los periodos 1..N;
+            los instrumentos más cortos se completan con ceros
+        valor_presente: Valor en t=0 que deben igualar los flujos descontados
+        tasa_inicial: Punto de partida de Newton (tasa periódica)
+        tolerancia: Tolerancia sobre el paso en la tasa periódica
+        max_iteraciones: Máximo de iteraciones por instrumento
+        limite_inferior: Extremo inferior del intervalo de búsqueda (tasa periódica)
+    
+    Returns:
+        tuple: (tasas periódicas, iteraciones, convergió) como arreglos por instrumento;
+               la tasa es NaN si no existe cambio de signo en el intervalo
+    """
+    flujos = np.atleast_2d(np.asarray(flujos, dtype=np.float64))
+    n_instrumentos = flujos.shape[0]
+    objetivo = np.broadcast_to(np.asarray(valor_presente, dtype=np.float64), (n_instrumentos,))
+    periodos = np.arange(1, flujos.shape[1] + 1, dtype=np.float64)
+    
+    def evaluar(indices, tasas):
+        with np.errstate(over='ignore', invalid='ignore'):
+            vp_flujos = flujos[indices] * np.exp(-np.outer(np.log1p(tasas), periodos))
+            valor = vp_flujos.sum(axis=1) - objetivo[indices]
+            derivada = -(vp_flujos @ periodos) / (1 + tasas)
+        return valor, derivada
+    
+    todos = np.arange(n_instrumentos)
+    # Con plazos largos (1 + r)^-N se desborda cerca de r = -1; se acota el extremo inferior
+    limite_inferior = max(limite_inferior, np.expm1(-600.0 / max(len(periodos), 1)))
+    inferior = np.full(n_instrumentos, float(limite_inferior))
+    superior = np.ones(n_instrumentos)
+    valor_inferior, _ = evaluar(todos, inferior)
+    valor_superior, _ = evaluar(todos, superior)
+    
+    # Se amplía el extremo superior hasta encontrar el cambio de signo
+    for _ in range(60):
+        sin_cambio = np.sign(valor_superior) == np.sign(valor_inferior)
+        if not sin_cambio.any():
+            break
+        indices = np.flatnonzero(sin_cambio)
+        superior[indices] *= 2
+        valor_superior[indices], _ = evaluar(indices, superior[indices])
+    
+    # Solo hay raíz con un cambio de signo real y finito, o con un cero exacto en un
+    # extremo si el flujo completo (incluido -objetivo en t=0) tiene ambos signos: con
+    # tasas enormes el valor presente se anula por underflow sin que exista raíz
+    ambos_signos = (((flujos > 0).any(axis=1) | (objetivo < 0))
+                    & ((flujos < 0).any(axis=1) | (objetivo > 0)))
+    extremos_finitos = np.isfinite(valor_inferior) & np.isfinite(valor_superior)
+    cero_en_extremo = ((valor_inferior == 0) | (valor_superior == 0)) & ambos_signos
+    valido = np.isfinite(objetivo) & extremos_finitos & (
+        (np.sign(valor_superior) * np.sign(valor_inferior) < 0) | cero_en_extremo
+    )
+    tasas = np.clip(np.full(n_instrumentos, float(tasa_inicial)), inferior, superior)
+    paso_anterior = superior - inferior
+    iteraciones = np.zeros(n_instrumentos, dtype=np.int64)
+    convergio = ~valido
+    
+    for _ in range(max_iteraciones):
+        activos = np.flatnonzero(~convergio)
+        if activos.size == 0:
+            break
+        iteraciones[activos] += 1
+        
+        x = tasas[activos]
+        valor, derivada = evaluar(activos, x)
+        
+        # Actualizar el intervalo según el signo en el punto actual
+        mismo_signo = np.sign(valor) == np.sign(valor_inferior[activos])
+        a = np.where(mismo_signo, x, inferior[activos])
+        b = np.where(mismo_signo, superior[activos], x)
+        valor_inferior[activos] = np.where(mismo_signo, valor, valor_inferior[activos])
+        inferior[activos], superior[activos] = a, b
+        
+        with np.errstate(divide='ignore', invalid='ignore'):
+            newton = x - valor / derivada
+        preciso = np.isfinite(newton) & (np.abs(newton - x) <= tolerancia * (1 + np.abs(x)))
+        usar_newton = (
+            np.isfinite(newton) & (newton > a) & (newton < b)
+            & (np.abs(newton - x) < 0.5 * np.abs(paso_anterior[activos]))
+        )
+        nuevo = np.where(usar_newton | preciso, newton, 0.5 * (a + b))
+        nuevo = np.where(valor == 0, x, nuevo)
+        
+        paso_anterior[activos] = nuevo - x
+        tasas[activos] = nuevo
+        convergio[activos] = (valor == 0) | preciso | (b - a <= tolerancia * (1 + np.abs(x)))
+    
+    tasas[~valido] = np.nan
+    return tasas, iteraciones, convergio & valido
+
+def calcular_ytm_bono(precio, valor_nominal, tasa_cupon, frecuencia_pago, anos):
+    """
+    Calcula el rendimiento al vencimiento (TEA implícita) dado el precio observado.
+    
+    Todos los argumentos aceptan escalares o arreglos del mismo largo (un bono por
+    posición), de modo que miles de bonos se resuelven en una sola llamada.
+    
+    Returns:
+        dict: {'tea': TEA implícita (%), 'iteraciones': iteraciones usadas,
+               'convergio': indicador de convergencia}
+    """
+    if isinstance(frecuencia_pago, str) or np.ndim(frecuencia_pago) == 0:
+        frecuencia_pago = [frecuencia_pago]
+    frecuencia = normalizar_frecuencias(frecuencia_pago)
+    
+    precio, valor_nominal, tasa_cupon, anos, frecuencia = np.broadcast_arrays(
+        *(np.atleast_1d(np.asarray(valor, dtype=np.float64))
+          for valor in (precio, valor_nominal, tasa_cupon, anos, frecuencia))
+    )
+    periodos_totales = np.round(anos * frecuencia).astype(np.int64)
+    cupon = valor_nominal * ((1 + tasa_cupon/100) ** (1 / frecuencia) - 1)
+    
+    periodos = np.arange(1, int(periodos_totales.max(initial=0)) + 1)[None, :]
+    n = periodos_totales[:, None]
+    flujos = np.where(periodos <= n, cupon[:, None], 0.0) + np.where(periodos == n, valor_nominal[:, None], 0.0)
+    
+    tasas, iteraciones, convergio = resolver_tasa_interna(flujos, precio)
+    
+    return {
+        'tea': ((1 + tasas) ** frecuencia - 1) * 100,
+        'iteraciones': iteraciones,
+        'convergio': convergio
+    }
+
+def calcular_tir_cartera(monto_inicial, aporte_periodico, saldo_final, periodos_totales, periodos_anuales):
+    """
+    Calcula la TIR (como TEA, en %) del flujo de aportes de la cartera.
+    
+    El inversionista entrega el monto inicial en t=0 y un aporte al final de cada
+    periodo, y recibe el saldo final en el último periodo. Acepta escalares o arreglos
+    que se combinan por broadcasting.
+    
+    Returns:
+        dict: {'tea': TIR anual efectiva (%), 'iteraciones': iteraciones usadas,
+               'convergio': indicador de convergencia}
+    """
+    monto_inicial, aporte_periodico, saldo_final, periodos_totales = np.broadcast_arrays(
+        *(np.atleast_1d(np.asarray(valor, dtype=np.float64))
+          for valor in (monto_inicial, aporte_periodico, saldo_final, periodos_totales))
+    )
+    forma = monto_inicial.shape
+    monto_inicial, aporte_periodico, saldo_final = monto_inicial.ravel(), aporte_periodico.ravel(), saldo_final.ravel()
+    n = periodos_totales.ravel().astype(np.int64)[:, None]
+    
+    periodos = np.arange(1, int(n.max(initial=0)) + 1)[None, :]
+    flujos = (np.where(periodos <= n, -aporte_periodico[:, None], 0.0)
+              + np.where(periodos == n, saldo_final[:, None], 0.0))
+    
+    tasas, iteraciones, convergio = resolver_tasa_interna(flujos, monto_inicial)
+    
+    return {
+        'tea': (((1 + tasas) ** periodos_anuales - 1) * 100).reshape(forma),
+        'iteraciones': iteraciones.reshape(forma),
+        'convergio': convergio.reshape(forma)
+    }
+
+def normalizar_frecuencias(frecuencias):
+    """Convierte frecuencias de pago (nombre o pagos por año) a número de pagos por año"""
+    validas = set(PERIODOS_ANUALES.values())
+    resultado = []
+    for frecuencia in frecuencias:
+        if isinstance(frecuencia, str) and frecuencia.strip().capitalize() in PERIODOS_ANUALES:
+            resultado.append(PERIODOS_ANUALES[frecuencia.strip().capitalize()])
+            continue
+        try:
+            valor = int(float(frecuencia))
+        except (TypeError, ValueError):
+            valor = None
+        if valor not in validas:
+            raise ValueError(f"Frecuencia de pago no reconocida: {frecuencia!r}")
+        resultado.append(valor)
+    return np.array(resultado, dtype=np.int64)
+
+def valorar_cartera_bonos(bonos, tamano_bloque=2_000_000):
+    """
+    Valora una tabla de bonos en una sola llamada vectorizada.
+    
+    Args:
+        bonos: DataFrame con las columnas valor_nominal, tasa_cupon, frecuencia_pago,
+            anos y tea_mercado (una fila por bono). La frecuencia puede venir como
+            nombre ('Semestral') o como pagos por año (2).
+        tamano_bloque: Máximo de celdas bono × periodo materializadas a la vez
+    
+    Returns:
+        tuple: (DataFrame de bonos con Periodos, Cupón y VP;
+                DataFrame de la escalera agregada de flujos por mes con Flujo y VP Flujo)
+    """
+    valor_nominal = bonos['valor_nominal'].to_numpy(dtype=np.float64)
+    tasa_cupon = bonos['tasa_cupon'].to_numpy(dtype=np.float64)
+    tea_mercado = bonos['tea_mercado'].to_numpy(dtype=np.float64)
+    frecuencia = normalizar_frecuencias(bonos['frecuencia_pago'])
+    periodos_totales = np.round(bonos['anos'].to_numpy(dtype=np.float64) * frecuencia).astype(np.int64)
+    
+    cupon = valor_nominal * ((1 + tasa_cupon/100) ** (1 / frecuencia) - 1)
+    log_descuento = np.log1p(tea_mercado/100)
+    
+    vp = np.zeros(len(bonos), dtype=np.float64)
+    meses_max = int((periodos_totales * (12 // np.maximum(frecuencia, 1))).max()) if len(bonos) else 0
+    escalera_flujo = np.zeros(meses_max + 1, dtype=np.float64)
+    escalera_vp = np.zeros(meses_max + 1, dtype=np.float64)
+    
+    # Bloques de bonos para que la matriz bono × periodo no crezca sin límite
+    max_periodos = int(periodos_totales.max()) if len(bonos) else 0
+    filas_bloque = max(1, tamano_bloque // max(max_periodos, 1))
+    
+    for inicio in range(0, len(bonos), filas_bloque):
+        fin = min(inicio + filas_bloque, len(bonos))
+        n = periodos_totales[inicio:fin, None]
+        f = frecuencia[inicio:fin, None]
+        periodos = np.arange(1, int(n.max()) + 1)[None, :]
+        
+        vigente = periodos <= n
+        flujos = np.where(vigente, cupon[inicio:fin, None], 0.0)
+        flujos += np.where(periodos == n, valor_nominal[inicio:fin, None], 0.0)
+        vp_flujos = flujos * np.exp(-(periodos / f) * log_descuento[inicio:fin, None])
+        
+        vp[inicio:fin] = vp_flujos.sum(axis=1)
+        
+        # Todas las frecuencias dividen a 12, así que cada flujo cae en un mes entero
+        meses = periodos * (12 // f)
+        escalera_flujo += np.bincount(meses[vigente], weights=flujos[vigente], minlength=meses_max + 1)
+        escalera_vp += np.bincount(meses[vigente], weights=vp_flujos[vigente], minlength=meses_max + 1)
+    
+    resultados = bonos.copy()
+    resultados['Periodos'] = periodos_totales
+    resultados['Cupón'] = cupon
+    resultados['VP'] = vp
+    
+    con_flujo = np.flatnonzero(escalera_flujo)
+    escalera = pd.DataFrame({
+        'Mes': con_flujo,
+        'Flujo': escalera_flujo[con_flujo],
+        'VP Flujo': escalera_vp[con_flujo]
+    })
+    
+    return resultados, escalera
+
+def calcular_valor_bono_referencia(valor_nominal, tasa_cupon, frecuencia_pago, anos, tea_mercado):
+    """Implementación de referencia (bucle periodo por periodo) del valor presente de un bono"""
+    n_periodos = PERIODOS_ANUALES[frecuencia_pago]
+    periodos_totales = int(round(anos * n_periodos))
     
     tasa_cupon_periodica = tasa_equivalente(tasa_cupon, n_periodos)
     tasa_descuento_periodica = tasa_equivalente(tea_mercado, n_periodos)
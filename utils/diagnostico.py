@@ -0,0 +1,151 @@
+"""
+Tiempos por etapa (cálculo, armado de gráficos, rasterización, PDF) para saber en qué
+se va el tiempo cuando la aplicación se siente lenta.
+
+Cada etapa se mide con `medir` (o el decorador `medido`) y su duración se registra en
+REGISTRO_PROCESO, en el registro de la sesión activa (si lo hay) y como una línea de
+log en JSON en el logger 'utils.diagnostico'. Los registros guardan las últimas
+MAX_MUESTRAS duraciones de cada etapa y calculan p50/p95 al pedir el resumen.
+No importa Streamlit: la sesión activa la fija la interfaz al medir sus etapas.
+
+Configuración por variables de entorno:
+    CALCULADORA_DIAGNOSTICO_LOG: Si tiene valor, las líneas de log se escriben en stderr
+"""
+import contextvars
+import functools
+import json
+import logging
+import math
+import os
+import sys
+import threading
+import time
+from collections import defaultdict, deque
+from contextlib import contextmanager
+
+logger = logging.getLogger(__name__)
+
+if os.environ.get('CALCULADORA_DIAGNOSTICO_LOG'):
+    _manejador = logging.StreamHandler(sys.stderr)
+    _manejador.setFormatter(logging.Formatter('%(asctime)s %(name)s %(message)s'))
+    logger.addHandler(_manejador)
+    logger.setLevel(logging.INFO)
+
+# Duraciones que se conservan por etapa: el resumen refleja el uso reciente
+MAX_MUESTRAS = 500
+
+# Registro de la sesión que se está midiendo. Los hilos del pool de rasterización lo
+# heredan porque las tareas se encolan con una copia del contexto
+_registro_activo = contextvars.ContextVar('registro_activo', default=None)
+
+def _percentil(ordenados, p):
+    """Percentil por rango más cercano de una lista ya ordenada"""
+    return ordenados[max(0, math.ceil(p * len(ordenados)) - 1)]
+
+class RegistroTiempos:
+    """
+    Últimas duraciones de cada etapa, para un proceso o una sesión.
+
+    Args:
+        sesion: Identificador que acompaña las líneas de log (None para el proceso)
+        max_muestras: Duraciones que se conservan por etapa
+    """
+
+    def __init__(self, sesion=None, max_muestras=MAX_MUESTRAS):
+        self.sesion = sesion
+        self.max_muestras = max_muestras
+        self._muestras = defaultdict(lambda: deque(maxlen=self.max_muestras))
+        self._cantidad = defaultdict(int)
+        self._lock = threading.Lock()
+
+    def registrar(self, etapa, segundos):
+        with self._lock:
+            self._muestras[etapa].append(segundos)
+            self._cantidad[etapa] += 1
+
+    def resumen(self):
+        """
+        Estadísticas de cada etapa, ordenadas por nombre.
+
+        Returns:
+            dict: etapa -> {'n' (mediciones totales), 'p50', 'p95', 'maximo' y 'ultimo'
+            (segundos, sobre las últimas max_muestras)}
+        """
+        with self._lock:
+            copia = {etapa: (list(muestras), self._cantidad[etapa]) for etapa, muestras in self._muestras.items()}
+        resumen = {}
+        for etapa in sorted(copia):
+            muestras, cantidad = copia[etapa]
+            ordenados = sorted(muestras)
+            resumen[etapa] = {
+                'n': cantidad,
+                'p50': _percentil(ordenados, 0.5),
+                'p95': _percentil(ordenados, 0.95),
+                'maximo': ordenados[-1],
+                'ultimo': muestras[-1]
+            }
+        return resumen
+
+    def limpiar(self):
+        with self._lock:
+            self._muestras.clear()
+            self._cantidad.clear()
+
+REGISTRO_PROCESO = RegistroTiempos()
+
+def registrar(etapa, segundos, error=None, **datos):
+    """
+    Registra una duración ya medida en el proceso, la sesión activa y el log.
+    Las etapas interrumpidas (error, o una nueva ejecución de Streamlit) solo van al log.
+    """
+    registro = _registro_activo.get()
+    if error is None:
+        REGISTRO_PROCESO.registrar(etapa, segundos)
+        if registro is not None:
+            registro.registrar(etapa, segundos)
+    if logger.isEnabledFor(logging.INFO):
+        linea = {'evento': 'etapa', 'etapa': etapa, 'ms': round(segundos * 1000, 3),
+                 'sesion': registro.sesion if registro is not None else None,
+                 'hilo': threading.current_thread().name, 'error': error, **datos}
+        logger.info(json.dumps(linea, ensure_ascii=False, default=str))
+
+@contextmanager
+def medir(etapa, registro=None, **datos):
+    """
+    Mide la duración del bloque como la etapa indicada.
+
+    Args:
+        etapa: Nombre de la etapa, como 'calculo/cartera' o 'pdf/construir'
+        registro: RegistroTiempos de la sesión; las etapas anidadas (también las de
+            utils) se registran en él mientras dura el bloque
+        **datos: Valores adicionales para la línea de log (tamaños, backend, etc.)
+
+    Devuelve (con `as`) el dict de datos, para agregar valores que se conocen dentro del bloque.
+    """
+    token = _registro_activo.set(registro) if registro is not None else None
+    error = None
+    inicio = time.perf_counter()
+    try:
+        yield datos
+    except BaseException as e:
+        error = type(e).__name__
+        raise
+    finally:
+        registrar(etapa, time.perf_counter() - inicio, error, **datos)
+        if token is not None:
+            _registro_activo.reset(token)
+
+def medido(etapa):
+    """Decorador que mide cada llamada a la función como la etapa indicada"""
+    def decorador(funcion):
+        @functools.wraps(funcion)
+        def envoltura(*args, **kwargs):
+            with medir(etapa):
+                return funcion(*args, **kwargs)
+        return envoltura
+    return decorador
+
+def en_contexto(funcion, *args, **kwargs):
+    """Envuelve la llamada para ejecutarla en otro hilo sin perder la sesión activa"""
+    contexto = contextvars.copy_context()
+    return functools.partial(contexto.run, funcion, *args, **kwargs)
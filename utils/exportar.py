@@ -2,33 +2,71 @@ from reportlab.lib.pagesizes import letter
 from reportlab.lib import colors
 from reportlab.lib.styles import getSampleStyleSheet, ParagraphStyle
 from reportlab.lib.units import inch
-from reportlab.platypus import SimpleDocTemplate, Table, TableStyle, Paragraph, Spacer, PageBreak, KeepTogether
+from reportlab.platypus import SimpleDocTemplate, Table, LongTable, TableStyle, Paragraph, Spacer, PageBreak, KeepTogether
 from datetime import datetime
+import functools
+import hashlib
 import io
+import os
+import pandas as pd
+from PIL import Image as ImagenPIL
 from reportlab.platypus import Image
 from reportlab.pdfgen import canvas
+from utils.cache import CacheResultados, normalizar_valor
+from utils.diagnostico import medido, medir
+from utils.graficos_pdf import dibujo_cartera, dibujo_flujos_bono, dibujo_sensibilidad_bono
+
+# Se incrementa cuando cambia el diseño del reporte, para invalidar los PDF guardados
+PLANTILLA_VERSION = 1
+
+# Reportes ya generados por contenido, acotados en bytes (CALCULADORA_CACHE_REPORTES_MB, por defecto 64)
+CACHE_REPORTES = CacheResultados(
+    max_entradas=64,
+    ttl=None,
+    max_bytes=int(float(os.environ.get('CALCULADORA_CACHE_REPORTES_MB', 64)) * 1024 * 1024),
+    medir=len
+)
+
+# Tamaño con el que se colocan los gráficos en el PDF
+ANCHO_GRAFICO = 5.5*inch
+ALTO_GRAFICO = 3*inch
+
+# Perfiles de exportación: resolución de los gráficos en el PDF y cómo se codifican
+PERFILES_EXPORTACION = {
+    'pantalla': {'dpi': 110, 'formato': 'JPEG', 'calidad': 80},
+    'impresion': {'dpi': 200, 'formato': 'JPEG', 'calidad': 90},
+    'archivo': {'dpi': 300, 'formato': 'PNG', 'calidad': None}
+}
+
+# Alto de cada fila de las tablas de detalle (fuente 8 más el relleno superior e inferior)
+ALTO_FILA_DETALLE = 21
 
 class PDFConEncabezadoPiePagina(canvas.Canvas):
-    """Clase personalizada para agregar encabezado y pie de página"""
+    """
+    Clase personalizada para agregar encabezado y pie de página.
+    Cada página se escribe al terminarla; el texto "Página n de T" se dibuja con un
+    formulario por página que se define al guardar, cuando ya se conoce el total.
+    Así no se retiene el estado de las páginas anteriores.
+    """
     
-    def __init__(self, *args, **kwargs):
+    def __init__(self, *args, fecha_generacion=None, **kwargs):
         canvas.Canvas.__init__(self, *args, **kwargs)
-        self.pages = []
+        self.fecha_generacion = (fecha_generacion or datetime.now()).strftime('%d/%m/%Y %H:%M')
         
     def showPage(self):
-        self.pages.append(dict(self.__dict__))
-        self._startPage()
+        self.draw_page_elements(self.getPageNumber())
+        canvas.Canvas.showPage(self)
         
     def save(self):
-        page_count = len(self.pages)
-        for page_num, page in enumerate(self.pages, start=1):
-            self.__dict__.update(page)
-            self.draw_page_elements(page_num, page_count)
-            canvas.Canvas.showPage(self)
+        page_count = self.getPageNumber() - 1
+        for page_num in range(1, page_count + 1):
+            self.beginForm(f'numero_pagina_{page_num}')
+            self.draw_page_number(page_num, page_count)
+            self.endForm()
         canvas.Canvas.save(self)
         
-    def draw_page_elements(self, page_num, page_count):
-        """Dibuja el encabezado y pie de página"""
+    def draw_page_elements(self, page_num):
+        """Dibuja el encabezado y pie de página (el número de página queda como referencia al formulario)"""
         page_width, page_height = letter
         
         # Encabezado
@@ -55,16 +93,171 @@ class PDFConEncabezadoPiePagina(canvas.Canvas):
         
         self.setFillColor(colors.HexColor('#7F8C8D'))
         self.setFont('Helvetica', 9)
-        fecha_generacion = datetime.now().strftime('%d/%m/%Y %H:%M')
-        self.drawString(50, 25, f"Fecha de generación: {fecha_generacion}")
+        self.drawString(50, 25, f"Fecha de generación: {self.fecha_generacion}")
+        
+        self.doForm(f'numero_pagina_{page_num}')
         
+        self.restoreState()
+    
+    def draw_page_number(self, page_num, page_count):
+        """Dibuja "Página n de T" dentro del formulario de la página"""
+        page_width, _ = letter
+        self.setFillColor(colors.HexColor('#7F8C8D'))
         self.setFont('Helvetica-Bold', 9)
         self.drawRightString(page_width - 50, 25, f"Página {page_num} de {page_count}")
+
+@medido('pdf/imagen')
+def preparar_imagen(img_bytes, perfil='impresion'):
+    """
+    Reduce un gráfico al tamaño con el que se coloca en el PDF según el perfil
+    (nunca lo agranda) y lo codifica como PNG o JPEG.
+    
+    Returns:
+        bytes: Imagen lista para insertar en el reporte
+    """
+    ajustes = PERFILES_EXPORTACION[perfil]
+    ancho = round(ANCHO_GRAFICO / inch * ajustes['dpi'])
+    alto = round(ALTO_GRAFICO / inch * ajustes['dpi'])
+    
+    with ImagenPIL.open(io.BytesIO(img_bytes)) as imagen:
+        formato_original = imagen.format
+        # Los gráficos tienen fondo blanco: la transparencia se aplana sobre blanco
+        if imagen.mode in ('RGBA', 'LA', 'P'):
+            imagen = imagen.convert('RGBA')
+            fondo = ImagenPIL.new('RGB', imagen.size, 'white')
+            fondo.paste(imagen, mask=imagen.getchannel('A'))
+            imagen = fondo
+        elif imagen.mode != 'RGB':
+            imagen = imagen.convert('RGB')
+        if imagen.width > ancho or imagen.height > alto:
+            imagen = imagen.resize((min(ancho, imagen.width), min(alto, imagen.height)), ImagenPIL.LANCZOS)
         
-        self.restoreState()
+        salida = io.BytesIO()
+        if ajustes['formato'] == 'JPEG':
+            imagen.save(salida, format='JPEG', quality=ajustes['calidad'], optimize=True)
+        else:
+            imagen.save(salida, format='PNG')
+    
+    # Reducir un PNG plano puede agregar colores intermedios y pesar más que el original
+    if formato_original == ajustes['formato'] and salida.getbuffer().nbytes >= len(img_bytes):
+        return img_bytes
+    return salida.getvalue()
+
+def _imagen_reporte(img_bytes, perfil):
+    """Flowable del gráfico con la resolución del perfil"""
+    return Image(io.BytesIO(preparar_imagen(img_bytes, perfil)), width=ANCHO_GRAFICO, height=ALTO_GRAFICO)
+
+def _grafico_reporte(datos, clave, perfil, dibujo=None):
+    """El gráfico vectorial si se pudo dibujar; si no, la imagen rasterizada (o None si no hay)"""
+    if dibujo is not None:
+        return dibujo
+    if datos.get(clave) is not None:
+        return _imagen_reporte(datos[clave], perfil)
+    return None
 
-def generar_pdf_reporte(datos_cartera, datos_jubilacion, datos_bono=None):
-    """Genera un PDF con el reporte completo en estilo profesional"""
+def _formatear_columna(serie, formato):
+    """Formatea una columna completa de una vez ('$' para montos, None para enteros)"""
+    if formato == '$':
+        return [f"$ {valor:,.2f}" for valor in serie.to_numpy(dtype=float).tolist()]
+    return serie.astype('int64').astype(str).tolist()
+
+def _filas_detalle(df, columnas):
+    """Convierte las columnas del DataFrame en filas de texto para la tabla"""
+    formateadas = [_formatear_columna(df[nombre], formato) for nombre, formato in columnas]
+    return [list(fila) for fila in zip(*formateadas)]
+
+def _tabla_detalle(df, columnas, anchos, tabla_completa):
+    """
+    Construye la tabla de detalle (cronograma) de un módulo.
+    Con tabla_completa se incluyen todas las filas en una LongTable que repite el
+    encabezado en cada página; si no, se muestran las primeras 5, puntos
+    suspensivos y las últimas 5 cuando hay más de 12 filas.
+    """
+    encabezado = [nombre for nombre, _ in columnas]
+    if tabla_completa or len(df) <= 12:
+        filas = _filas_detalle(df, columnas)
+    else:
+        filas = _filas_detalle(df.head(5), columnas) + [['...'] * len(columnas)] + _filas_detalle(df.tail(5), columnas)
+    
+    # Las filas tienen altura fija: así la tabla no mide cada celda para paginar
+    clase_tabla = LongTable if tabla_completa else Table
+    tabla = clase_tabla([encabezado] + filas, colWidths=anchos,
+                        rowHeights=[ALTO_FILA_DETALLE] * (len(filas) + 1), repeatRows=1)
+    tabla.setStyle(TableStyle([
+        ('BACKGROUND', (0, 0), (-1, 0), colors.HexColor('#E8E8E8')),
+        ('TEXTCOLOR', (0, 0), (-1, 0), colors.HexColor('#2C3E50')),
+        ('ALIGN', (0, 0), (-1, -1), 'CENTER'),
+        ('VALIGN', (0, 0), (-1, -1), 'MIDDLE'),
+        ('FONTNAME', (0, 0), (-1, 0), 'Helvetica-Bold'),
+        ('FONTSIZE', (0, 0), (-1, -1), 8),
+        ('TOPPADDING', (0, 0), (-1, -1), 6),
+        ('BOTTOMPADDING', (0, 0), (-1, -1), 6),
+        ('GRID', (0, 0), (-1, -1), 0.5, colors.HexColor('#CCCCCC')),
+        ('LINEABOVE', (0, 0), (-1, 0), 1.5, colors.HexColor('#7F8C8D')),
+    ]))
+    return tabla
+
+def _actualizar_huella(contenido, valor):
+    """Agrega un valor de los datos del reporte al hash (imágenes y tablas por su digest)"""
+    if isinstance(valor, dict):
+        for clave in sorted(valor):
+            contenido.update(repr(clave).encode('utf-8'))
+            _actualizar_huella(contenido, valor[clave])
+    elif isinstance(valor, (bytes, bytearray)):
+        contenido.update(hashlib.sha256(valor).digest())
+    elif isinstance(valor, pd.DataFrame):
+        contenido.update(repr(list(valor.columns)).encode('utf-8'))
+        contenido.update(pd.util.hash_pandas_object(valor, index=True).to_numpy().tobytes())
+    else:
+        contenido.update(repr(normalizar_valor(valor)).encode('utf-8'))
+    contenido.update(b'|')
+
+def huella_reporte(datos_cartera, datos_jubilacion, datos_bono=None, tabla_completa=False, perfil='impresion',
+                   graficos_vectoriales=True, fecha_generacion=None):
+    """
+    Calcula un hash de todo lo que determina el contenido del reporte.
+    Incluye la fecha y el minuto de generación (por defecto, ahora) porque el pie de página los imprime.
+    """
+    fecha_generacion = fecha_generacion or datetime.now()
+    contenido = hashlib.sha256()
+    for valor in (datos_cartera, datos_jubilacion, datos_bono, tabla_completa, perfil, graficos_vectoriales,
+                  PERFILES_EXPORTACION[perfil], PLANTILLA_VERSION, fecha_generacion.strftime('%d/%m/%Y %H:%M')):
+        _actualizar_huella(contenido, valor)
+    return contenido.hexdigest()
+
+def generar_pdf_reporte(datos_cartera, datos_jubilacion, datos_bono=None, tabla_completa=False, perfil='impresion',
+                        graficos_vectoriales=True):
+    """
+    Genera un PDF con el reporte completo en estilo profesional.
+    Con tabla_completa se imprime el cronograma completo de cartera y bonos en lugar del resumen.
+    perfil ('pantalla', 'impresion' o 'archivo') define la resolución y compresión de los gráficos.
+    Con graficos_vectoriales, los gráficos de cartera y bonos se dibujan como vectores a partir
+    de df_detallado, df_flujos y df_sensibilidad (sin necesitar las imágenes).
+    Si los datos, las imágenes y la plantilla no cambiaron en el mismo minuto, devuelve el PDF
+    ya generado (el pie de página imprime la hora de generación).
+    """
+    if perfil not in PERFILES_EXPORTACION:
+        raise ValueError(f"Perfil de exportación no reconocido: {perfil!r}")
+    # Un solo instante para la huella y el PDF: así coinciden aunque cambie el minuto entre ambos
+    fecha_generacion = datetime.now()
+    with medir('pdf/huella'):
+        clave = huella_reporte(datos_cartera, datos_jubilacion, datos_bono, tabla_completa, perfil, graficos_vectoriales,
+                               fecha_generacion)
+    encontrado, pdf_bytes = CACHE_REPORTES.obtener(clave)
+    if not encontrado:
+        pdf_bytes = _construir_pdf_reporte(datos_cartera, datos_jubilacion, datos_bono, tabla_completa, perfil,
+                                           graficos_vectoriales, fecha_generacion).getvalue()
+        CACHE_REPORTES.guardar(clave, pdf_bytes)
+    return io.BytesIO(pdf_bytes)
+
+@medido('pdf/construir')
+def _construir_pdf_reporte(datos_cartera, datos_jubilacion, datos_bono, tabla_completa, perfil, graficos_vectoriales,
+                           fecha_generacion=None):
+    """
+    Arma el PDF del reporte (sin caché). Los argumentos de generar_pdf_reporte son obligatorios;
+    fecha_generacion es la que se imprime (por defecto, ahora).
+    """
+    fecha_generacion = fecha_generacion or datetime.now()
     buffer = io.BytesIO()
     doc = SimpleDocTemplate(
         buffer, 
@@ -120,7 +313,7 @@ def generar_pdf_reporte(datos_cartera, datos_jubilacion, datos_bono=None):
     )
     
     elements.append(Paragraph("REPORTE FINANCIERO", title_style))
-    elements.append(Paragraph(f"Generado el {datetime.now().strftime('%d/%m/%Y')}", date_style))
+    elements.append(Paragraph(f"Generado el {fecha_generacion.strftime('%d/%m/%Y')}", date_style))
     elements.append(Spacer(1, 0.4*inch))
     
         # ========== MÓDULO A: PROYECCIÓN DE CARTERA ==========
@@ -167,62 +360,32 @@ def generar_pdf_reporte(datos_cartera, datos_jubilacion, datos_bono=None):
             detalle_elements.append(Paragraph("1.1. Detalle de Proyección", subsection_style))
             detalle_elements.append(Spacer(1, 0.1*inch))
             
-            df = datos_cartera['df_detallado']
-            df_data = [['Periodo', 'Aporte', 'Saldo', 'Total Aportes']]
-            
-            # Si hay más de 12 filas, mostrar primeras 5, puntos suspensivos, y últimas 5
-            if len(df) > 12:
-                for i in range(5):
-                    row = df.iloc[i]
-                    df_data.append([
-                        str(row['Periodo']),
-                        f"$ {row['Aporte']:,.2f}",
-                        f"$ {row['Saldo']:,.2f}",
-                        f"$ {row['Total Aportes']:,.2f}"
-                    ])
-                df_data.append(['...', '...', '...', '...'])
-                for i in range(len(df)-5, len(df)):
-                    row = df.iloc[i]
-                    df_data.append([
-                        str(row['Periodo']),
-                        f"$ {row['Aporte']:,.2f}",
-                        f"$ {row['Saldo']:,.2f}",
-                        f"$ {row['Total Aportes']:,.2f}"
-                    ])
-            else:
-                for _, row in df.iterrows():
-                    df_data.append([
-                        str(row['Periodo']),
-                        f"$ {row['Aporte']:,.2f}",
-                        f"$ {row['Saldo']:,.2f}",
-                        f"$ {row['Total Aportes']:,.2f}"
-                    ])
-            
-            t_detalle = Table(df_data, colWidths=[1.2*inch, 1.6*inch, 1.6*inch, 1.6*inch])
-            t_detalle.setStyle(TableStyle([
-                ('BACKGROUND', (0, 0), (-1, 0), colors.HexColor('#E8E8E8')),
-                ('TEXTCOLOR', (0, 0), (-1, 0), colors.HexColor('#2C3E50')),
-                ('ALIGN', (0, 0), (-1, -1), 'CENTER'),
-                ('FONTNAME', (0, 0), (-1, 0), 'Helvetica-Bold'),
-                ('FONTSIZE', (0, 0), (-1, -1), 8),
-                ('TOPPADDING', (0, 0), (-1, -1), 6),
-                ('BOTTOMPADDING', (0, 0), (-1, -1), 6),
-                ('GRID', (0, 0), (-1, -1), 0.5, colors.HexColor('#CCCCCC')),
-                ('LINEABOVE', (0, 0), (-1, 0), 1.5, colors.HexColor('#7F8C8D')),
-            ]))
+            t_detalle = _tabla_detalle(
+                datos_cartera['df_detallado'],
+                [('Periodo', None), ('Aporte', '$'), ('Saldo', '$'), ('Total Aportes', '$')],
+                [1.2*inch, 1.6*inch, 1.6*inch, 1.6*inch],
+                tabla_completa
+            )
             detalle_elements.append(t_detalle)
             
-            # Agrupar el subtítulo con la tabla
-            elements.append(KeepTogether(detalle_elements))
+            # Agrupar el subtítulo con la tabla (la tabla completa ocupa varias páginas y se divide)
+            if tabla_completa:
+                elements.extend(detalle_elements)
+            else:
+                elements.append(KeepTogether(detalle_elements))
             elements.append(Spacer(1, 0.3*inch))
         
         # 1.2 Gráfica de Crecimiento - mantener gráfica unida
-        if 'grafico' in datos_cartera and datos_cartera['grafico'] is not None:
+        grafico = _grafico_reporte(
+            datos_cartera, 'grafico', perfil,
+            dibujo_cartera(datos_cartera['df_detallado'], ANCHO_GRAFICO, ALTO_GRAFICO)
+            if graficos_vectoriales and 'df_detallado' in datos_cartera else None
+        )
+        if grafico is not None:
             grafico_elements = []
             grafico_elements.append(Paragraph("1.2. Gráfica de Crecimiento", subsection_style))
             grafico_elements.append(Spacer(1, 0.1*inch))
-            img = io.BytesIO(datos_cartera['grafico'])
-            grafico_elements.append(Image(img, width=5.5*inch, height=3*inch))
+            grafico_elements.append(grafico)
             
             # Agrupar el subtítulo con la gráfica
             elements.append(KeepTogether(grafico_elements))
@@ -273,8 +436,7 @@ def generar_pdf_reporte(datos_cartera, datos_jubilacion, datos_bono=None):
             grafico_elements = []
             grafico_elements.append(Paragraph("2.1. Gráfica de Proyección de Retiro Mensual", subsection_style))
             grafico_elements.append(Spacer(1, 0.1*inch))
-            img = io.BytesIO(datos_jubilacion['grafico'])
-            grafico_elements.append(Image(img, width=5.5*inch, height=3*inch))
+            grafico_elements.append(_imagen_reporte(datos_jubilacion['grafico'], perfil))
             
             # Agrupar el subtítulo con la gráfica
             elements.append(KeepTogether(grafico_elements))
@@ -285,8 +447,7 @@ def generar_pdf_reporte(datos_cartera, datos_jubilacion, datos_bono=None):
             grafico_elements = []
             grafico_elements.append(Paragraph("2.2. Gráfica de Comparación de Edades de Retiro", subsection_style))
             grafico_elements.append(Spacer(1, 0.1*inch))
-            img = io.BytesIO(datos_jubilacion['grafico_comparacion'])
-            grafico_elements.append(Image(img, width=5.5*inch, height=3*inch))
+            grafico_elements.append(_imagen_reporte(datos_jubilacion['grafico_comparacion'], perfil))
             
             # Agrupar el subtítulo con la gráfica
             elements.append(KeepTogether(grafico_elements))
@@ -337,71 +498,48 @@ def generar_pdf_reporte(datos_cartera, datos_jubilacion, datos_bono=None):
             flujos_elements.append(Paragraph("3.1. Flujos de Caja", subsection_style))
             flujos_elements.append(Spacer(1, 0.1*inch))
             
-            df = datos_bono['df_flujos']
-            df_data = [['Periodo', 'Flujo', 'VP Flujo']]
-            
-            # Si hay más de 12 filas, mostrar primeras 5, puntos suspensivos, y últimas 5
-            if len(df) > 12:
-                for i in range(5):
-                    row = df.iloc[i]
-                    df_data.append([
-                        str(row['Periodo']),
-                        f"$ {row['Flujo']:,.2f}",
-                        f"$ {row['VP Flujo']:,.2f}"
-                    ])
-                df_data.append(['...', '...', '...'])
-                for i in range(len(df)-5, len(df)):
-                    row = df.iloc[i]
-                    df_data.append([
-                        str(row['Periodo']),
-                        f"$ {row['Flujo']:,.2f}",
-                        f"$ {row['VP Flujo']:,.2f}"
-                    ])
-            else:
-                for _, row in df.iterrows():
-                    df_data.append([
-                        str(row['Periodo']),
-                        f"$ {row['Flujo']:,.2f}",
-                        f"$ {row['VP Flujo']:,.2f}"
-                    ])
-            
-            t_detalle = Table(df_data, colWidths=[1.5*inch, 2.25*inch, 2.25*inch])
-            t_detalle.setStyle(TableStyle([
-                ('BACKGROUND', (0, 0), (-1, 0), colors.HexColor('#E8E8E8')),
-                ('TEXTCOLOR', (0, 0), (-1, 0), colors.HexColor('#2C3E50')),
-                ('ALIGN', (0, 0), (-1, -1), 'CENTER'),
-                ('FONTNAME', (0, 0), (-1, 0), 'Helvetica-Bold'),
-                ('FONTSIZE', (0, 0), (-1, -1), 8),
-                ('TOPPADDING', (0, 0), (-1, -1), 6),
-                ('BOTTOMPADDING', (0, 0), (-1, -1), 6),
-                ('GRID', (0, 0), (-1, -1), 0.5, colors.HexColor('#CCCCCC')),
-                ('LINEABOVE', (0, 0), (-1, 0), 1.5, colors.HexColor('#7F8C8D')),
-            ]))
+            t_detalle = _tabla_detalle(
+                datos_bono['df_flujos'],
+                [('Periodo', None), ('Flujo', '$'), ('VP Flujo', '$')],
+                [1.5*inch, 2.25*inch, 2.25*inch],
+                tabla_completa
+            )
             flujos_elements.append(t_detalle)
             
-            # Agrupar el subtítulo con la tabla
-            elements.append(KeepTogether(flujos_elements))
+            # Agrupar el subtítulo con la tabla (la tabla completa ocupa varias páginas y se divide)
+            if tabla_completa:
+                elements.extend(flujos_elements)
+            else:
+                elements.append(KeepTogether(flujos_elements))
             elements.append(Spacer(1, 0.3*inch))
         
         # 3.2 Gráfica de valor presente por periodo
-        if 'grafico' in datos_bono and datos_bono['grafico'] is not None:
+        grafico = _grafico_reporte(
+            datos_bono, 'grafico', perfil,
+            dibujo_flujos_bono(datos_bono['df_flujos'], ANCHO_GRAFICO, ALTO_GRAFICO)
+            if graficos_vectoriales and 'df_flujos' in datos_bono else None
+        )
+        if grafico is not None:
             grafico_elements = []
             grafico_elements.append(Paragraph("3.2. Gráfica de Valor Presente por Periodo", subsection_style))
             grafico_elements.append(Spacer(1, 0.1*inch))
-            img = io.BytesIO(datos_bono['grafico'])
-            grafico_elements.append(Image(img, width=5.5*inch, height=3*inch))
+            grafico_elements.append(grafico)
             
             # Agrupar el subtítulo con la gráfica
             elements.append(KeepTogether(grafico_elements))
             elements.append(Spacer(1, 0.3*inch))
         
         # 3.3 Gráfica de Valor del Bono según TEA de Mercado
-        if 'grafico_sensibilidad' in datos_bono and datos_bono['grafico_sensibilidad'] is not None:
+        grafico = _grafico_reporte(
+            datos_bono, 'grafico_sensibilidad', perfil,
+            dibujo_sensibilidad_bono(datos_bono['df_sensibilidad'], datos_bono['valor_nominal'], ANCHO_GRAFICO, ALTO_GRAFICO)
+            if graficos_vectoriales and 'df_sensibilidad' in datos_bono else None
+        )
+        if grafico is not None:
             grafico_elements = []
             grafico_elements.append(Paragraph("3.3. Gráfica de Valor del Bono según TEA de Mercado", subsection_style))
             grafico_elements.append(Spacer(1, 0.1*inch))
-            img = io.BytesIO(datos_bono['grafico_sensibilidad'])
-            grafico_elements.append(Image(img, width=5.5*inch, height=3*inch))
+            grafico_elements.append(grafico)
             
             # Agrupar el subtítulo con la gráfica
             elements.append(KeepTogether(grafico_elements))
@@ -409,6 +547,8 @@ def generar_pdf_reporte(datos_cartera, datos_jubilacion, datos_bono=None):
             elements.append(Spacer(1, 0.25*inch))
     
     # Construir el PDF con encabezado y pie de página personalizados
-    doc.build(elements, canvasmaker=PDFConEncabezadoPiePagina)
+    with medir('pdf/maquetar', elementos=len(elements)):
+        doc.build(elements, canvasmaker=functools.partial(PDFConEncabezadoPiePagina,
+                                                          fecha_generacion=fecha_generacion))
     buffer.seek(0)
     return buffer
\ No newline at end of file
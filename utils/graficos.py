@@ -1,15 +1,58 @@
 """
-Utilidades para exportar gráficos de Plotly a imágenes.
-Funciona tanto localmente como en Streamlit Cloud sin requerir Chrome/Kaleido.
+Gráficos del reporte y utilidades para exportarlos a imágenes.
+Usa un proceso persistente de Kaleido cuando está disponible y, si no, matplotlib,
+de modo que funciona tanto localmente como en Streamlit Cloud sin requerir Chrome.
+No importa Streamlit: los avisos al usuario quedan a cargo de las páginas.
 """
+import hashlib
 import io
-import streamlit as st
+import json
+import logging
+import os
+import re
+import threading
+import time
+from concurrent.futures import Future, ThreadPoolExecutor, as_completed
+import numpy as np
+import plotly.graph_objects as go
+from utils.cache import CacheResultados
+from utils.diagnostico import en_contexto, medido, medir
+from utils.renderizador import ErrorRenderizador, obtener_renderizador
+
+logger = logging.getLogger(__name__)
+
+# Parámetros de exportación: forman parte de la huella de cada imagen
+AJUSTES_EXPORTACION = {'format': 'png', 'width': 1400, 'height': 700, 'scale': 2}
+
+# Se incrementa cuando cambia la forma de rasterizar, para invalidar imágenes guardadas
+VERSION_RENDER = 3
+
+# Caché de imágenes por contenido, acotada en bytes (CALCULADORA_CACHE_IMAGENES_MB, por defecto 128)
+CACHE_IMAGENES = CacheResultados(
+    max_entradas=1024,
+    ttl=None,
+    max_bytes=int(float(os.environ.get('CALCULADORA_CACHE_IMAGENES_MB', 128)) * 1024 * 1024),
+    medir=len
+)
+
+# Hilos que rasterizan en segundo plano (CALCULADORA_HILOS_RENDER). El fallback de
+# matplotlib no usa estado global, así que las sesiones pueden rasterizar a la vez
+HILOS_RENDER = int(os.environ.get('CALCULADORA_HILOS_RENDER', min(4, os.cpu_count() or 1)))
+_ejecutor = None
+_ejecutor_lock = threading.Lock()
+
+def huella_grafico(fig, **ajustes):
+    """Calcula un hash del contenido de la figura y de los ajustes de exportación"""
+    contenido = hashlib.sha256()
+    contenido.update(fig.to_json().encode('utf-8'))
+    contenido.update(json.dumps({'ajustes': ajustes, 'version': VERSION_RENDER}, sort_keys=True).encode('utf-8'))
+    return contenido.hexdigest()
 
 def exportar_grafico_a_imagen(fig):
     """
     Exporta un gráfico de Plotly a bytes de imagen PNG.
-    Primero intenta con Kaleido (si está disponible), luego usa matplotlib
-    replicando EXACTAMENTE el estilo de Plotly incluyendo fills, líneas punteadas, etc.
+    Las imágenes se guardan en una caché por contenido: si la figura y los ajustes
+    no cambiaron, se devuelve la imagen ya generada sin volver a rasterizar.
     
     Args:
         fig: Figura de plotly.graph_objects
@@ -17,197 +60,457 @@ def exportar_grafico_a_imagen(fig):
     Returns:
         bytes: Imagen en formato PNG, o None si falla
     """
-    # Intento 1: Usar Kaleido si está disponible (desarrollo local)
-    try:
-        import plotly.io as pio
-        img_bytes = pio.to_image(
-            fig, 
-            format="png",
-            width=1400,
-            height=700,
-            scale=2,
-            engine="kaleido"
-        )
+    clave = huella_grafico(fig, **AJUSTES_EXPORTACION)
+    encontrado, img_bytes = CACHE_IMAGENES.obtener(clave)
+    if encontrado:
         return img_bytes
-    except:
-        pass
-    
-    # Intento 2: Matplotlib con estilo EXACTO de Plotly (fallback robusto)
-    try:
-        import matplotlib.pyplot as plt
-        import matplotlib
-        matplotlib.use('Agg')  # Backend sin display
-        
-        # Paleta de colores de Plotly (plotly_white theme)
-        PLOTLY_COLORS = ['#636EFA', '#EF553B', '#00CC96', '#AB63FA', '#FFA15A', 
-                         '#19D3F3', '#FF6692', '#B6E880', '#FF97FF', '#FECB52']
-        
-        # Crear figura con fondo blanco (como plotly_white)
-        fig_mpl, ax = plt.subplots(figsize=(14, 7), facecolor='white')
-        ax.set_facecolor('white')
+    
+    img_bytes = rasterizar_grafico(fig)['imagen']
+    if img_bytes is not None:
+        CACHE_IMAGENES.guardar(clave, img_bytes)
+    return img_bytes
+
+def _exportar_en_segundo_plano(fig, clave):
+    """Rasteriza en un hilo del pool y guarda el resultado en la caché de imágenes"""
+    img_bytes = rasterizar_grafico(fig)['imagen']
+    if img_bytes is not None:
+        CACHE_IMAGENES.guardar(clave, img_bytes)
+    return img_bytes
+
+def _obtener_ejecutor():
+    """Crea (una sola vez) el pool de hilos que rasteriza las imágenes"""
+    global _ejecutor
+    with _ejecutor_lock:
+        if _ejecutor is None:
+            _ejecutor = ThreadPoolExecutor(max_workers=HILOS_RENDER, thread_name_prefix='render')
+        return _ejecutor
+
+class ImagenPendiente:
+    """
+    Imagen de un gráfico que todavía no se rasterizó.
+    Las páginas guardan este objeto en lugar de los bytes PNG; la imagen solo se
+    genera (en el pool de hilos) cuando se necesita para el PDF.
+    """
+    
+    def __init__(self, fig):
+        self.fig = fig
+        self.clave = None
+        self._futuro = None
+    
+    def iniciar(self):
+        """Encola la rasterización (si hace falta) y devuelve el Future con los bytes PNG"""
+        futuro = self._futuro
+        if futuro is not None:
+            return futuro
+        if self.clave is None:
+            self.clave = huella_grafico(self.fig, **AJUSTES_EXPORTACION)
+        encontrado, img_bytes = CACHE_IMAGENES.obtener(self.clave)
+        if encontrado:
+            futuro = Future()
+            futuro.set_result(img_bytes)
+            return futuro
+        # Con la copia del contexto, los tiempos del hilo se registran en la sesión que pidió la imagen
+        futuro = self._futuro = _obtener_ejecutor().submit(
+            en_contexto(_exportar_en_segundo_plano, self.fig, self.clave))
+        futuro.add_done_callback(self._liberar)
+        return futuro
+    
+    def _liberar(self, futuro):
+        # Terminada la rasterización, los bytes quedan solo en CACHE_IMAGENES (acotada):
+        # la sesión conserva la figura y vuelve a buscarlos por su huella
+        self._futuro = None
+    
+    @property
+    def nbytes(self):
+        """Bytes aproximados de los datos de la figura que conserva la sesión"""
+        total = 0
+        for traza in self.fig.data:
+            for propiedad in ('x', 'y', 'text', 'customdata'):
+                valores = getattr(traza, propiedad, None)
+                if valores is not None and not isinstance(valores, str):
+                    total += np.asarray(valores).nbytes
+        return total
+    
+    def resultado(self, timeout=None):
+        """Espera y devuelve los bytes PNG, o None si la rasterización falló"""
+        return self.iniciar().result(timeout=timeout)
+
+def esperar_imagenes(pendientes, al_avanzar=None):
+    """
+    Rasteriza en paralelo un conjunto de imágenes pendientes y espera a que terminen.
+    
+    Args:
+        pendientes: dict nombre -> ImagenPendiente (o bytes ya generados)
+        al_avanzar: Función opcional llamada como al_avanzar(terminadas, total) para mostrar progreso
         
-        # Variables para controlar el orden de relleno
-        fill_between_data = []
+    Returns:
+        dict: nombre -> bytes PNG (o None si no se pudo generar)
+    """
+    imagenes = {}
+    futuros = {}
+    for nombre, pendiente in pendientes.items():
+        if isinstance(pendiente, ImagenPendiente):
+            futuros[pendiente.iniciar()] = nombre
+        else:
+            imagenes[nombre] = pendiente
+    
+    total = len(pendientes)
+    if al_avanzar is not None:
+        al_avanzar(len(imagenes), total)
+    for futuro in as_completed(futuros):
+        imagenes[futuros[futuro]] = futuro.result()
+        if al_avanzar is not None:
+            al_avanzar(len(imagenes), total)
+    return imagenes
+
+def rasterizar_grafico(fig):
+    """
+    Rasteriza la figura a PNG.
+    Primero intenta con el renderizador persistente de Kaleido (si está disponible),
+    luego usa matplotlib replicando EXACTAMENTE el estilo de Plotly.
+    Los errores no se muestran: se registran en el log y se devuelven en el resultado.
+    
+    Returns:
+        dict: 'imagen' (bytes PNG o None), 'backend' ('kaleido', 'matplotlib' o None),
+        'segundos' y 'error' (mensaje o None)
+    """
+    return rasterizar_graficos([fig])[0]
+
+def rasterizar_graficos(figuras):
+    """
+    Rasteriza varias figuras; las que Kaleido resuelve viajan en un solo lote al renderizador.
+    
+    Returns:
+        list: Un dict por figura como en rasterizar_grafico
+    """
+    resultados = [None] * len(figuras)
+    
+    # Intento 1: Kaleido en el subproceso persistente
+    renderizador = obtener_renderizador()
+    if figuras and renderizador.disponible():
+        try:
+            with medir('imagen/kaleido', graficos=len(figuras)):
+                lote = renderizador.renderizar_lote(figuras, AJUSTES_EXPORTACION)
+            for i, resultado in enumerate(lote):
+                if resultado['imagen'] is not None:
+                    resultados[i] = resultado
+                else:
+                    logger.warning("Kaleido no pudo renderizar el gráfico: %s", resultado['error'])
+        except ErrorRenderizador as e:
+            logger.info("Se usa matplotlib porque Kaleido no está disponible: %s", e)
+    
+    # Intento 2: matplotlib para las figuras que Kaleido no resolvió
+    for i, fig in enumerate(figuras):
+        if resultados[i] is not None:
+            continue
+        inicio = time.perf_counter()
+        try:
+            resultados[i] = {'imagen': _rasterizar_con_matplotlib(fig), 'backend': 'matplotlib',
+                             'segundos': time.perf_counter() - inicio, 'error': None}
+        except Exception as e:
+            logger.warning("No se pudo rasterizar el gráfico: %s", e)
+            resultados[i] = {'imagen': None, 'backend': None, 'segundos': time.perf_counter() - inicio,
+                             'error': f"{type(e).__name__}: {e}"}
+    
+    for resultado in resultados:
+        logger.info("Gráfico rasterizado con %s en %.3f s", resultado['backend'], resultado['segundos'])
+    return resultados
+
+# Paleta de colores de Plotly (plotly_white theme)
+PLOTLY_COLORS = ['#636EFA', '#EF553B', '#00CC96', '#AB63FA', '#FFA15A', 
+                 '#19D3F3', '#FF6692', '#B6E880', '#FF97FF', '#FECB52']
+
+# Conversión de trazas de Plotly a artistas de matplotlib, por contenido de la figura
+CACHE_TRAZAS = CacheResultados(max_entradas=256, ttl=None)
+
+@medido('imagen/matplotlib')
+def _rasterizar_con_matplotlib(fig):
+    """
+    Dibuja la figura con matplotlib imitando el estilo de Plotly (lanza excepción si falla).
+    Usa la API orientada a objetos (Figure + FigureCanvasAgg) sin el estado global de
+    pyplot, por lo que varias sesiones pueden rasterizar a la vez en distintos hilos.
+    """
+    from matplotlib.figure import Figure
+    from matplotlib.backends.backend_agg import FigureCanvasAgg
+    
+    clave = hashlib.sha256(fig.to_json().encode('utf-8')).hexdigest()
+    encontrado, especificacion = CACHE_TRAZAS.obtener(clave)
+    if not encontrado:
+        especificacion = _convertir_figura(fig)
+        CACHE_TRAZAS.guardar(clave, especificacion)
+    
+    # Crear figura con fondo blanco (como plotly_white); cada llamada tiene su propio canvas
+    fig_mpl = Figure(figsize=(14, 7), facecolor='white')
+    FigureCanvasAgg(fig_mpl)
+    ax = fig_mpl.add_subplot()
+    ax.set_facecolor('white')
+    
+    for metodo, args, kwargs in especificacion['artistas']:
+        getattr(ax, metodo)(*args, **kwargs)
+    
+    # Aplicar títulos y etiquetas con el estilo de Plotly
+    if especificacion['titulo']:
+        ax.set_title(especificacion['titulo'], fontsize=16, fontweight='normal', pad=20, color='#2C3E50')
+    if especificacion['eje_x']:
+        ax.set_xlabel(especificacion['eje_x'], fontsize=12, color='#2C3E50')
+    if especificacion['eje_y']:
+        ax.set_ylabel(especificacion['eje_y'], fontsize=12, color='#2C3E50')
+    
+    # Estilo de cuadrícula como Plotly (gris muy claro)
+    ax.grid(True, alpha=0.15, linestyle='-', linewidth=0.5, color='#E1E5EB', zorder=0)
+    ax.set_axisbelow(True)
+    
+    # Leyenda si hay múltiples traces
+    if especificacion['leyenda']:
+        legend = ax.legend(frameon=True, fancybox=False, edgecolor='#E5E5E5', 
+                 fontsize=11, loc='best', framealpha=0.95)
+        legend.get_frame().set_facecolor('white')
+    
+    # Estilo de los ejes (líneas grises claras como Plotly)
+    for spine in ax.spines.values():
+        spine.set_edgecolor('#D6D6D6')
+        spine.set_linewidth(0.8)
+    
+    # Color de los ticks
+    ax.tick_params(colors='#2C3E50', which='both')
+    
+    # Guardar como PNG de alta calidad
+    fig_mpl.tight_layout()
+    img_bytes = io.BytesIO()
+    fig_mpl.savefig(img_bytes, format='png', dpi=150, bbox_inches='tight', 
+                    facecolor='white', edgecolor='none')
+    return img_bytes.getvalue()
+
+def _convertir_figura(fig):
+    """
+    Traduce las trazas y el layout de Plotly a llamadas de matplotlib.
+    
+    Returns:
+        dict: 'artistas' (tupla de (método del Axes, args, kwargs)), 'titulo', 'eje_x', 'eje_y' y 'leyenda'
+    """
+    artistas = []
+    rellenos = []
+    
+    for idx, trace in enumerate(fig.data):
+        color = PLOTLY_COLORS[idx % len(PLOTLY_COLORS)]
+        if getattr(trace, 'x', None) is None or getattr(trace, 'y', None) is None:
+            continue
+        x = _como_arreglo(trace.x)
+        y = _como_arreglo(trace.y)
+        etiqueta = trace.name or ''
         
-        # Extraer y graficar cada trace con el estilo EXACTO de Plotly
-        for idx, trace in enumerate(fig.data):
-            color = PLOTLY_COLORS[idx % len(PLOTLY_COLORS)]
+        if trace.type == 'scatter':
+            # Plotly dibuja solo líneas desde 20 puntos y líneas con marcadores por debajo
+            mode = trace.mode or ('lines' if len(x) >= 20 else 'lines+markers')
             
-            if hasattr(trace, 'x') and hasattr(trace, 'y'):
-                # Determinar el tipo de gráfico
-                trace_type = trace.type if hasattr(trace, 'type') else 'scatter'
-                
-                if trace_type == 'scatter':
-                    mode = trace.mode if hasattr(trace, 'mode') else 'lines'
-                    
-                    # Obtener el color de la línea
-                    line_color = color
-                    if hasattr(trace, 'line') and hasattr(trace.line, 'color'):
-                        line_color = trace.line.color
-                    
-                    # Obtener ancho de línea
-                    linewidth = 2
-                    if hasattr(trace, 'line') and hasattr(trace.line, 'width'):
-                        linewidth = trace.line.width
-                    
-                    # Obtener estilo de línea (sólida o punteada)
-                    linestyle = '-'
-                    if hasattr(trace, 'line') and hasattr(trace.line, 'dash'):
-                        if trace.line.dash == 'dash':
-                            linestyle = '--'
-                        elif trace.line.dash == 'dot':
-                            linestyle = ':'
-                        elif trace.line.dash == 'dashdot':
-                            linestyle = '-.'
-                    
-                    # Graficar la línea
-                    if 'lines' in mode or mode == 'lines':
-                        line, = ax.plot(trace.x, trace.y, 
-                               label=trace.name if hasattr(trace, 'name') and trace.name else '',
-                               color=line_color if isinstance(line_color, str) else color,
-                               linewidth=linewidth,
-                               linestyle=linestyle,
-                               alpha=1.0,
-                               zorder=3)
-                        
-                        # Detectar si hay fill (relleno debajo de la línea)
-                        if hasattr(trace, 'fill') and trace.fill:
-                            fill_type = trace.fill
-                            fillcolor = line_color
-                            
-                            # Obtener color de relleno si está especificado
-                            if hasattr(trace, 'fillcolor') and trace.fillcolor:
-                                fillcolor = trace.fillcolor
-                            
-                            # Aplicar transparencia al relleno
-                            if isinstance(fillcolor, str) and fillcolor.startswith('rgba'):
-                                # Extraer valores RGBA
-                                import re
-                                rgba_match = re.search(r'rgba\((\d+),\s*(\d+),\s*(\d+),\s*([\d.]+)\)', fillcolor)
-                                if rgba_match:
-                                    r, g, b, a = rgba_match.groups()
-                                    fillcolor = f'#{int(r):02x}{int(g):02x}{int(b):02x}'
-                                    fill_alpha = float(a)
-                                else:
-                                    fill_alpha = 0.3
-                            else:
-                                fill_alpha = 0.3
-                            
-                            # Almacenar datos de relleno para aplicar después
-                            if fill_type == 'tonexty':
-                                # Rellenar hasta la línea anterior
-                                fill_between_data.append({
-                                    'x': trace.x,
-                                    'y': trace.y,
-                                    'color': fillcolor if isinstance(fillcolor, str) else line_color,
-                                    'alpha': fill_alpha,
-                                    'previous_idx': idx - 1
-                                })
-                            elif fill_type == 'tozeroy':
-                                # Rellenar hasta cero
-                                ax.fill_between(trace.x, 0, trace.y, 
-                                              color=fillcolor if isinstance(fillcolor, str) else line_color,
-                                              alpha=fill_alpha,
-                                              zorder=1)
-                    
-                    if 'markers' in mode:
-                        ax.scatter(trace.x, trace.y,
-                                 label=trace.name if hasattr(trace, 'name') and trace.name else '',
-                                 color=color,
-                                 s=50,
-                                 alpha=0.8,
-                                 zorder=4)
+            # Color, ancho y estilo de línea (sólida o punteada)
+            line_color = trace.line.color if isinstance(trace.line.color, str) else color
+            linewidth = trace.line.width if trace.line.width is not None else 2
+            linestyle = {'dash': '--', 'dot': ':', 'dashdot': '-.'}.get(trace.line.dash, '-')
+            
+            if 'lines' in mode:
+                artistas.append(('plot', (x, y), {
+                    'label': etiqueta, 'color': line_color, 'linewidth': linewidth,
+                    'linestyle': linestyle, 'alpha': 1.0, 'zorder': 3
+                }))
                 
-                elif trace_type == 'bar':
-                    # Gráfico de barras
-                    marker_color = trace.marker.color if hasattr(trace, 'marker') and hasattr(trace.marker, 'color') else color
-                    ax.bar(trace.x, trace.y,
-                          label=trace.name if hasattr(trace, 'name') and trace.name else '',
-                          color=marker_color if isinstance(marker_color, str) else color,
-                          alpha=0.85,
-                          zorder=3)
-        
-        # Aplicar rellenos entre líneas (tonexty)
-        if fill_between_data and len(fig.data) > 1:
-            for fill_data in fill_between_data:
-                prev_idx = fill_data['previous_idx']
-                if prev_idx >= 0 and prev_idx < len(fig.data):
-                    prev_trace = fig.data[prev_idx]
-                    if hasattr(prev_trace, 'y'):
-                        ax.fill_between(fill_data['x'], 
-                                      prev_trace.y, 
-                                      fill_data['y'],
-                                      color=fill_data['color'],
-                                      alpha=fill_data['alpha'],
-                                      zorder=2)
-        
-        # Aplicar títulos y etiquetas con el estilo de Plotly
-        if hasattr(fig.layout, 'title') and fig.layout.title:
-            title_text = fig.layout.title.text if hasattr(fig.layout.title, 'text') else str(fig.layout.title)
-            ax.set_title(title_text, fontsize=16, fontweight='normal', pad=20, color='#2C3E50')
-        
-        if hasattr(fig.layout, 'xaxis') and fig.layout.xaxis and hasattr(fig.layout.xaxis, 'title'):
-            xlabel = fig.layout.xaxis.title.text if hasattr(fig.layout.xaxis.title, 'text') else str(fig.layout.xaxis.title)
-            ax.set_xlabel(xlabel, fontsize=12, color='#2C3E50')
-        
-        if hasattr(fig.layout, 'yaxis') and fig.layout.yaxis and hasattr(fig.layout.yaxis, 'title'):
-            ylabel = fig.layout.yaxis.title.text if hasattr(fig.layout.yaxis.title, 'text') else str(fig.layout.yaxis.title)
-            ax.set_ylabel(ylabel, fontsize=12, color='#2C3E50')
-        
-        # Estilo de cuadrícula como Plotly (gris muy claro)
-        ax.grid(True, alpha=0.15, linestyle='-', linewidth=0.5, color='#E1E5EB', zorder=0)
-        ax.set_axisbelow(True)
-        
-        # Leyenda si hay múltiples traces
-        if len(fig.data) > 1:
-            legend = ax.legend(frameon=True, fancybox=False, edgecolor='#E5E5E5', 
-                     fontsize=11, loc='best', framealpha=0.95)
-            legend.get_frame().set_facecolor('white')
-        
-        # Estilo de los ejes (líneas grises claras como Plotly)
-        for spine in ax.spines.values():
-            spine.set_edgecolor('#D6D6D6')
-            spine.set_linewidth(0.8)
-        
-        # Color de los ticks
-        ax.tick_params(colors='#2C3E50', which='both')
-        
-        # Guardar como PNG de alta calidad
-        plt.tight_layout()
-        img_bytes = io.BytesIO()
-        plt.savefig(img_bytes, format='png', dpi=150, bbox_inches='tight', 
-                   facecolor='white', edgecolor='none')
-        plt.close(fig_mpl)
-        
-        img_bytes.seek(0)
-        return img_bytes.getvalue()
+                # Relleno debajo de la línea, con la transparencia del color rgba si la tiene
+                if trace.fill in ('tozeroy', 'tonexty'):
+                    fillcolor, fill_alpha = _color_relleno(trace.fillcolor, line_color)
+                    if trace.fill == 'tozeroy':
+                        artistas.append(('fill_between', (x, 0, y),
+                                         {'color': fillcolor, 'alpha': fill_alpha, 'zorder': 1}))
+                    elif idx > 0 and getattr(fig.data[idx - 1], 'y', None) is not None:
+                        # Rellenar hasta la línea anterior (se dibuja al final, como antes)
+                        rellenos.append(('fill_between', (x, _como_arreglo(fig.data[idx - 1].y), y),
+                                         {'color': fillcolor, 'alpha': fill_alpha, 'zorder': 2}))
+            
+            if 'markers' in mode:
+                artistas.append(('scatter', (x, y), {
+                    'label': '' if 'lines' in mode else etiqueta,
+                    'color': line_color, 's': 50, 'alpha': 0.8, 'zorder': 4
+                }))
         
-    except Exception as e:
-        # Si todo falla, mostrar error solo una vez
-        if 'grafico_warning_shown' not in st.session_state:
-            st.warning(
-                f"⚠️ No se pudieron generar las imágenes de los gráficos para el PDF. "
-                f"Los gráficos se mostrarán en pantalla pero podrían no estar en el reporte PDF. Error: {str(e)}"
-            )
-            st.session_state['grafico_warning_shown'] = True
-        return None
+        elif trace.type == 'bar':
+            marker_color = trace.marker.color if isinstance(trace.marker.color, str) else color
+            artistas.append(('bar', (x, y), {
+                'label': etiqueta, 'color': marker_color, 'alpha': 0.85, 'zorder': 3
+            }))
+    
+    return {
+        'artistas': tuple(artistas + rellenos),
+        'titulo': fig.layout.title.text or '',
+        'eje_x': fig.layout.xaxis.title.text or '',
+        'eje_y': fig.layout.yaxis.title.text or '',
+        'leyenda': len(fig.data) > 1
+    }
+
+def _como_arreglo(valores):
+    """Convierte los datos de una traza a un arreglo de solo lectura (se comparte entre hilos)"""
+    arreglo = np.asarray(valores)
+    arreglo.flags.writeable = False
+    return arreglo
+
+def _color_relleno(fillcolor, line_color):
+    """Devuelve (color, alpha) del relleno; los colores rgba() aportan su propia transparencia"""
+    if isinstance(fillcolor, str):
+        rgba_match = re.search(r'rgba\((\d+),\s*(\d+),\s*(\d+),\s*([\d.]+)\)', fillcolor)
+        if rgba_match:
+            r, g, b, a = rgba_match.groups()
+            return f'#{int(r):02x}{int(g):02x}{int(b):02x}', float(a)
+        return fillcolor, 0.3
+    return line_color, 0.3
+
+# ---------------------------------------------------------------------------
+# Gráficos del reporte (los usan las páginas y la generación por lotes)
+# ---------------------------------------------------------------------------
+
+@medido('figura/cartera')
+def crear_grafico_cartera(df):
+    """Evolución de los aportes acumulados y del saldo de la cartera"""
+    fig = go.Figure()
+    fig.add_trace(go.Scatter(
+        x=df['Periodo'],
+        y=df['Total Aportes'],
+        mode='lines',
+        name='Aportes Acumulados',
+        line=dict(color='#636EFA', width=2)
+    ))
+    fig.add_trace(go.Scatter(
+        x=df['Periodo'],
+        y=df['Saldo'],
+        mode='lines',
+        name='Saldo Total',
+        line=dict(color='#00CC96', width=3),
+        fill='tonexty'
+    ))
+    
+    fig.update_layout(
+        # Un uirevision fijo hace que el navegador conserve zoom y leyenda al actualizar el gráfico
+        uirevision='cartera',
+        title='Evolución de la Inversión',
+        xaxis_title='Periodo',
+        yaxis_title='Monto (USD)',
+        hovermode='x unified',
+        template='plotly_white'
+    )
+    return fig
+
+@medido('figura/jubilacion')
+def crear_grafico_jubilacion(data):
+    """Pensión acumulada durante el retiro frente al capital neto (data como calcular_jubilacion)"""
+    fig = go.Figure()
+    
+    meses = list(range(1, data['anos_retiro'] * 12 + 1))
+    pension_acumulada = [data['pension_mensual'] * i for i in meses]
+    
+    fig.add_trace(go.Scatter(
+        x=meses,
+        y=pension_acumulada,
+        mode='lines',
+        name='Pensión Acumulada',
+        line=dict(color='#00CC96', width=3),
+        fill='tozeroy'
+    ))
+    
+    fig.add_hline(
+        y=data['capital_neto'],
+        line_dash="dash",
+        line_color="red",
+        annotation_text=f"Capital Inicial: ${data['capital_neto']:,.0f}"
+    )
+    
+    fig.update_layout(
+        uirevision='jubilacion',
+        title='Proyección de Retiro Mensual',
+        xaxis_title='Mes',
+        yaxis_title='Monto Acumulado (USD)',
+        template='plotly_white'
+    )
+    return fig
+
+@medido('figura/comparacion_jubilacion')
+def crear_grafico_comparacion_jubilacion(comparacion):
+    """Pensión mensual según la edad de jubilación (comparacion como comparar_edades_retiro)"""
+    fig = go.Figure()
+    fig.add_trace(go.Bar(
+        x=[f"{e} años" for e in comparacion['Edad']],
+        y=comparacion['Pensión Mensual'],
+        marker_color='lightblue'
+    ))
+    
+    fig.update_layout(
+        uirevision='comparacion_jubilacion',
+        title='Pensión Mensual según Edad de Retiro',
+        xaxis_title='Edad de Jubilación',
+        yaxis_title='Pensión Mensual (USD)',
+        template='plotly_white'
+    )
+    return fig
+
+@medido('figura/flujos_bono')
+def crear_grafico_flujos_bono(df):
+    """Flujos de caja del bono y su valor presente por periodo"""
+    fig = go.Figure()
+    
+    fig.add_trace(go.Bar(
+        x=df['Periodo'],
+        y=df['Flujo'],
+        name='Flujo de Caja',
+        marker_color='lightblue',
+        text=df['Flujo'].apply(lambda x: f"${x:,.0f}"),
+        textposition='outside'
+    ))
+    
+    fig.add_trace(go.Scatter(
+        x=df['Periodo'],
+        y=df['VP Flujo'],
+        name='VP de Flujo',
+        mode='lines+markers',
+        line=dict(color='red', width=2),
+        marker=dict(size=8)
+    ))
+    
+    fig.update_layout(
+        uirevision='flujos_bono',
+        title='Flujos de Caja y Valor Presente',
+        xaxis_title='Periodo',
+        yaxis_title='Monto (USD)',
+        template='plotly_white',
+        hovermode='x unified'
+    )
+    return fig
+
+@medido('figura/sensibilidad_bono')
+def crear_grafico_sensibilidad_bono(sensibilidad, valor_nominal):
+    """Valor del bono según la TEA de mercado (sensibilidad como calcular_sensibilidad_bono)"""
+    fig = go.Figure()
+    
+    fig.add_trace(go.Scatter(
+        x=sensibilidad['TEA'],
+        y=sensibilidad['VP'],
+        mode='lines',
+        line=dict(color='green', width=3),
+        customdata=sensibilidad[['Duración Modificada', 'Convexidad']],
+        hovertemplate=(
+            'TEA: %{x:.2f}%<br>VP: $%{y:,.2f}'
+            '<br>Duración Mod.: %{customdata[0]:.2f}'
+            '<br>Convexidad: %{customdata[1]:.2f}<extra></extra>'
+        )
+    ))
+    
+    fig.add_hline(
+        y=valor_nominal,
+        line_dash="dash",
+        line_color="red",
+        annotation_text=f"Valor Nominal: ${valor_nominal:,.0f}"
+    )
+    
+    fig.update_layout(
+        uirevision='sensibilidad_bono',
+        title='Valor del Bono vs TEA de Mercado',
+        xaxis_title='TEA de Mercado (%)',
+        yaxis_title='Valor Presente (USD)',
+        template='plotly_white'
+    )
+    return fig
@@ -0,0 +1,208 @@
+"""
+Gráficos vectoriales para el reporte PDF.
+Dibujan los gráficos de cartera y bonos directamente como Drawings de reportlab a
+partir de los DataFrames, sin rasterizar con Kaleido ni matplotlib: el PDF queda
+más liviano, nítido a cualquier zoom y se construye mucho más rápido.
+"""
+import math
+import numpy as np
+from reportlab.graphics.shapes import Drawing, Group, Line, PolyLine, Polygon, Rect, Circle, String
+from reportlab.lib import colors
+from utils.diagnostico import medido
+
+# Colores de los gráficos de la aplicación (paleta de Plotly)
+AZUL = colors.HexColor('#636EFA')
+VERDE = colors.HexColor('#00CC96')
+ROJO = colors.HexColor('#EF553B')
+CELESTE = colors.HexColor('#ADD8E6')
+TEXTO = colors.HexColor('#2C3E50')
+GRILLA = colors.HexColor('#E1E5EB')
+BORDE = colors.HexColor('#D6D6D6')
+
+# Márgenes internos del área de trazado (puntos)
+MARGEN_IZQUIERDO = 58
+MARGEN_DERECHO = 12
+MARGEN_SUPERIOR = 36
+MARGEN_INFERIOR = 34
+
+# Puntos máximos por línea: más no se distinguen al tamaño del reporte
+MAX_PUNTOS_LINEA = 600
+
+def _marcas(minimo, maximo, cantidad=5):
+    """Valores "redondos" para las marcas de un eje entre minimo y maximo"""
+    if maximo <= minimo:
+        maximo = minimo + 1
+    paso_bruto = (maximo - minimo) / cantidad
+    magnitud = 10 ** math.floor(math.log10(paso_bruto))
+    paso = next(m * magnitud for m in (1, 2, 2.5, 5, 10) if m * magnitud >= paso_bruto)
+    inicio = math.floor(minimo / paso) * paso
+    fin = math.ceil(maximo / paso) * paso
+    return [inicio + i * paso for i in range(int(round((fin - inicio) / paso)) + 1)]
+
+def _formato_monto(valor):
+    """Monto abreviado para las marcas del eje ($1.2M, $250k, $500)"""
+    absoluto = abs(valor)
+    if absoluto >= 1e6:
+        return f"${_sin_ceros(valor / 1e6)}M"
+    if absoluto >= 1e3:
+        return f"${_sin_ceros(valor / 1e3)}k"
+    return f"${valor:,.0f}"
+
+def _sin_ceros(valor):
+    """Hasta dos decimales, sin ceros a la derecha (1.25, 2.5, 3)"""
+    return f"{valor:,.2f}".rstrip('0').rstrip('.')
+
+def _formato_numero(valor):
+    return f"{valor:,.0f}" if float(valor).is_integer() else f"{valor:,.1f}"
+
+def _reducir(x, y):
+    """Toma puntos equiespaciados de una serie larga conservando el primero y el último"""
+    if len(x) <= MAX_PUNTOS_LINEA:
+        return x, y
+    indices = np.unique(np.linspace(0, len(x) - 1, MAX_PUNTOS_LINEA).round().astype(int))
+    return x[indices], y[indices]
+
+class _Lienzo:
+    """Drawing con ejes, cuadrícula, título y leyenda, y la escala de datos a puntos"""
+
+    def __init__(self, ancho, alto, titulo, eje_x, eje_y, x_min, x_max, y_min, y_max,
+                 formato_x=_formato_numero, formato_y=_formato_monto):
+        self.dibujo = Drawing(ancho, alto)
+        self.izquierda = MARGEN_IZQUIERDO
+        self.derecha = ancho - MARGEN_DERECHO
+        self.abajo = MARGEN_INFERIOR
+        self.arriba = alto - MARGEN_SUPERIOR
+        # El eje x se ajusta a los datos; el eje y parte de cero y termina en una marca redonda
+        self.x_min, self.x_max = x_min, (x_max if x_max > x_min else x_min + 1)
+        self.marcas_x = [m for m in _marcas(self.x_min, self.x_max) if self.x_min <= m <= self.x_max]
+        self.marcas_y = _marcas(min(y_min, 0), y_max)
+        self.y_min, self.y_max = self.marcas_y[0], self.marcas_y[-1]
+        self._leyenda = []
+
+        d = self.dibujo
+        d.add(String(ancho / 2, alto - 13, titulo, fontName='Helvetica', fontSize=10,
+                     fillColor=TEXTO, textAnchor='middle'))
+
+        # Cuadrícula y marcas
+        for valor in self.marcas_y:
+            y = self.y(valor)
+            d.add(Line(self.izquierda, y, self.derecha, y, strokeColor=GRILLA, strokeWidth=0.5))
+            d.add(String(self.izquierda - 4, y - 2.5, formato_y(valor), fontName='Helvetica',
+                         fontSize=6.5, fillColor=TEXTO, textAnchor='end'))
+        for valor in self.marcas_x:
+            x = self.x(valor)
+            d.add(Line(x, self.abajo, x, self.arriba, strokeColor=GRILLA, strokeWidth=0.5))
+            d.add(String(x, self.abajo - 9, formato_x(valor), fontName='Helvetica',
+                         fontSize=6.5, fillColor=TEXTO, textAnchor='middle'))
+
+        # Marco y títulos de los ejes
+        d.add(Rect(self.izquierda, self.abajo, self.derecha - self.izquierda, self.arriba - self.abajo,
+                   fillColor=None, strokeColor=BORDE, strokeWidth=0.8))
+        d.add(String((self.izquierda + self.derecha) / 2, 4, eje_x, fontName='Helvetica',
+                     fontSize=7.5, fillColor=TEXTO, textAnchor='middle'))
+        titulo_y = String(0, 0, eje_y, fontName='Helvetica', fontSize=7.5, fillColor=TEXTO, textAnchor='middle')
+        d.add(_rotado(titulo_y, 9, (self.abajo + self.arriba) / 2))
+
+    def x(self, valor):
+        return self.izquierda + (valor - self.x_min) / (self.x_max - self.x_min) * (self.derecha - self.izquierda)
+
+    def y(self, valor):
+        return self.abajo + (valor - self.y_min) / (self.y_max - self.y_min) * (self.arriba - self.abajo)
+
+    def puntos(self, x, y):
+        """Lista plana [x0, y0, x1, y1, ...] en coordenadas del dibujo"""
+        xs = self.izquierda + (np.asarray(x, dtype=float) - self.x_min) / (self.x_max - self.x_min) * (self.derecha - self.izquierda)
+        ys = self.abajo + (np.asarray(y, dtype=float) - self.y_min) / (self.y_max - self.y_min) * (self.arriba - self.abajo)
+        return np.column_stack([xs, ys]).ravel().tolist()
+
+    def agregar_leyenda(self, nombre, color):
+        self._leyenda.append((nombre, color))
+
+    def terminar(self):
+        """Dibuja la leyenda (debajo del título) y devuelve el Drawing"""
+        x = self.izquierda
+        for nombre, color in self._leyenda:
+            self.dibujo.add(Rect(x, self.arriba + 7, 8, 6, fillColor=color, strokeColor=None))
+            self.dibujo.add(String(x + 11, self.arriba + 7.5, nombre, fontName='Helvetica',
+                                   fontSize=7, fillColor=TEXTO))
+            x += 20 + len(nombre) * 3.6
+        return self.dibujo
+
+def _rotado(forma, x, y):
+    """Agrupa una forma rotada 90° y la ubica en (x, y)"""
+    grupo = Group(forma)
+    grupo.transform = (0, 1, -1, 0, x, y)
+    return grupo
+
+def _con_alfa(color, alfa):
+    return colors.Color(color.red, color.green, color.blue, alpha=alfa)
+
+@medido('pdf/dibujo_cartera')
+def dibujo_cartera(df, ancho, alto):
+    """Evolución de los aportes acumulados y del saldo (como crear_grafico_cartera)"""
+    x = df['Periodo'].to_numpy(dtype=float)
+    aportes = df['Total Aportes'].to_numpy(dtype=float)
+    saldo = df['Saldo'].to_numpy(dtype=float)
+
+    lienzo = _Lienzo(ancho, alto, 'Evolución de la Inversión', 'Periodo', 'Monto (USD)',
+                     x.min(), x.max(), min(aportes.min(), saldo.min()), max(aportes.max(), saldo.max()))
+
+    x_r, aportes_r = _reducir(x, aportes)
+    _, saldo_r = _reducir(x, saldo)
+
+    # Relleno entre el saldo y los aportes (fill='tonexty')
+    contorno = lienzo.puntos(x_r, saldo_r) + lienzo.puntos(x_r[::-1], aportes_r[::-1])
+    lienzo.dibujo.add(Polygon(contorno, fillColor=_con_alfa(VERDE, 0.25), strokeColor=None))
+    lienzo.dibujo.add(PolyLine(lienzo.puntos(x_r, aportes_r), strokeColor=AZUL, strokeWidth=1.2))
+    lienzo.dibujo.add(PolyLine(lienzo.puntos(x_r, saldo_r), strokeColor=VERDE, strokeWidth=1.8))
+
+    lienzo.agregar_leyenda('Aportes Acumulados', AZUL)
+    lienzo.agregar_leyenda('Saldo Total', VERDE)
+    return lienzo.terminar()
+
+@medido('pdf/dibujo_flujos_bono')
+def dibujo_flujos_bono(df, ancho, alto):
+    """Flujos de caja del bono en barras y su valor presente en línea (como crear_grafico_flujos_bono)"""
+    x = df['Periodo'].to_numpy(dtype=float)
+    flujos = df['Flujo'].to_numpy(dtype=float)
+    vp = df['VP Flujo'].to_numpy(dtype=float)
+
+    lienzo = _Lienzo(ancho, alto, 'Flujos de Caja y Valor Presente', 'Periodo', 'Monto (USD)',
+                     x.min() - 0.5, x.max() + 0.5, 0, max(flujos.max(), vp.max()))
+
+    ancho_barra = max(0.5, 0.8 * (lienzo.x(1) - lienzo.x(0)))
+    cero = lienzo.y(0)
+    for periodo, flujo in zip(x.tolist(), flujos.tolist()):
+        lienzo.dibujo.add(Rect(lienzo.x(periodo) - ancho_barra / 2, cero, ancho_barra, lienzo.y(flujo) - cero,
+                               fillColor=CELESTE, strokeColor=None))
+
+    lienzo.dibujo.add(PolyLine(lienzo.puntos(*_reducir(x, vp)), strokeColor=ROJO, strokeWidth=1.2))
+    # Marcadores solo si se distinguen entre sí
+    if len(x) <= 60:
+        for px, py in zip(x.tolist(), vp.tolist()):
+            lienzo.dibujo.add(Circle(lienzo.x(px), lienzo.y(py), 1.8, fillColor=ROJO, strokeColor=None))
+
+    lienzo.agregar_leyenda('Flujo de Caja', CELESTE)
+    lienzo.agregar_leyenda('VP de Flujo', ROJO)
+    return lienzo.terminar()
+
+@medido('pdf/dibujo_sensibilidad_bono')
+def dibujo_sensibilidad_bono(sensibilidad, valor_nominal, ancho, alto):
+    """Valor del bono según la TEA de mercado (como crear_grafico_sensibilidad_bono)"""
+    tea = sensibilidad['TEA'].to_numpy(dtype=float)
+    vp = sensibilidad['VP'].to_numpy(dtype=float)
+
+    lienzo = _Lienzo(ancho, alto, 'Valor del Bono vs TEA de Mercado', 'TEA de Mercado (%)', 'Valor Presente (USD)',
+                     tea.min(), tea.max(), min(vp.min(), valor_nominal), max(vp.max(), valor_nominal))
+
+    lienzo.dibujo.add(PolyLine(lienzo.puntos(*_reducir(tea, vp)), strokeColor=colors.green, strokeWidth=1.8))
+
+    # Línea del valor nominal
+    y = lienzo.y(valor_nominal)
+    lienzo.dibujo.add(Line(lienzo.izquierda, y, lienzo.derecha, y, strokeColor=colors.red,
+                           strokeWidth=0.8, strokeDashArray=[4, 3]))
+    lienzo.dibujo.add(String(lienzo.derecha - 3, y + 3, f"Valor Nominal: ${valor_nominal:,.0f}",
+                             fontName='Helvetica', fontSize=6.5, fillColor=colors.red, textAnchor='end'))
+
+    lienzo.agregar_leyenda('VP', colors.green)
+    return lienzo.terminar()
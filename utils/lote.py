@@ -0,0 +1,257 @@
+"""
+Generación de reportes PDF por lotes, sin la interfaz de Streamlit.
+Lee un CSV o JSON con un escenario por cliente, calcula los módulos que tengan
+datos, genera los gráficos y escribe un PDF por cliente usando varios procesos.
+
+Columnas (o claves JSON) por escenario:
+    cliente (obligatoria)
+    Cartera: monto_inicial, aporte_periodico, tea, anos, frecuencia (por defecto Mensual)
+    Jubilación (requiere cartera): tipo_impuesto, opcion_retiro, anos_retiro, tea_retiro
+    Bono: valor_nominal, tasa_cupon, frecuencia_pago, anos_bono, tea_mercado
+
+Uso:
+    python -m utils.lote clientes.csv --salida reportes --procesos 4 [--tabla-completa] [--perfil pantalla] [--raster]
+"""
+import argparse
+import json
+import math
+import os
+import re
+import time
+from concurrent.futures import ProcessPoolExecutor, as_completed
+import pandas as pd
+from utils.calculos import (PERIODOS_ANUALES, calcular_crecimiento_cartera, calcular_jubilacion,
+                            comparar_edades_retiro, calcular_valor_bono, calcular_sensibilidad_bono)
+from utils.exportar import PERFILES_EXPORTACION, generar_pdf_reporte
+from utils.validaciones import validar_monto, validar_tea, validar_anos, validar_frecuencia
+from utils.graficos import (rasterizar_grafico, crear_grafico_cartera, crear_grafico_jubilacion,
+                            crear_grafico_comparacion_jubilacion, crear_grafico_flujos_bono,
+                            crear_grafico_sensibilidad_bono)
+
+COLUMNAS_CARTERA = ('monto_inicial', 'aporte_periodico', 'tea', 'anos')
+COLUMNAS_JUBILACION = ('tipo_impuesto', 'opcion_retiro')
+COLUMNAS_BONO = ('valor_nominal', 'tasa_cupon', 'frecuencia_pago', 'anos_bono', 'tea_mercado')
+
+def leer_escenarios(ruta):
+    """Lee los escenarios de un CSV o JSON (lista de objetos o {"clientes": [...]})"""
+    if ruta.lower().endswith('.json'):
+        with open(ruta, encoding='utf-8') as archivo:
+            datos = json.load(archivo)
+        if isinstance(datos, dict):
+            datos = datos.get('clientes', [])
+        escenarios = list(datos)
+    else:
+        escenarios = pd.read_csv(ruta).to_dict('records')
+
+    # Las celdas vacías del CSV llegan como NaN: se tratan como ausentes
+    return [
+        {clave: valor for clave, valor in escenario.items()
+         if not (isinstance(valor, float) and math.isnan(valor))}
+        for escenario in escenarios
+    ]
+
+def _tiene(escenario, columnas):
+    return all(columna in escenario for columna in columnas)
+
+def _validar(*errores):
+    """Lanza ValueError con el primer error de validación del escenario, si hay alguno"""
+    for error in errores:
+        if error is not None:
+            raise ValueError(error.mensaje)
+
+def _imagen(fig):
+    """Rasteriza un gráfico para el PDF (None si no se pudo)"""
+    return rasterizar_grafico(fig)['imagen']
+
+def construir_datos_reporte(escenario, graficos_vectoriales=True):
+    """
+    Calcula los módulos del escenario y arma los datos que recibe generar_pdf_reporte.
+    Con graficos_vectoriales solo se rasterizan los gráficos de jubilación; los de
+    cartera y bonos los dibuja el PDF a partir de los DataFrames.
+
+    Returns:
+        tuple: (datos_cartera, datos_jubilacion, datos_bono); None en las secciones sin datos
+    """
+    datos_cartera = datos_jubilacion = datos_bono = None
+
+    if _tiene(escenario, COLUMNAS_CARTERA):
+        frecuencia = escenario.get('frecuencia', 'Mensual')
+        _validar(validar_frecuencia(frecuencia, "Frecuencia"),
+                 validar_monto(float(escenario['monto_inicial']), "Monto inicial"),
+                 validar_monto(float(escenario['aporte_periodico']), "Aporte periódico"),
+                 validar_tea(float(escenario['tea'])),
+                 validar_anos(float(escenario['anos'])))
+        periodos_anuales = PERIODOS_ANUALES[frecuencia]
+        anos = int(float(escenario['anos']))
+        df, saldo_final, total_aportes = calcular_crecimiento_cartera(
+            float(escenario['monto_inicial']), float(escenario['aporte_periodico']),
+            float(escenario['tea']), anos * periodos_anuales, periodos_anuales
+        )
+        datos_cartera = {
+            'monto_inicial': float(escenario['monto_inicial']),
+            'aporte_periodico': float(escenario['aporte_periodico']),
+            'tea': float(escenario['tea']),
+            'anos': anos,
+            'saldo_final': saldo_final,
+            'df_detallado': df
+        }
+        if not graficos_vectoriales:
+            datos_cartera['grafico'] = _imagen(crear_grafico_cartera(df))
+
+        if _tiene(escenario, COLUMNAS_JUBILACION):
+            pension = escenario['opcion_retiro'] == "Pensión Mensual"
+            if pension:
+                _validar(validar_anos(float(escenario.get('anos_retiro', 20)), "Plazo de retiro"))
+            datos_jubilacion = calcular_jubilacion(
+                saldo_final, total_aportes, escenario['tipo_impuesto'], escenario['opcion_retiro'],
+                int(float(escenario.get('anos_retiro', 20))) if pension else None,
+                float(escenario.get('tea_retiro', 5.0)) if pension else None
+            )
+            if pension:
+                datos_jubilacion['grafico'] = _imagen(crear_grafico_jubilacion(datos_jubilacion))
+            comparacion = comparar_edades_retiro(datos_jubilacion['capital_neto'], datos_jubilacion['tea_retiro'])
+            datos_jubilacion['grafico_comparacion'] = _imagen(crear_grafico_comparacion_jubilacion(comparacion))
+
+    if _tiene(escenario, COLUMNAS_BONO):
+        valor_nominal = float(escenario['valor_nominal'])
+        tasa_cupon = float(escenario['tasa_cupon'])
+        frecuencia_pago = escenario['frecuencia_pago']
+        _validar(validar_frecuencia(frecuencia_pago, "Frecuencia de pago"),
+                 validar_monto(valor_nominal, "Valor nominal"),
+                 validar_tea(tasa_cupon),
+                 validar_tea(float(escenario['tea_mercado'])),
+                 validar_anos(float(escenario['anos_bono']), "Plazo del bono"))
+        anos_bono = int(float(escenario['anos_bono']))
+        df_flujos, vp_total = calcular_valor_bono(
+            valor_nominal, tasa_cupon, frecuencia_pago, anos_bono, float(escenario['tea_mercado'])
+        )
+        sensibilidad = calcular_sensibilidad_bono(valor_nominal, tasa_cupon, frecuencia_pago, anos_bono)
+        datos_bono = {
+            'valor_nominal': valor_nominal,
+            'tasa_cupon': tasa_cupon,
+            'anos': anos_bono,
+            'vp_total': vp_total,
+            'df_flujos': df_flujos,
+            'df_sensibilidad': sensibilidad
+        }
+        if not graficos_vectoriales:
+            datos_bono['grafico'] = _imagen(crear_grafico_flujos_bono(df_flujos))
+            datos_bono['grafico_sensibilidad'] = _imagen(crear_grafico_sensibilidad_bono(sensibilidad, valor_nominal))
+
+    if datos_cartera is None and datos_bono is None:
+        raise ValueError("El escenario no tiene datos de cartera ni de bono")
+    return datos_cartera, datos_jubilacion, datos_bono
+
+def nombre_archivo(cliente):
+    """Nombre del PDF de un cliente, sin caracteres problemáticos para el sistema de archivos"""
+    limpio = re.sub(r'[^\w-]+', '_', str(cliente)).strip('_') or 'cliente'
+    return f"reporte_{limpio}.pdf"
+
+def generar_reporte_cliente(escenario, carpeta, tabla_completa=False, perfil='impresion', graficos_vectoriales=True):
+    """
+    Genera y escribe el PDF de un cliente. Los errores se devuelven en el resultado
+    para que un escenario inválido no detenga el resto del lote.
+
+    Returns:
+        dict: 'cliente', 'archivo' (None si falló), 'segundos' y 'error'
+    """
+    inicio = time.perf_counter()
+    cliente = escenario.get('cliente')
+    try:
+        if cliente is None or str(cliente).strip() == '':
+            raise ValueError("Falta la columna 'cliente'")
+        datos_cartera, datos_jubilacion, datos_bono = construir_datos_reporte(escenario, graficos_vectoriales)
+        pdf = generar_pdf_reporte(datos_cartera, datos_jubilacion, datos_bono, tabla_completa=tabla_completa,
+                                  perfil=perfil, graficos_vectoriales=graficos_vectoriales)
+        archivo = os.path.join(carpeta, nombre_archivo(cliente))
+        with open(archivo, 'wb') as salida:
+            salida.write(pdf.getvalue())
+        error = None
+    except Exception as e:
+        archivo = None
+        error = f"{type(e).__name__}: {e}"
+    return {'cliente': cliente, 'archivo': archivo, 'segundos': time.perf_counter() - inicio, 'error': error}
+
+def ejecutar_lote(escenarios, carpeta, n_procesos=1, tabla_completa=False, perfil='impresion',
+                  graficos_vectoriales=True, al_avanzar=None):
+    """
+    Genera los reportes de todos los escenarios.
+
+    Args:
+        escenarios: Lista de dicts (ver leer_escenarios)
+        carpeta: Carpeta donde se escriben los PDF (se crea si no existe)
+        n_procesos: Procesos que generan reportes en paralelo
+        tabla_completa: Incluir el cronograma completo en cada reporte
+        perfil: Perfil de exportación de los gráficos (ver PERFILES_EXPORTACION)
+        graficos_vectoriales: Dibujar como vectores los gráficos de cartera y bonos
+        al_avanzar: Función opcional llamada como al_avanzar(resultado, terminados, total)
+
+    Returns:
+        dict: 'resultados' (en el orden de entrada), 'exitosos', 'fallidos', 'segundos'
+        y 'reportes_por_segundo'
+    """
+    os.makedirs(carpeta, exist_ok=True)
+    inicio = time.perf_counter()
+    resultados = [None] * len(escenarios)
+
+    def registrar(indice, resultado):
+        resultados[indice] = resultado
+        if al_avanzar is not None:
+            al_avanzar(resultado, sum(r is not None for r in resultados), len(escenarios))
+
+    if n_procesos > 1 and len(escenarios) > 1:
+        with ProcessPoolExecutor(max_workers=n_procesos) as ejecutor:
+            futuros = {
+                ejecutor.submit(generar_reporte_cliente, escenario, carpeta, tabla_completa, perfil,
+                                graficos_vectoriales): indice
+                for indice, escenario in enumerate(escenarios)
+            }
+            for futuro in as_completed(futuros):
+                indice = futuros[futuro]
+                try:
+                    resultado = futuro.result()
+                except Exception as e:
+                    # El proceso murió (por ejemplo, sin memoria): solo se pierde ese cliente
+                    resultado = {'cliente': escenarios[indice].get('cliente'), 'archivo': None,
+                                 'segundos': 0.0, 'error': f"{type(e).__name__}: {e}"}
+                registrar(indice, resultado)
+    else:
+        for indice, escenario in enumerate(escenarios):
+            registrar(indice, generar_reporte_cliente(escenario, carpeta, tabla_completa, perfil, graficos_vectoriales))
+
+    segundos = time.perf_counter() - inicio
+    exitosos = sum(r['error'] is None for r in resultados)
+    return {
+        'resultados': resultados,
+        'exitosos': exitosos,
+        'fallidos': len(resultados) - exitosos,
+        'segundos': segundos,
+        'reportes_por_segundo': exitosos / segundos if segundos > 0 else 0.0
+    }
+
+def main():
+    parser = argparse.ArgumentParser(description="Genera un reporte PDF por cliente a partir de un CSV o JSON")
+    parser.add_argument('escenarios', help="Archivo CSV o JSON con un escenario por cliente")
+    parser.add_argument('--salida', default='reportes', help="Carpeta de salida (por defecto: reportes)")
+    parser.add_argument('--procesos', type=int, default=os.cpu_count() or 1, help="Procesos en paralelo")
+    parser.add_argument('--tabla-completa', action='store_true', help="Incluir el cronograma completo")
+    parser.add_argument('--perfil', choices=list(PERFILES_EXPORTACION), default='impresion',
+                        help="Resolución y compresión de los gráficos (por defecto: impresion)")
+    parser.add_argument('--raster', action='store_true',
+                        help="Rasterizar todos los gráficos en lugar de dibujar vectores")
+    args = parser.parse_args()
+
+    escenarios = leer_escenarios(args.escenarios)
+
+    def al_avanzar(resultado, terminados, total):
+        estado = "✅" if resultado['error'] is None else f"❌ {resultado['error']}"
+        print(f"[{terminados}/{total}] {resultado['cliente']}: {estado} ({resultado['segundos']:.2f} s)", flush=True)
+
+    resumen = ejecutar_lote(escenarios, args.salida, args.procesos, args.tabla_completa, args.perfil,
+                            not args.raster, al_avanzar)
+    print(f"\n{resumen['exitosos']} reportes generados, {resumen['fallidos']} con error, "
+          f"en {resumen['segundos']:.1f} s ({resumen['reportes_por_segundo']:.2f} reportes/s)")
+    return 1 if resumen['fallidos'] else 0
+
+if __name__ == '__main__':
+    raise SystemExit(main())
@@ -0,0 +1,129 @@
+"""
+Simulación Monte Carlo del crecimiento de una cartera con rendimientos aleatorios.
+Las trayectorias se generan por bloques con NumPy para acotar la memoria y,
+opcionalmente, los bloques se reparten entre varios procesos.
+"""
+import math
+import multiprocessing
+from concurrent.futures import ProcessPoolExecutor
+import numpy as np
+import pandas as pd
+
+DISTRIBUCIONES = ('lognormal', 'normal')
+
+# Celdas trayectoria × periodo materializadas por bloque (~16 MB en float64)
+CELDAS_POR_BLOQUE = 2_000_000
+
+def parametros_periodicos(rendimiento_esperado, volatilidad, periodos_anuales, distribucion):
+    """
+    Convierte rendimiento esperado y volatilidad anuales (%) a parámetros por periodo.
+
+    Para 'lognormal' devuelve media y desviación del log-rendimiento periódico, de modo
+    que el rendimiento bruto anual tenga la media y volatilidad pedidas. Para 'normal'
+    devuelve media y desviación del rendimiento simple periódico.
+    """
+    mu = rendimiento_esperado / 100
+    sigma = volatilidad / 100
+
+    if distribucion == 'lognormal':
+        varianza_log = math.log(1 + (sigma / (1 + mu)) ** 2)
+        media_log = math.log(1 + mu) - varianza_log / 2
+        return media_log / periodos_anuales, math.sqrt(varianza_log / periodos_anuales)
+    if distribucion == 'normal':
+        return (1 + mu) ** (1 / periodos_anuales) - 1, sigma / math.sqrt(periodos_anuales)
+    raise ValueError(f"Distribución no soportada: {distribucion!r}")
+
+def _simular_bloque(semilla, n_trayectorias, n_muestra, monto_inicial, aporte_periodico,
+                    media, desviacion, periodos_totales, distribucion):
+    """Simula un bloque de trayectorias; devuelve saldos finales y una muestra de trayectorias"""
+    rng = np.random.default_rng(semilla)
+    choques = rng.normal(media, desviacion, size=(n_trayectorias, periodos_totales))
+
+    if distribucion == 'normal':
+        # Un rendimiento simple menor a -100% no tiene sentido: se acota a pérdida casi total
+        choques = np.log1p(np.maximum(choques, -0.9999))
+
+    # saldo_k = G_k * (M + A * sum_{j<=k} 1/G_j), con G_k el crecimiento acumulado
+    log_crecimiento = np.cumsum(choques, axis=1, out=choques)
+    descuento = np.exp(-log_crecimiento)
+    finales = np.exp(log_crecimiento[:, -1]) * (monto_inicial + aporte_periodico * descuento.sum(axis=1))
+
+    # Solo las trayectorias de muestra (para las bandas) se reconstruyen completas
+    muestra = np.exp(log_crecimiento[:n_muestra])
+    muestra *= monto_inicial + aporte_periodico * np.cumsum(descuento[:n_muestra], axis=1)
+
+    return finales, muestra
+
+def simular_cartera_montecarlo(monto_inicial, aporte_periodico, rendimiento_esperado, volatilidad,
+                               periodos_totales, periodos_anuales, n_trayectorias=10_000,
+                               distribucion='lognormal', meta=None, semilla=None,
+                               tamano_bloque=None, n_procesos=1, percentiles=(5, 50, 95),
+                               max_trayectorias_bandas=5_000):
+    """
+    Simula trayectorias de la cartera con rendimientos periódicos aleatorios.
+
+    Args:
+        monto_inicial: Capital inicial
+        aporte_periodico: Aporte al final de cada periodo
+        rendimiento_esperado: Rendimiento anual esperado (%)
+        volatilidad: Volatilidad anual (%)
+        periodos_totales: Número de periodos a simular
+        periodos_anuales: Periodos por año
+        n_trayectorias: Número de trayectorias simuladas
+        distribucion: 'lognormal' o 'normal'
+        meta: Saldo objetivo para calcular la probabilidad de alcanzarlo (opcional)
+        semilla: Semilla del generador; el resultado no depende de n_procesos
+        tamano_bloque: Trayectorias por bloque (por defecto se ajusta al plazo)
+        n_procesos: Procesos usados para simular los bloques en paralelo
+        percentiles: Percentiles de las bandas
+        max_trayectorias_bandas: Trayectorias retenidas para las bandas por periodo
+
+    Returns:
+        dict con 'bandas' (DataFrame por periodo), 'percentiles_finales', 'saldos_finales',
+        'prob_meta', 'total_aportes' y 'n_trayectorias'
+    """
+    if distribucion not in DISTRIBUCIONES:
+        raise ValueError(f"Distribución no soportada: {distribucion!r}")
+    if n_trayectorias <= 0 or periodos_totales <= 0:
+        raise ValueError("Se requieren trayectorias y periodos positivos")
+
+    media, desviacion = parametros_periodicos(rendimiento_esperado, volatilidad, periodos_anuales, distribucion)
+
+    if tamano_bloque is None:
+        tamano_bloque = max(1, CELDAS_POR_BLOQUE // periodos_totales)
+    tamanos = [min(tamano_bloque, n_trayectorias - inicio) for inicio in range(0, n_trayectorias, tamano_bloque)]
+
+    # Una semilla independiente por bloque: el resultado es reproducible sin importar
+    # cuántos procesos se usen ni en qué orden terminen
+    semillas = np.random.SeedSequence(semilla).spawn(len(tamanos))
+    fraccion_muestra = min(1.0, max_trayectorias_bandas / n_trayectorias)
+    tareas = [
+        (semilla_bloque, tamano, math.ceil(tamano * fraccion_muestra), monto_inicial, aporte_periodico,
+         media, desviacion, periodos_totales, distribucion)
+        for semilla_bloque, tamano in zip(semillas, tamanos)
+    ]
+
+    if n_procesos > 1 and len(tareas) > 1:
+        # 'spawn' y no 'fork': la simulación corre en un hilo del servidor de Streamlit y un
+        # fork copiaría locks tomados por otros hilos (cachés, renderizador), con riesgo de bloqueo
+        contexto = multiprocessing.get_context('spawn')
+        with ProcessPoolExecutor(max_workers=n_procesos, mp_context=contexto) as ejecutor:
+            resultados = list(ejecutor.map(_simular_bloque, *zip(*tareas)))
+    else:
+        resultados = [_simular_bloque(*tarea) for tarea in tareas]
+
+    saldos_finales = np.concatenate([finales for finales, _ in resultados])
+    muestra = np.concatenate([trayectorias for _, trayectorias in resultados])
+
+    etiquetas = [f"P{p:g}" for p in percentiles]
+    bandas = pd.DataFrame(np.percentile(muestra, percentiles, axis=0).T, columns=etiquetas)
+    bandas.insert(0, 'Periodo', np.arange(1, periodos_totales + 1))
+
+    return {
+        'bandas': bandas,
+        'percentiles_finales': dict(zip(etiquetas, np.percentile(saldos_finales, percentiles).tolist())),
+        'saldos_finales': saldos_finales,
+        'prob_meta': float(np.mean(saldos_finales >= meta)) if meta is not None else None,
+        'total_aportes': monto_inicial + aporte_periodico * periodos_totales,
+        'n_trayectorias': n_trayectorias
+    }
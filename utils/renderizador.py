@@ -0,0 +1,268 @@
+"""
+Renderizador persistente de Kaleido.
+Mantiene un subproceso con Plotly y Kaleido ya cargados ("caliente") que recibe
+lotes de figuras y devuelve las imágenes, para no pagar el arranque de
+Kaleido/Chromium en cada exportación. El subproceso se verifica con un ping,
+se reinicia si falla y, si Kaleido no está disponible, se vuelve a intentar
+solo después de un tiempo de espera.
+
+Protocolo: una línea JSON por mensaje en stdin/stdout del subproceso.
+    {"id": 1, "op": "ping"}
+    {"id": 2, "op": "render", "figuras": ["<json de figura>", ...], "ajustes": {...}}
+"""
+import atexit
+import base64
+import inspect
+import json
+import logging
+import os
+import queue
+import subprocess
+import sys
+import threading
+import time
+
+logger = logging.getLogger(__name__)
+
+RAIZ_PROYECTO = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+class ErrorRenderizador(Exception):
+    """El subproceso de Kaleido no respondió o no está disponible"""
+
+    def __init__(self, mensaje, reintentable=True):
+        super().__init__(mensaje)
+        self.reintentable = reintentable
+
+class RenderizadorKaleido:
+    """
+    Cliente del subproceso de Kaleido.
+
+    Args:
+        timeout: Segundos máximos de espera por respuesta
+        timeout_arranque: Segundos máximos para arrancar el subproceso y calentar Kaleido
+        espera_reintento: Segundos antes de volver a arrancar el subproceso tras un fallo
+    """
+
+    def __init__(self, timeout=60, timeout_arranque=30, espera_reintento=60):
+        self.timeout = timeout
+        self.timeout_arranque = timeout_arranque
+        self.espera_reintento = espera_reintento
+        self._proceso = None
+        self._respuestas = None
+        self._siguiente_id = 0
+        self._lock = threading.Lock()
+        self._ultimo_fallo = None
+        self.ultimo_error = None
+        self.reinicios = 0
+
+    def disponible(self):
+        """Indica si vale la pena intentar renderizar (no hubo un fallo reciente)"""
+        return self._ultimo_fallo is None or time.monotonic() - self._ultimo_fallo >= self.espera_reintento
+
+    def renderizar_lote(self, figuras, ajustes):
+        """
+        Renderiza varias figuras en un solo viaje al subproceso.
+
+        Args:
+            figuras: Lista de figuras de Plotly (o su JSON)
+            ajustes: Parámetros de exportación (format, width, height, scale)
+
+        Returns:
+            list: Un dict por figura con 'imagen' (bytes o None), 'backend', 'segundos' y 'error'
+        """
+        figuras_json = [f if isinstance(f, str) else f.to_json() for f in figuras]
+        with self._lock:
+            if not self.disponible():
+                raise ErrorRenderizador(self.ultimo_error or "Kaleido no disponible")
+            # Un reintento: si el subproceso murió a mitad de camino se arranca otro
+            for intento in range(2):
+                try:
+                    self._asegurar_proceso()
+                    respuesta = self._solicitar({'op': 'render', 'figuras': figuras_json, 'ajustes': ajustes})
+                    break
+                except ErrorRenderizador as e:
+                    self._detener_proceso()
+                    if intento == 1 or not e.reintentable:
+                        self._registrar_fallo(str(e))
+                        raise
+        return [
+            {
+                'imagen': base64.b64decode(r['png']) if r.get('png') else None,
+                'backend': 'kaleido',
+                'segundos': r.get('segundos', 0.0),
+                'error': r.get('error')
+            }
+            for r in respuesta['imagenes']
+        ]
+
+    def verificar_salud(self):
+        """Hace ping al subproceso; devuelve True si responde y Kaleido funciona"""
+        with self._lock:
+            try:
+                self._asegurar_proceso()
+                self._solicitar({'op': 'ping'})
+                return True
+            except ErrorRenderizador as e:
+                self._detener_proceso()
+                self._registrar_fallo(str(e))
+                return False
+
+    def detener(self):
+        """Termina el subproceso"""
+        with self._lock:
+            self._detener_proceso()
+
+    def _registrar_fallo(self, error):
+        self._ultimo_fallo = time.monotonic()
+        self.ultimo_error = error
+        logger.warning("Renderizador Kaleido no disponible: %s", error)
+
+    def _asegurar_proceso(self):
+        """Arranca el subproceso si no existe o murió, y comprueba que Kaleido funcione"""
+        if self._proceso is not None and self._proceso.poll() is None:
+            return
+        if self._proceso is not None:
+            self.reinicios += 1
+            logger.info("Reiniciando el renderizador Kaleido (código de salida %s)", self._proceso.returncode)
+
+        inicio = time.perf_counter()
+        self._proceso = subprocess.Popen(
+            [sys.executable, '-m', 'utils.renderizador'],
+            cwd=RAIZ_PROYECTO,
+            stdin=subprocess.PIPE,
+            stdout=subprocess.PIPE,
+            stderr=subprocess.DEVNULL,
+            text=True,
+            encoding='utf-8'
+        )
+        self._respuestas = queue.Queue()
+        threading.Thread(
+            target=_leer_respuestas,
+            args=(self._proceso.stdout, self._respuestas),
+            daemon=True,
+            name='renderizador-kaleido'
+        ).start()
+
+        # Si no arranca a tiempo no tiene sentido reintentar en seguida
+        try:
+            estado = self._solicitar({'op': 'ping'}, timeout=self.timeout_arranque)
+        except ErrorRenderizador as e:
+            raise ErrorRenderizador(f"El subproceso no arrancó: {e}", reintentable=False)
+        if not estado.get('kaleido'):
+            raise ErrorRenderizador(estado.get('error') or "Kaleido no disponible", reintentable=False)
+        logger.info("Renderizador Kaleido listo en %.2f s", time.perf_counter() - inicio)
+
+    def _solicitar(self, mensaje, timeout=None):
+        """Envía un mensaje y espera su respuesta (se llama con el lock tomado)"""
+        timeout = self.timeout if timeout is None else timeout
+        self._siguiente_id += 1
+        mensaje = dict(mensaje, id=self._siguiente_id)
+        try:
+            self._proceso.stdin.write(json.dumps(mensaje) + '\n')
+            self._proceso.stdin.flush()
+        except (BrokenPipeError, OSError, ValueError) as e:
+            raise ErrorRenderizador(f"El subproceso no acepta mensajes: {e}")
+
+        limite = time.monotonic() + timeout
+        while True:
+            try:
+                respuesta = self._respuestas.get(timeout=max(0.0, limite - time.monotonic()))
+            except queue.Empty:
+                raise ErrorRenderizador(f"Sin respuesta en {timeout} s")
+            if respuesta is None:
+                raise ErrorRenderizador("El subproceso terminó inesperadamente")
+            if respuesta.get('id') == mensaje['id']:
+                return respuesta
+
+    def _detener_proceso(self):
+        if self._proceso is None:
+            return
+        try:
+            self._proceso.stdin.close()
+            self._proceso.wait(timeout=5)
+        except Exception:
+            self._proceso.kill()
+        self._proceso = None
+
+def _leer_respuestas(salida, respuestas):
+    """Hilo lector: pasa cada línea JSON del subproceso a la cola (None al cerrarse)"""
+    for linea in salida:
+        try:
+            respuestas.put(json.loads(linea))
+        except ValueError:
+            continue
+    respuestas.put(None)
+
+_renderizador = None
+_renderizador_lock = threading.Lock()
+
+def obtener_renderizador():
+    """Devuelve el renderizador compartido del proceso (se crea al primer uso)"""
+    global _renderizador
+    with _renderizador_lock:
+        if _renderizador is None:
+            _renderizador = RenderizadorKaleido()
+            atexit.register(_renderizador.detener)
+        return _renderizador
+
+# ---------------------------------------------------------------------------
+# Lado del subproceso
+# ---------------------------------------------------------------------------
+
+def _preparar_kaleido():
+    """Carga Kaleido y hace un render de prueba; devuelve (funciona, error)"""
+    try:
+        import plotly.graph_objects as go
+        import plotly.io as pio
+        import kaleido
+        # El primer render comprueba que haya navegador: sin él falla enseguida,
+        # mientras que el servidor persistente se quedaría esperando
+        figura_prueba = go.Figure()
+        pio.to_image(figura_prueba, format='png', width=10, height=10, **_argumentos_motor(pio))
+        # Kaleido >= 1.0 puede mantener Chromium abierto entre llamadas
+        if hasattr(kaleido, 'start_sync_server'):
+            try:
+                kaleido.start_sync_server(silence_warnings=True)
+            except TypeError:
+                kaleido.start_sync_server()
+            pio.to_image(figura_prueba, format='png', width=10, height=10, **_argumentos_motor(pio))
+        return True, None
+    except Exception as e:
+        return False, f"{type(e).__name__}: {' '.join(str(e).split())}"
+
+def _argumentos_motor(pio):
+    """Plotly < 6 necesita engine='kaleido'; las versiones nuevas ya no aceptan ese argumento"""
+    return {'engine': 'kaleido'} if 'engine' in inspect.signature(pio.to_image).parameters else {}
+
+def _servir():
+    """Bucle del subproceso: atiende pings y lotes de render hasta que se cierre stdin"""
+    # Cualquier print de las librerías iría a stdout y rompería el protocolo: se
+    # reserva el stdout original para las respuestas y el resto va a stderr
+    salida = os.fdopen(os.dup(sys.stdout.fileno()), 'w', encoding='utf-8')
+    os.dup2(sys.stderr.fileno(), sys.stdout.fileno())
+
+    import plotly.io as pio
+    funciona, error = _preparar_kaleido()
+    argumentos = _argumentos_motor(pio)
+
+    for linea in sys.stdin:
+        mensaje = json.loads(linea)
+        if mensaje['op'] == 'ping':
+            respuesta = {'id': mensaje['id'], 'kaleido': funciona, 'error': error}
+        else:
+            imagenes = []
+            for figura in mensaje['figuras']:
+                inicio = time.perf_counter()
+                try:
+                    png = pio.to_image(pio.from_json(figura, skip_invalid=True), **mensaje['ajustes'], **argumentos)
+                    imagenes.append({'png': base64.b64encode(png).decode('ascii'),
+                                     'segundos': time.perf_counter() - inicio})
+                except Exception as e:
+                    imagenes.append({'png': None, 'error': f"{type(e).__name__}: {e}",
+                                     'segundos': time.perf_counter() - inicio})
+            respuesta = {'id': mensaje['id'], 'imagenes': imagenes}
+        salida.write(json.dumps(respuesta) + '\n')
+        salida.flush()
+
+if __name__ == '__main__':
+    _servir()
@@ -1,46 +1,90 @@
-import streamlit as st
+import pandas as pd
+from utils.calculos import PERIODOS_ANUALES, normalizar_frecuencias
+
+class ErrorValidacion:
+    """Error de validación sin dependencias de la interfaz: quien valida decide cómo mostrarlo"""
+
+    def __init__(self, mensaje, campo=None, nivel='error'):
+        self.mensaje = mensaje
+        self.campo = campo
+        self.nivel = nivel
+
+    def __repr__(self):
+        return f"ErrorValidacion({self.mensaje!r}, campo={self.campo!r}, nivel={self.nivel!r})"
+
+    def __str__(self):
+        return self.mensaje
 
 def validar_monto(monto, nombre="Monto"):
-    """Valida que el monto sea no negativo"""
+    """Valida que el monto sea no negativo (None si es válido)"""
     if monto < 0:
-        st.error(f"❌ {nombre} no puede ser negativo")
-        return False
-    return True
+        return ErrorValidacion(f"{nombre} no puede ser negativo", nombre)
+    return None
 
-def validar_tea(tea):
-    """Valida que la TEA esté en el rango permitido"""
+def validar_tea(tea, nombre="TEA"):
+    """Valida que la TEA esté en el rango permitido (None si es válida)"""
     if tea < 0 or tea > 50:
-        st.error("❌ La TEA debe estar entre 0% y 50%")
-        return False
-    return True
+        return ErrorValidacion("La TEA debe estar entre 0% y 50%", nombre)
+    return None
 
 def validar_edad(edad_actual, edad_jubilacion):
-    """Valida que las edades sean coherentes"""
+    """Valida que las edades sean coherentes (None si lo son)"""
     if edad_actual < 18:
-        st.error("❌ La edad actual debe ser al menos 18 años")
-        return False
+        return ErrorValidacion("La edad actual debe ser al menos 18 años", "Edad actual")
     if edad_jubilacion <= edad_actual:
-        st.error("❌ La edad de jubilación debe ser mayor a la edad actual")
-        return False
+        return ErrorValidacion("La edad de jubilación debe ser mayor a la edad actual", "Edad de jubilación")
     if edad_jubilacion > 100:
-        st.error("❌ La edad de jubilación debe ser menor a 100 años")
-        return False
-    return True
+        return ErrorValidacion("La edad de jubilación debe ser menor a 100 años", "Edad de jubilación")
+    return None
 
 def validar_anos(anos, nombre="Plazo"):
-    """Valida que los años sean positivos"""
+    """Valida que los años sean un entero positivo (None si son válidos)"""
+    if not float(anos).is_integer():
+        return ErrorValidacion(f"{nombre} debe ser un número entero de años", nombre)
     if anos <= 0:
-        st.error(f"❌ {nombre} debe ser mayor a 0")
-        return False
+        return ErrorValidacion(f"{nombre} debe ser mayor a 0", nombre)
     if anos > 80:
-        st.error(f"❌ {nombre} no puede exceder 80 años")
-        return False
-    return True
+        return ErrorValidacion(f"{nombre} no puede exceder 80 años", nombre)
+    return None
+
+def validar_frecuencia(frecuencia, nombre="Frecuencia"):
+    """Valida que la frecuencia sea una de las de PERIODOS_ANUALES (None si es válida)"""
+    if frecuencia not in PERIODOS_ANUALES:
+        return ErrorValidacion(f"{nombre} no reconocida: {frecuencia!r} (opciones: {', '.join(PERIODOS_ANUALES)})",
+                               nombre)
+    return None
 
 def validar_campos_completos(**campos):
-    """Verifica que todos los campos requeridos estén llenos"""
+    """Verifica que todos los campos requeridos estén llenos (None si lo están)"""
     faltantes = [nombre for nombre, valor in campos.items() if valor is None or valor == ""]
     if faltantes:
-        st.warning(f"⚠️ Por favor completa los siguientes campos: {', '.join(faltantes)}")
-        return False
-    return True
\ No newline at end of file
+        return ErrorValidacion(f"Por favor completa los siguientes campos: {', '.join(faltantes)}",
+                               nivel='advertencia')
+    return None
+
+def validar_cartera_bonos(df):
+    """Valida que la tabla de bonos tenga las columnas y rangos esperados (None si es válida)"""
+    requeridas = ['valor_nominal', 'tasa_cupon', 'frecuencia_pago', 'anos', 'tea_mercado']
+    faltantes = [columna for columna in requeridas if columna not in df.columns]
+    if faltantes:
+        return ErrorValidacion(f"Faltan columnas en el archivo: {', '.join(faltantes)}")
+    if df.empty:
+        return ErrorValidacion("El archivo no contiene bonos")
+    if df[requeridas].isna().any().any():
+        return ErrorValidacion("Hay celdas vacías en las columnas requeridas")
+
+    numericas = df[['valor_nominal', 'tasa_cupon', 'anos', 'tea_mercado']].apply(pd.to_numeric, errors='coerce')
+    if numericas.isna().any().any():
+        return ErrorValidacion("valor_nominal, tasa_cupon, anos y tea_mercado deben ser numéricos")
+    if (numericas['valor_nominal'] < 0).any():
+        return ErrorValidacion("Valor nominal no puede ser negativo", 'valor_nominal')
+    if not numericas[['tasa_cupon', 'tea_mercado']].stack().between(0, 50).all():
+        return ErrorValidacion("La TEA debe estar entre 0% y 50%")
+    if not ((numericas['anos'] > 0) & (numericas['anos'] <= 80)).all():
+        return ErrorValidacion("Plazo debe ser mayor a 0 y no exceder 80 años", 'anos')
+
+    try:
+        normalizar_frecuencias(df['frecuencia_pago'])
+    except ValueError as e:
+        return ErrorValidacion(str(e), 'frecuencia_pago')
+    return None